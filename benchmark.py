@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Benchmarks for the turn pipeline and the render loop.
+#
+#   python benchmark.py --output bench.json
+#   python benchmark.py --compare bench.json --threshold 0.1
+#
+# Each benchmark is a setup function that builds its fixtures from the
+# scale parameters and returns the operation to time.
+BENCHMARKS = {}
+
+
+def benchmark(name, group="core"):
+    def register(setup):
+        BENCHMARKS[name] = (group, setup)
+        return setup
+    return register
+
+
+def make_simulation(params):
+    from core.factory import Factory
+    from core.simulation import Simulation
+    from core.faction import FACTIONS
+
+    sim = Simulation(max_turns=10 ** 9, seed=params.seed)
+    factions = list(FACTIONS)
+    for i in range(params.players):
+        player = sim.add_player(factions[i % len(factions)])
+        player.factories = [
+            Factory(("raw", "manufactured", "luxury")[j % 3], 4 + j % 5)
+            for j in range(params.factories)
+        ]
+    return sim
+
+
+def list_goods(sim, params):
+    # Spreads params.listings listings over the players, priced at the
+    # sector's price floor so they all fill at the next settlement and the
+    # book does not grow across loops
+    for i in range(params.listings):
+        player = sim.players[i % len(sim.players)]
+        product_type = ("raw", "manufactured", "luxury")[i % 3]
+        price = sim.market.sectors[product_type].base_price * 0.5
+        player.inventory[product_type] += 1
+        player.list_goods(product_type, 1, price, sim.market)
+
+
+@benchmark("market_update")
+def market_update(params):
+    from core.market import Market
+    market = Market()
+    return market.update
+
+
+@benchmark("market_sector_update")
+def market_sector_update(params):
+    from core.market import Market
+    sector = Market().sectors["manufactured"]
+    return lambda: sector.update(50)
+
+
+@benchmark("player_produce")
+def player_produce(params):
+    # One call produces in every factory of one player
+    sim = make_simulation(params)
+    player = sim.players[0]
+
+    def produce():
+        player.money = 10 ** 9
+        for factory in player.factories:
+            player.produce(factory, sim.market)
+    return produce
+
+
+@benchmark("listing_settlement")
+def listing_settlement(params):
+    # Posting params.listings listings and settling them against the market
+    sim = make_simulation(params)
+
+    def settle():
+        list_goods(sim, params)
+        sim.market.settle_listings()
+    return settle
+
+
+@benchmark("simulation_end_turn")
+def simulation_end_turn(params):
+    sim = make_simulation(params)
+
+    def end_turn():
+        list_goods(sim, params)
+        sim.end_turn()
+    return end_turn
+
+
+@benchmark("fork_sell")
+def fork_sell(params):
+    # One search step: branch, sell a unit at the market price, roll back
+    sim = make_simulation(params)
+    sim.player.inventory["raw"] += 1
+
+    def step():
+        sim.fork()
+        sim.sell_at_market("raw", 1)
+        sim.rollback()
+    return step
+
+
+@benchmark("fork_end_turn")
+def fork_end_turn(params):
+    sim = make_simulation(params)
+
+    def step():
+        sim.fork()
+        sim.end_turn()
+        sim.rollback()
+    return step
+
+
+def make_game(params):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from core.game import Game
+
+    pygame.init()
+    game = Game()
+    game.simulation = make_simulation(params)
+    game.faction_selection_done = True
+    return game
+
+
+@benchmark("game_end_turn", group="render")
+def game_end_turn(params):
+    game = make_game(params)
+
+    def end_turn():
+        list_goods(game.simulation, params)
+        game.end_turn()
+    return end_turn
+
+
+@benchmark("draw_game_state", group="render")
+def draw_game_state(params):
+    import pygame
+    game = make_game(params)
+
+    def draw():
+        game.draw_game_state()
+        pygame.display.flip()
+    return draw
+
+
+@benchmark("draw_factory_view", group="render")
+def draw_factory_view(params):
+    import pygame
+    game = make_game(params)
+    game.viewing_factories = True
+
+    def draw():
+        game.draw_game_state()
+        pygame.display.flip()
+    return draw
+
+
+def measure(operation, warmup, repeats, min_time):
+    for _ in range(warmup):
+        operation()
+
+    # Calibrate so that one repeat runs for at least min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed < min_time / 10 else 1 + int(min_time / max(elapsed, 1e-9))
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        samples.append((time.perf_counter() - start) / number)
+
+    median = statistics.median(samples)
+    return {
+        "median_s": median,
+        "min_s": min(samples),
+        "mean_s": statistics.mean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_sec": 1 / median,
+        "loops": number,
+        "repeats": repeats,
+    }
+
+
+def run(params):
+    results = {}
+    for name, (group, setup) in BENCHMARKS.items():
+        if params.group and group not in params.group:
+            continue
+        if params.only and name not in params.only:
+            continue
+        results[name] = measure(setup(params), params.warmup, params.repeats, params.min_time)
+        print(f"{name:24} {results[name]['median_s'] * 1e6:12.2f} us  "
+              f"{results[name]['ops_per_sec']:14.1f} ops/s")
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "players": params.players,
+            "factories": params.factories,
+            "listings": params.listings,
+            "seed": params.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    # Returns the names of benchmarks whose median slowed down by more than
+    # threshold (a fraction) relative to the baseline
+    if report["params"] != baseline.get("params"):
+        print("warning: scale parameters differ from the baseline")
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        status = "REGRESSION" if ratio > 1 + threshold else "ok"
+        print(f"{name:24} {ratio:8.3f}x  {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the turn pipeline and render loop")
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--factories", type=int, default=2, help="factories per player")
+    parser.add_argument("--listings", type=int, default=10, help="listings posted per turn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat")
+    parser.add_argument("--group", action="append", choices=["core", "render"])
+    parser.add_argument("--only", action="append", choices=list(BENCHMARKS))
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, e.g. 0.1 = 10%%")
+    params = parser.parse_args()
+
+    report = run(params)
+    if params.output:
+        with open(params.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if params.compare:
+        with open(params.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, params.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import math
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from core import journal as actions
+from core.config import (AI_EXPLORATION, AI_PROTECT_VISITS, AI_ROLLOUT_TURNS, AI_TABLE_SIZE,
+                         AI_TIME_BUDGET, AI_WORKERS, POLITICS_BRIBE_COST, POLITICS_INFLUENCE_CAP)
+from core.factory import PRODUCT_TYPES
+from core.scheduler import score
+from core.simulation import RNG_STREAMS
+
+# Monte Carlo tree search bot. A move is a journal action code plus a
+# product, factory index or None; apply_move turns it into the concrete
+# action for the current state (sell or list the whole stock at the going
+# price), so the bot plays exactly the actions a human can and a move stays
+# meaningful across transposed states.
+#
+# Each search runs on its own copy of the game whose RNG streams are
+# reseeded, so the bot cannot see the real future market draws.
+# Root-parallel workers each search a differently seeded copy and their
+# root statistics are summed.
+
+END_TURN = (actions.END_TURN, None)
+ZOBRIST_VALUES = 1024
+
+
+def legal_moves(sim):
+    player = sim.player
+    moves = [END_TURN]
+    for product_type in PRODUCT_TYPES:
+        if player.inventory[product_type] >= 1:
+            moves.append((actions.SELL, product_type))
+            moves.append((actions.LIST, product_type))
+    if player.actions_left > 0:
+        factories = player.factories
+        if any(player.money >= f.labor_cost + f.fixed_cost for f in factories):
+            moves.append((actions.PRODUCE, None))
+        if player.research.affordable():
+            moves.append((actions.RESEARCH, None))
+        if (player.political_influence < POLITICS_INFLUENCE_CAP
+                and player.money >= player.get_bribery_cost(POLITICS_BRIBE_COST)):
+            moves.append((actions.POLITICS, None))
+        for i, factory in enumerate(factories):
+            if player.money >= factory.upgrade_cost():
+                moves.append((actions.UPGRADE, i))
+    return moves
+
+
+def apply_move(sim, move):
+    action, arg = move
+    if action == actions.SELL:
+        args = (arg, sim.player.inventory[arg])
+    elif action == actions.LIST:
+        args = (arg, sim.player.inventory[arg], sim.market.sectors[arg].get_price())
+    elif action == actions.UPGRADE:
+        args = (arg,)
+    else:
+        args = ()
+    actions.apply_action(sim, action, args)
+
+
+def features(sim):
+    # Small non-negative ints describing the state; money, goods and
+    # prices are bucketed so nearly identical states share a table entry
+    market = sim.market
+    values = [sim.turn, sim.current_player, market.economic_cycle]
+    values += (int(sector.current_price * 2) for sector in market.sectors.values())
+    for player in sim.players:
+        values += (int(player.money) // 10, player.political_influence, max(player.actions_left, 0),
+                   len(player.technologies))
+        values += (int(quantity) for quantity in player.inventory.values())
+        values += (factory.level for factory in player.factories)
+    return values
+
+
+# Zobrist hashing: one random 64-bit key per (feature slot, value), XORed
+# together. Keys for new slots are drawn as states with more players or
+# factories show up.
+class ZobristKeys:
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.keys = []
+
+    def hash(self, values):
+        keys = self.keys
+        while len(keys) < len(values):
+            keys.append([self.rng.getrandbits(64) for _ in range(ZOBRIST_VALUES)])
+        h = 0
+        for slot, value in enumerate(values):
+            h ^= keys[slot][min(max(value, 0), ZOBRIST_VALUES - 1)]
+        return h
+
+
+class Node:
+    __slots__ = ("key", "generation", "visits", "moves", "stats")
+
+    def __init__(self, key, generation, moves):
+        self.key = key
+        self.generation = generation
+        self.visits = 0
+        self.moves = moves
+        # move -> [visits, total reward of the player to move]
+        self.stats = {}
+
+
+# Fixed number of slots indexed by the low bits of the hash, so memory is
+# bounded however long the bot searches. A colliding node replaces the
+# occupant unless the occupant was visited often in the current search.
+class TranspositionTable:
+    def __init__(self, size=AI_TABLE_SIZE, protect_visits=AI_PROTECT_VISITS):
+        self.mask = (1 << (size - 1).bit_length()) - 1
+        self.slots = [None] * (self.mask + 1)
+        self.protect_visits = protect_visits
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def get(self, key):
+        node = self.slots[key & self.mask]
+        if node is not None and node.key == key:
+            return node
+        return None
+
+    def store(self, node):
+        index = node.key & self.mask
+        occupant = self.slots[index]
+        if (occupant is None or occupant.generation != self.generation
+                or occupant.visits < self.protect_visits):
+            self.slots[index] = node
+
+
+def rewards(sim):
+    # Each player's score relative to the leader, in [0, 1]
+    scores = [max(score(player), 0) for player in sim.players]
+    best = max(scores)
+    return [s / best if best > 0 else 1.0 for s in scores]
+
+
+def rollout(sim, rng, turns):
+    end = min(sim.turn + turns, sim.max_turns + 1)
+    while sim.turn < end:
+        apply_move(sim, rng.choice(legal_moves(sim)))
+
+
+class MCTS:
+    def __init__(self, seed=0, table_size=AI_TABLE_SIZE, exploration=AI_EXPLORATION,
+                 rollout_turns=AI_ROLLOUT_TURNS):
+        self.rng = random.Random(seed)
+        self.zobrist = ZobristKeys()
+        self.table = TranspositionTable(table_size)
+        self.exploration = exploration
+        self.rollout_turns = rollout_turns
+
+    def node(self, sim):
+        key = self.zobrist.hash(features(sim))
+        node = self.table.get(key)
+        if node is None:
+            node = Node(key, self.table.generation, legal_moves(sim))
+            self.table.store(node)
+        return node
+
+    def select(self, node):
+        untried = [move for move in node.moves if move not in node.stats]
+        if untried:
+            move = self.rng.choice(untried)
+            node.stats[move] = [0, 0.0]
+            return move, True
+        log_visits = math.log(max(node.visits, 1))
+        best, best_value = None, -math.inf
+        for move, (visits, total) in node.stats.items():
+            if not visits:
+                return move, False
+            value = total / visits + self.exploration * math.sqrt(log_visits / visits)
+            if value > best_value:
+                best, best_value = move, value
+        return best, False
+
+    def iterate(self, sim):
+        # One selection, expansion, rollout and backup, all undone after
+        path = []
+        seen = set()
+        sim.fork()
+        while not sim.is_over:
+            node = self.node(sim)
+            # A move that does nothing in this exact state leads back to the
+            # same node; play the rest out instead of looping
+            if node.key in seen:
+                break
+            seen.add(node.key)
+            move, expanded = self.select(node)
+            path.append((node, move, sim.current_player))
+            apply_move(sim, move)
+            if expanded:
+                break
+        if not sim.is_over:
+            rollout(sim, self.rng, self.rollout_turns)
+        reward = rewards(sim)
+        sim.rollback()
+        for node, move, seat in path:
+            node.visits += 1
+            stats = node.stats[move]
+            stats[0] += 1
+            stats[1] += reward[seat]
+
+    def search(self, sim, time_budget=AI_TIME_BUDGET, max_iterations=None):
+        # Returns {move: [visits, total reward]} at the root
+        self.table.new_search()
+        deadline = time.perf_counter() + time_budget
+        iterations = 0
+        while time.perf_counter() < deadline and (max_iterations is None or iterations < max_iterations):
+            self.iterate(sim)
+            iterations += 1
+        return dict(self.node(sim).stats)
+
+
+def headless_copy(sim, seed):
+    # Copy of the game without its journal, with reseeded RNG streams
+    journal, sim.journal = sim.journal, None
+    try:
+        copy = pickle.loads(pickle.dumps(sim))
+    finally:
+        sim.journal = journal
+    for name in RNG_STREAMS:
+        getattr(copy, f"{name}_rng").seed(f"{seed}:{name}")
+    return copy
+
+
+def search_worker(state, seed, time_budget, max_iterations):
+    # Runs in a worker process on a pickled Simulation
+    sim = pickle.loads(state)
+    for name in RNG_STREAMS:
+        getattr(sim, f"{name}_rng").seed(f"{seed}:{name}")
+    return MCTS(seed).search(sim, time_budget, max_iterations)
+
+
+def best_move(stats):
+    # Most visited root move; ties go to the better mean reward
+    return max(stats, key=lambda move: (stats[move][0], stats[move][1] / max(stats[move][0], 1)))
+
+
+class MCTSBot:
+    def __init__(self, time_budget=AI_TIME_BUDGET, workers=AI_WORKERS, seed=None, max_iterations=None):
+        self.time_budget = time_budget
+        self.workers = workers
+        self.max_iterations = max_iterations
+        self.rng = random.Random(seed)
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.mcts = None
+
+    def choose(self, sim):
+        if self.executor is None:
+            if self.mcts is None:
+                self.mcts = MCTS(self.rng.getrandbits(64))
+            stats = self.mcts.search(headless_copy(sim, self.rng.getrandbits(64)),
+                                     self.time_budget, self.max_iterations)
+            return best_move(stats) if stats else END_TURN
+
+        journal, sim.journal = sim.journal, None
+        try:
+            state = pickle.dumps(sim)
+        finally:
+            sim.journal = journal
+        futures = [
+            self.executor.submit(search_worker, state, self.rng.getrandbits(64),
+                                 self.time_budget, self.max_iterations)
+            for _ in range(self.workers)
+        ]
+        totals = {}
+        for future in futures:
+            for move, (visits, total) in future.result().items():
+                summed = totals.setdefault(move, [0, 0.0])
+                summed[0] += visits
+                summed[1] += total
+        return best_move(totals) if totals else END_TURN
+
+    def __call__(self, sim):
+        # Policy for Simulation.play: spends the current player's turn and
+        # leaves end_turn to the caller
+        while not sim.is_over:
+            move = self.choose(sim)
+            if move == END_TURN or move not in legal_moves(sim):
+                return
+            apply_move(sim, move)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,86 @@
+import numpy as np
+from core.market import Market
+
+# Steps N independent markets at once. Every array is (worlds, sectors) in
+# the sector order of Market, except economic_cycle which is (worlds,).
+# The arithmetic mirrors Market.update/MarketSector.update operation for
+# operation so results match the scalar code exactly for the same draws.
+class BatchMarket:
+    def __init__(self, n_worlds):
+        template = Market()
+        sectors = list(template.sectors.values())
+        self.n_worlds = n_worlds
+        self.sector_names = [sector.name for sector in sectors]
+        self.sector_index = {name: i for i, name in enumerate(self.sector_names)}
+
+        self.base_price = np.array([s.base_price for s in sectors], dtype=np.float64)
+        self.base_demand = np.array([s.base_demand for s in sectors], dtype=np.float64)
+        self.min_price = self.base_price * 0.5
+        self.max_price = self.base_price * 2
+
+        shape = (n_worlds, len(sectors))
+        self.price = np.empty(shape, dtype=np.float64)
+        self.demand = np.empty(shape, dtype=np.float64)
+        self.supply = np.zeros(shape, dtype=np.float64)
+        self.price[:] = [s.current_price for s in sectors]
+        self.demand[:] = [s.current_demand for s in sectors]
+        self.economic_cycle = np.full(n_worlds, template.economic_cycle, dtype=np.int64)
+
+    @classmethod
+    def from_markets(cls, markets):
+        batch = cls(len(markets))
+        for world, market in enumerate(markets):
+            batch.load(world, market)
+        return batch
+
+    def load(self, world, market):
+        for i, name in enumerate(self.sector_names):
+            sector = market.sectors[name]
+            self.price[world, i] = sector.current_price
+            self.demand[world, i] = sector.current_demand
+            self.supply[world, i] = sector.supply
+        self.economic_cycle[world] = market.economic_cycle
+
+    def store(self, world, market):
+        for i, name in enumerate(self.sector_names):
+            sector = market.sectors[name]
+            sector.current_price = float(self.price[world, i])
+            sector.current_demand = float(self.demand[world, i])
+            sector.supply = float(self.supply[world, i])
+        market.economic_cycle = int(self.economic_cycle[world])
+
+    def random_draws(self, rng=None):
+        # Same distribution as random.randint(-5, 5) in Market.update_economic_cycle
+        rng = rng if rng is not None else np.random.default_rng()
+        return rng.integers(-5, 5, size=self.n_worlds, endpoint=True)
+
+    def update(self, draws=None, rng=None):
+        self.update_economic_cycle(draws, rng)
+
+        # Update price based on supply and demand
+        self.price += (self.demand - self.supply) / 100
+        np.minimum(self.max_price, self.price, out=self.price)
+        np.maximum(self.min_price, self.price, out=self.price)
+
+        # Update demand based on economic cycle
+        cycle_effect = (self.economic_cycle - 50) / 100
+        np.multiply(self.base_demand, (1 + cycle_effect)[:, None], out=self.demand)
+
+        # Reset supply for the next round
+        self.supply.fill(0)
+
+    def update_economic_cycle(self, draws=None, rng=None):
+        if draws is None:
+            draws = self.random_draws(rng)
+        self.economic_cycle += draws
+        np.clip(self.economic_cycle, 0, 100, out=self.economic_cycle)
+
+    def add_supply(self, sector_name, amounts):
+        # amounts is a scalar or one value per world
+        self.supply[:, self.sector_index[sector_name]] += amounts
+
+    def get_price(self, sector_name):
+        return np.round(self.price[:, self.sector_index[sector_name]], 2)
+
+    def get_demand(self, sector_name):
+        return np.round(self.demand[:, self.sector_index[sector_name]], 2)
@@ -1,5 +1,6 @@
 import pygame
 from core.config import LIGHT_BLUE, BLACK
+from core.text_cache import render_text
 
 class Button:
     def __init__(self, x, y, width, height, text, action):
@@ -10,6 +11,6 @@ class Button:
     def draw(self, screen, font):
         pygame.draw.rect(screen, LIGHT_BLUE, self.rect)
         pygame.draw.rect(screen, BLACK, self.rect, 2)
-        text_surface = font.render(self.text, True, BLACK)
+        text_surface = render_text(font, self.text, BLACK)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
\ No newline at end of file
@@ -0,0 +1,59 @@
+import numpy as np
+import pygame
+from core.config import BLACK, CHART_COLORS, GRAY, WHITE
+from core.text_cache import render_text
+
+# Price history of every sector (Market.history), drawn into an off-screen
+# surface only when a new turn has been recorded; other frames just blit
+# it. Windows longer than the plot is wide are reduced to the min and max
+# of each pixel column, so drawing costs O(width) whatever the capacity.
+class PriceChart:
+    def __init__(self, rect, series="price"):
+        self.rect = pygame.Rect(rect)
+        self.series = series
+        self.surface = None
+        self.key = None
+
+    def draw(self, screen, font, history):
+        key = (id(history), history.total)
+        if key != self.key or self.surface is None:
+            self.key = key
+            self.render(font, history)
+        screen.blit(self.surface, self.rect)
+
+    def render(self, font, history):
+        if self.surface is None:
+            self.surface = pygame.Surface(self.rect.size)
+        surface = self.surface
+        surface.fill(WHITE)
+        pygame.draw.rect(surface, GRAY, surface.get_rect(), 1)
+        sectors = [sector for sector, series in history.keys if series == self.series]
+        for i, sector in enumerate(sectors):
+            label = render_text(font, sector.capitalize(), CHART_COLORS.get(sector, BLACK))
+            surface.blit(label, (5 + i * 110, 4))
+        if len(history) < 2:
+            return
+
+        plot = surface.get_rect().inflate(-10, -30)
+        plot.top += 10
+        low = min(history.min(sector, self.series) for sector in sectors)
+        high = max(history.max(sector, self.series) for sector in sectors)
+        scale = (plot.height - 1) / (high - low) if high > low else 0.0
+        for sector in sectors:
+            points = self.points(history.view(sector, self.series), plot, low, scale)
+            pygame.draw.lines(surface, CHART_COLORS.get(sector, BLACK), False, points)
+
+    def points(self, values, plot, low, scale):
+        # Polyline through the window; above one value per column it
+        # zig-zags between each column's max and min
+        n = len(values)
+        if n <= plot.width:
+            xs = plot.left + np.arange(n) * (plot.width - 1) // max(n - 1, 1)
+            ys = plot.bottom - 1 - (values - low) * scale
+            return np.column_stack([xs, ys]).tolist()
+        starts = np.arange(plot.width) * n // plot.width
+        highs = np.maximum.reduceat(values, starts)
+        lows = np.minimum.reduceat(values, starts)
+        xs = np.repeat(plot.left + np.arange(plot.width), 2)
+        ys = plot.bottom - 1 - (np.column_stack([highs, lows]).ravel() - low) * scale
+        return np.column_stack([xs, ys]).tolist()
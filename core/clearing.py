@@ -0,0 +1,75 @@
+import numpy as np
+
+# Uniform-price call auction for one sector. Every sell and buy intent of a
+# turn is collected first; all trades then happen at one clearing price,
+# so the result does not depend on the order the intents came in.
+#
+# Sells sorted by rising limit form the supply curve and buys sorted by
+# falling limit the demand curve. Excess demand only falls as the price
+# rises, so the crossing is found by binary search over the candidate
+# prices (the distinct limits). The price is whichever of the two
+# candidates around the crossing trades more, then leaves less imbalance.
+# At that price the short side fills completely and the long side is
+# filled in price and then arrival priority.
+
+
+def clear_sector(sell_limits, sell_quantities, buy_limits, buy_quantities):
+    # Returns (price, sell_fills, buy_fills) with fills in input order;
+    # price is None when nothing trades
+    sell_limits = np.asarray(sell_limits, dtype=np.float64)
+    sell_quantities = np.asarray(sell_quantities, dtype=np.float64)
+    buy_limits = np.asarray(buy_limits, dtype=np.float64)
+    buy_quantities = np.asarray(buy_quantities, dtype=np.float64)
+    sell_fills = np.zeros_like(sell_quantities)
+    buy_fills = np.zeros_like(buy_quantities)
+    if not len(sell_limits) or not len(buy_limits):
+        return None, sell_fills, buy_fills
+
+    sell_order = np.argsort(sell_limits, kind="stable")
+    buy_order = np.argsort(-buy_limits, kind="stable")
+    ask_limits = sell_limits[sell_order]
+    ask_quantities = sell_quantities[sell_order]
+    asks = np.cumsum(ask_quantities)
+    bid_limits = -buy_limits[buy_order]  # ascending, for searchsorted
+    bid_quantities = buy_quantities[buy_order]
+    bids = np.cumsum(bid_quantities)
+
+    def supply(price):
+        n = np.searchsorted(ask_limits, price, side="right")
+        return asks[n - 1] if n else 0.0
+
+    def demand(price):
+        n = np.searchsorted(bid_limits, -price, side="right")
+        return bids[n - 1] if n else 0.0
+
+    prices = np.unique(np.concatenate([sell_limits, buy_limits]))
+    # Last candidate where demand still covers supply
+    low, high = 0, len(prices)
+    while low < high:
+        mid = (low + high) // 2
+        if demand(prices[mid]) >= supply(prices[mid]):
+            low = mid + 1
+        else:
+            high = mid
+    best = None
+    for i in (low - 1, low):
+        if 0 <= i < len(prices):
+            d, s = demand(prices[i]), supply(prices[i])
+            key = (min(d, s), -abs(d - s))
+            if best is None or key > best[0]:
+                best = (key, prices[i])
+    (volume, _), price = best
+    if volume <= 0:
+        return None, sell_fills, buy_fills
+
+    # Each intent fills whatever of the volume is left after everything
+    # ahead of it in priority
+    sell_fills[sell_order] = fill(volume, asks, ask_quantities)
+    buy_fills[buy_order] = fill(volume, bids, bid_quantities)
+    return float(price), sell_fills, buy_fills
+
+
+def fill(volume, cumulative, quantities):
+    # Intents entirely inside the volume fill exactly, free of rounding
+    before = np.concatenate([[0.0], cumulative[:-1]])
+    return np.where(cumulative <= volume, quantities, np.clip(volume - before, 0, quantities))
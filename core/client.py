@@ -0,0 +1,153 @@
+import socket
+import threading
+from core import journal as actions
+from core import protocol
+from core.config import CLIENT_TIMEOUT, SERVER_HOST, SERVER_PORT
+from core.history import MarketHistory
+from core.save import RECORD, StateDecoder
+from core.simulation import Simulation
+
+# Thin client for core.server. RemoteSimulation stands in for the
+# Simulation behind core.game.Game: reads go to a mirror rebuilt from the
+# server's state updates, actions are sent to the server instead of being
+# applied. A background thread receives the updates and calls on_change,
+# which Game points at notify_state_changed to wake its event loop.
+
+
+class SessionMirror:
+    def __init__(self):
+        self.decoder = StateDecoder()
+        self.simulation = Simulation()
+        self.history = MarketHistory(self.simulation.market.sectors)
+        self.seat = None
+        self.errors = []
+
+    def receive(self, kind, payload):
+        # Returns True when the mirrored state changed
+        if kind == protocol.STATE:
+            record, _, _ = RECORD.unpack_from(payload, 0)
+            self.decoder.apply(record, payload, RECORD.size)
+            previous_turn = self.simulation.turn if self.simulation.players else None
+            simulation = self.decoder.simulation()
+            # The server does not send history, so the mirror records its own
+            if simulation.turn != previous_turn:
+                self.history.record([
+                    value
+                    for sector in simulation.market.sectors.values()
+                    for value in (sector.current_price, sector.current_demand, sector.supply,
+                                  simulation.market.economic_cycle)
+                ])
+            simulation.market.history = self.history
+            self.simulation = simulation
+            return True
+        if kind == protocol.WELCOME:
+            self.seat = protocol.unpack_welcome(payload)
+        elif kind == protocol.ERROR:
+            self.errors.append(protocol.unpack_error(payload))
+        return False
+
+
+class RemoteSimulation:
+    def __init__(self, session, host=SERVER_HOST, port=SERVER_PORT, simultaneous=False, on_change=None):
+        self.mirror = SessionMirror()
+        self.on_change = on_change
+        self.changed = threading.Condition()
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.receiver = threading.Thread(target=self.receive_loop, daemon=True)
+        self.receiver.start()
+        self.socket.sendall(protocol.join(session, simultaneous))
+
+    def __getattr__(self, name):
+        # Everything that is not an action reads the mirrored game
+        return getattr(self.mirror.simulation, name)
+
+    def receive_loop(self):
+        decoder = protocol.FrameDecoder(max_frame=None)
+        while True:
+            try:
+                data = self.socket.recv(1 << 16)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            for kind, payload in decoder.feed(data):
+                with self.changed:
+                    changed = self.mirror.receive(kind, payload)
+                    self.changed.notify_all()
+                if kind == protocol.ERROR:
+                    print(f"Server: {self.mirror.errors[-1]}")
+                if changed and self.on_change is not None:
+                    self.on_change()
+
+    def send(self, action, *args):
+        self.socket.sendall(protocol.action(action, *args))
+
+    def close(self):
+        # shutdown also wakes the receiver thread blocked in recv
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+
+    @property
+    def seat(self):
+        return self.mirror.seat
+
+    def add_player(self, faction_name):
+        # Waits until the server has seated this client and sent a state
+        # that includes it
+        self.send(actions.ADD_PLAYER, faction_name)
+        with self.changed:
+            self.changed.wait_for(lambda: self.seat is not None and len(self.players) > self.seat,
+                                  CLIENT_TIMEOUT)
+        return self.players[self.seat] if self.seat is not None and len(self.players) > self.seat else None
+
+    def produce(self):
+        self.send(actions.PRODUCE)
+        return []
+
+    def research(self, tech=None):
+        if tech is None:
+            self.send(actions.RESEARCH)
+        else:
+            self.send(actions.RESEARCH_TECH, tech)
+
+    def influence_politics(self, politician=None):
+        if politician is None:
+            self.send(actions.POLITICS)
+        else:
+            self.send(actions.BRIBE, politician)
+
+    def list_goods(self, product_type, quantity, price):
+        if quantity <= 0:
+            return False
+        self.send(actions.LIST, product_type, quantity, price)
+        return True
+
+    def bid_for_goods(self, product_type, quantity, price):
+        self.send(actions.BID, product_type, quantity, price)
+        return True
+
+    def sell_at_market(self, product_type, quantity):
+        if quantity <= 0:
+            return False
+        self.send(actions.SELL, product_type, quantity)
+        return True
+
+    def cancel_order(self, order):
+        self.send(actions.CANCEL, order.product_type, order.order_id)
+        return True
+
+    def upgrade_factory(self, factory):
+        # factory may belong to a mirror that has since been replaced
+        try:
+            index = self.players[self.seat].factories.index(factory)
+        except (TypeError, ValueError):
+            return False
+        self.send(actions.UPGRADE, index)
+        return True
+
+    def end_turn(self):
+        self.send(actions.END_TURN)
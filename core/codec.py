@@ -0,0 +1,55 @@
+import struct
+
+# Shared struct helpers for the binary save and journal formats. Values
+# carry a one-byte type tag so ints and floats keep their type. Numbers are
+# fixed-size; ints beyond 64 bits, strings and None (as in seeds and event
+# data) are the rarer, variable-size cases.
+U8 = struct.Struct("<B")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+INT_VALUE = struct.Struct("<Bq")
+FLOAT_VALUE = struct.Struct("<Bd")
+INT, FLOAT, BIG_INT, STR, NONE = 0, 1, 2, 3, 4
+VALUE_SIZE = INT_VALUE.size
+INT64_MIN, INT64_MAX = -1 << 63, (1 << 63) - 1
+
+
+def pack_value(value):
+    if type(value) is int:
+        if INT64_MIN <= value <= INT64_MAX:
+            return INT_VALUE.pack(INT, value)
+        encoded = value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+        return U8.pack(BIG_INT) + U16.pack(len(encoded)) + encoded
+    if type(value) is str:
+        return U8.pack(STR) + pack_str(value)
+    if value is None:
+        return U8.pack(NONE)
+    return FLOAT_VALUE.pack(FLOAT, value)
+
+
+def unpack_value(data, offset):
+    kind = data[offset]
+    if kind == INT:
+        return INT_VALUE.unpack_from(data, offset)[1], offset + VALUE_SIZE
+    if kind == FLOAT:
+        return FLOAT_VALUE.unpack_from(data, offset)[1], offset + VALUE_SIZE
+    if kind == BIG_INT:
+        length = U16.unpack_from(data, offset + 1)[0]
+        offset += 1 + U16.size
+        return int.from_bytes(data[offset:offset + length], "little", signed=True), offset + length
+    if kind == STR:
+        return unpack_str(data, offset + 1)
+    if kind == NONE:
+        return None, offset + 1
+    raise ValueError(f"Unknown value tag {kind}")
+
+
+def pack_str(text):
+    encoded = text.encode("utf-8")
+    return U16.pack(len(encoded)) + encoded
+
+
+def unpack_str(data, offset):
+    length = U16.unpack_from(data, offset)[0]
+    offset += U16.size
+    return bytes(data[offset:offset + length]).decode("utf-8"), offset + length
@@ -11,4 +11,94 @@ LIGHT_BLUE = (173, 216, 230)
 
 # Game constants
 MAX_TURNS = 10
-ACTIONS_PER_TURN = 3
\ No newline at end of file
+ACTIONS_PER_TURN = 3
+# Seats filled through the faction selection screen
+PLAYER_COUNT = 2
+
+# Largest quantity tabulated by core.economics.CostTable; costs beyond it
+# fall back to the formula
+ECONOMICS_MAX_QUANTITY = 1000
+
+# Turns between random economic events (utils.events); 0 disables them and
+# 2 gives one per round of a two-player game, as in game_demo
+RANDOM_EVENT_INTERVAL = 0
+
+# Turns of price, demand, supply and economic cycle kept per market sector
+# (core.history), and the span of their exponential moving averages
+HISTORY_CAPACITY = 512
+HISTORY_EMA_SPAN = 10
+
+# Politics (core.politics): the regions, politicians per region, what a
+# bribe costs before the faction's multiplier and the influence it buys,
+# the influence beyond which a player can no longer bribe, the share of its
+# influence a player caught in a scandal loses, and turns between votes on
+# regulations
+POLITICS_REGIONS = ("Capital", "Industrial Belt", "Coast", "Farmland")
+POLITICIANS_PER_REGION = 10
+POLITICS_BRIBE_COST = 50
+POLITICS_BRIBE_INFLUENCE = 10
+POLITICS_INFLUENCE_CAP = 50
+POLITICS_SCANDAL_LOSS = 0.5
+POLITICS_VOTE_INTERVAL = 5
+
+# MCTS bots (core.ai): thinking time per move in seconds, worker processes
+# for root-parallel search, transposition table slots, and how many turns a
+# random playout runs before the position is scored
+AI_TIME_BUDGET = 1.0
+AI_WORKERS = 1
+AI_TABLE_SIZE = 1 << 16
+AI_PROTECT_VISITS = 8
+AI_EXPLORATION = 1.4
+AI_ROLLOUT_TURNS = 6
+# Seats played by bots in the pygame UI
+AI_SEATS = ()
+
+# Game server (core.server): address, seconds between batched state
+# updates, the largest frame a client may send, how much unsent output a
+# slow client may build up before it is dropped, seats per session and how
+# many sessions clients may open on one server
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7777
+SERVER_TICK = 0.05
+SERVER_MAX_FRAME = 1 << 16
+SERVER_MAX_BUFFER = 1 << 20
+SERVER_SEATS = PLAYER_COUNT
+SERVER_MAX_SESSIONS = 1000
+# Sharded hosting (core.shard): worker processes (None for one per core),
+# points per worker on the hash ring, how far above the average a worker's
+# sessions or turns per second may go before new sessions skip it, the
+# queue depth that also marks it busy, and seconds between load reports
+SHARD_WORKERS = None
+SHARD_REPLICAS = 64
+SHARD_LOAD_FACTOR = 0.25
+SHARD_MAX_QUEUE = 256
+SHARD_REPORT_INTERVAL = 1.0
+# Seconds a thin client waits for the server to seat it
+CLIENT_TIMEOUT = 5.0
+
+# Rendering
+TEXT_CACHE_SIZE = 512
+DEBUG_OVERLAY_RECT = (SCREEN_WIDTH - 330, 10, 320, 200)
+# Price history chart on the main view, with a line color per sector
+CHART_RECT = (430, 140, 340, 180)
+CHART_COLORS = {"raw": (160, 82, 45), "manufactured": (70, 110, 180), "luxury": (180, 60, 140)}
+
+# Event loop: block until input instead of polling at 60 FPS. A timeout > 0
+# (milliseconds) also wakes the loop periodically for animations.
+IDLE_BLOCKING = True
+IDLE_TIMEOUT_MS = 0
+
+# Saves: a full checkpoint is written at least every this many turns
+SAVE_CHECKPOINT_INTERVAL = 50
+AUTOSAVE_PATH = None
+
+# When set, every action of a UI game is journaled to this file so the game
+# can be replayed headlessly with core.journal.replay
+JOURNAL_PATH = None
+
+# Phase timing (see utils.metrics). F3 toggles the on-screen overlay, which
+# also turns timing on. With a dump path the summary is written as JSON, or
+# CSV for a .csv path, every METRICS_DUMP_INTERVAL seconds.
+METRICS_ENABLED = False
+METRICS_DUMP_PATH = None
+METRICS_DUMP_INTERVAL = 10
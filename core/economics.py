@@ -0,0 +1,132 @@
+import numpy as np
+from core.config import ECONOMICS_MAX_QUANTITY
+
+# Production economics for the quadratic cost model
+#
+#     total cost TC(q) = fixed + variable * q + increasing * q^2 / 2
+#
+# with costs given per good as {"fixed", "variable", "increasing"} (the
+# production_costs layout of game_demo). Total and marginal costs are
+# tabulated once per good for q = 0..max_quantity; the marginal cost of
+# the q-th unit is TC(q) - TC(q - 1), and the fixed cost counts as the
+# "marginal cost" of q = 0.
+#
+# Producing nothing costs nothing, so every optimizer compares its best
+# q >= 1 with q = 0.
+
+
+class CostTable:
+    def __init__(self, production_costs, max_quantity=ECONOMICS_MAX_QUANTITY):
+        self.goods = list(production_costs)
+        self.index = {good: i for i, good in enumerate(self.goods)}
+        self.max_quantity = max_quantity
+        self.fixed = np.array([production_costs[g]["fixed"] for g in self.goods], dtype=np.float64)
+        self.variable = np.array([production_costs[g]["variable"] for g in self.goods], dtype=np.float64)
+        self.increasing = np.array([production_costs[g]["increasing"] for g in self.goods], dtype=np.float64)
+
+        q = np.arange(max_quantity + 1, dtype=np.float64)
+        # (goods, max_quantity + 1)
+        self.total = self.fixed[:, None] + self.variable[:, None] * q + self.increasing[:, None] * q * q / 2
+        self.marginal = np.empty_like(self.total)
+        self.marginal[:, 0] = self.fixed
+        self.marginal[:, 1:] = np.diff(self.total, axis=1)
+
+    def good_index(self, good):
+        return good if isinstance(good, (int, np.integer)) else self.index[good]
+
+    def total_cost(self, good, quantity):
+        i = self.good_index(good)
+        if 0 <= quantity <= self.max_quantity and quantity == int(quantity):
+            return float(self.total[i, int(quantity)])
+        return float(self.fixed[i] + self.variable[i] * quantity + self.increasing[i] * quantity * quantity / 2)
+
+    def marginal_cost(self, good, quantity):
+        i = self.good_index(good)
+        if 0 <= quantity <= self.max_quantity:
+            return float(self.marginal[i, quantity])
+        return float(self.variable[i] + self.increasing[i] * (2 * quantity - 1) / 2)
+
+    def profit(self, good, quantity, price):
+        return price * quantity - self.total_cost(good, quantity) if quantity else 0.0
+
+    def best_quantity(self, good, price, cap=None):
+        # Profit-maximizing whole quantity at a fixed price, up to cap
+        quantities = self.best_quantities([self.good_index(good)], [price], None if cap is None else [cap])
+        return int(quantities[0])
+
+    def best_quantities(self, goods, prices, caps=None):
+        # Batched best_quantity: goods (indices), prices and caps are
+        # equal-length arrays, one entry per (player, good) decision.
+        #
+        # The q-th unit pays off while price >= variable + increasing *
+        # (2q - 1) / 2, so the best q >= 1 is floor((price - variable) /
+        # increasing + 1/2), clipped to [1, cap]; it is kept only if it
+        # beats producing nothing.
+        goods = np.asarray(goods, dtype=np.intp)
+        prices = np.asarray(prices, dtype=np.float64)
+        caps = np.full(len(goods), self.max_quantity) if caps is None else np.asarray(caps, dtype=np.int64)
+        variable = self.variable[goods]
+        increasing = self.increasing[goods]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unbounded = np.floor((prices - variable) / increasing + 0.5)
+        # Constant marginal cost: all or nothing
+        unbounded = np.where(increasing > 0, unbounded, np.where(prices > variable, caps, 0))
+        quantities = np.clip(unbounded, 1, np.maximum(caps, 1)).astype(np.int64)
+        profits = prices * quantities - self.batch_total_cost(goods, quantities)
+        return np.where((profits > 0) & (caps > 0), quantities, 0)
+
+    def batch_total_cost(self, goods, quantities):
+        goods = np.asarray(goods, dtype=np.intp)
+        quantities = np.asarray(quantities)
+        in_table = quantities <= self.max_quantity
+        if in_table.all():
+            return self.total[goods, quantities]
+        return (self.fixed[goods] + self.variable[goods] * quantities
+                + self.increasing[goods] * quantities * quantities / 2)
+
+    def best_quantity_for_schedule(self, good, schedule, cap=None):
+        # Profit-maximizing quantity when units sell down a demand schedule,
+        # [(price, demand), ...] with falling prices, as in
+        # game_demo.execute_sale
+        prices = np.array([[price for price, _ in schedule]], dtype=np.float64)
+        demands = np.array([[demand for _, demand in schedule]], dtype=np.int64)
+        quantities = self.best_quantities_for_schedules([self.good_index(good)], prices, demands,
+                                                        None if cap is None else [cap])
+        return int(quantities[0])
+
+    def best_quantities_for_schedules(self, goods, prices, demands, caps=None):
+        # Batched schedule optimizer. prices and demands are (n, tiers)
+        # arrays; pad short schedules with zero demand. Marginal revenue
+        # only falls and marginal cost only rises, so the last unit worth
+        # making is found by binary search on marginal revenue >= marginal
+        # cost, run for all rows at once.
+        goods = np.asarray(goods, dtype=np.intp)
+        prices = np.asarray(prices, dtype=np.float64)
+        bounds = np.cumsum(demands, axis=1)
+        sellable = bounds[:, -1]
+        caps = sellable if caps is None else np.minimum(np.asarray(caps, dtype=np.int64), sellable)
+        caps = np.minimum(caps, self.max_quantity)
+        rows = np.arange(len(goods))
+
+        def marginal_revenue(q):
+            tier = np.minimum((bounds < q[:, None]).sum(axis=1), prices.shape[1] - 1)
+            return prices[rows, tier]
+
+        # Invariant: unit low is worth making (or low = 1), unit high + 1 is not
+        low = np.ones(len(goods), dtype=np.int64)
+        high = np.maximum(caps, 1)
+        while (low < high).any():
+            mid = (low + high + 1) // 2
+            worth = marginal_revenue(mid) >= self.marginal[goods, mid]
+            low = np.where(worth, mid, low)
+            high = np.where(worth, high, mid - 1)
+
+        revenue = self.schedule_revenue(prices, bounds, low)
+        profits = revenue - self.total[goods, low]
+        return np.where((profits > 0) & (caps > 0), low, 0)
+
+    def schedule_revenue(self, prices, bounds, quantities):
+        # Revenue from selling quantities down each schedule row
+        starts = np.concatenate([np.zeros((len(bounds), 1), dtype=bounds.dtype), bounds[:, :-1]], axis=1)
+        sold = np.clip(quantities[:, None] - starts, 0, bounds - starts)
+        return (sold * prices).sum(axis=1)
@@ -13,6 +13,16 @@ class Faction:
         self.espionage_vulnerability = espionage_vulnerability
         self.buyout_power = buyout_power
 
+    def modifiers(self):
+        # The faction's source for Player.modifiers
+        return {
+            "bribery_cost": self.bribery_cost_multiplier,
+            "research_cost": self.research_cost_multiplier,
+            "research_speed": self.research_speed_multiplier,
+            "market_power": self.market_power,
+            "scandal_chance": self.scandal_chance,
+        }
+
 FACTIONS = {
     "Political Machine": Faction(
         "Political Machine",
@@ -1,11 +1,56 @@
+import numpy as np
+
+PRODUCT_TYPES = ("raw", "manufactured", "luxury")
+PRODUCT_INDEX = {name: i for i, name in enumerate(PRODUCT_TYPES)}
+
+# Fleets smaller than this keep their factories as plain objects and are
+# produced factory by factory, where the per-call overhead of NumPy would
+# outweigh the batching. Batch methods move a small fleet into arrays on
+# first use.
+FLEET_BATCH_THRESHOLD = 32
+
+
+def _field(name, to_python):
+    def get(self):
+        if self.fleet is None:
+            return self.data[name]
+        return to_python(getattr(self.fleet, name)[self.index])
+
+    def set(self, value):
+        if self.fleet is None:
+            self.data[name] = value
+        else:
+            getattr(self.fleet, name)[self.index] = value
+    return property(get, set)
+
+
+# A single factory. Once added to a FactoryFleet it becomes a view onto
+# its row of the fleet's arrays; until then it keeps its own fields.
 class Factory:
+    __slots__ = ("fleet", "index", "data")
+
     def __init__(self, product_type, production_capacity, efficiency=1.0, labor_cost=10):
-        self.product_type = product_type
-        self.production_capacity = production_capacity
-        self.efficiency = 1.0
-        self.labor_cost = 10
-        self.fixed_cost = 50
-        self.level = 1
+        self.fleet = None
+        self.index = None
+        self.data = {
+            "product": PRODUCT_INDEX[product_type],
+            "production_capacity": production_capacity,
+            "efficiency": efficiency,
+            "labor_cost": labor_cost,
+            "fixed_cost": 50,
+            "level": 1,
+        }
+
+    product = _field("product", int)
+    production_capacity = _field("production_capacity", int)
+    efficiency = _field("efficiency", float)
+    labor_cost = _field("labor_cost", int)
+    fixed_cost = _field("fixed_cost", int)
+    level = _field("level", int)
+
+    @property
+    def product_type(self):
+        return PRODUCT_TYPES[self.product]
 
     def upgrade(self):
         self.level += 1
@@ -13,4 +58,130 @@ class Factory:
         self.efficiency += 0.1
 
     def upgrade_cost(self):
-        return self.level * 100
\ No newline at end of file
+        return self.level * 100
+
+    def detach(self):
+        # Copies the fields out of the fleet so the factory stands alone
+        if self.fleet is not None:
+            self.data = {name: getattr(self, name) for name, _ in FactoryFleet.FIELDS}
+            self.fleet = None
+            self.index = None
+
+
+# Struct-of-arrays storage for all of a player's factories, so production,
+# upgrade costs and affordability run over the whole fleet in one pass.
+# Iterating or indexing yields the Factory views, which stay valid and keep
+# their identity as the fleet grows.
+class FactoryFleet:
+    FIELDS = (
+        ("product", np.int8),
+        ("production_capacity", np.int64),
+        ("efficiency", np.float64),
+        ("labor_cost", np.int64),
+        ("fixed_cost", np.int64),
+        ("level", np.int64),
+    )
+
+    def __init__(self, factories=()):
+        self.size = 0
+        self.views = []
+        self.in_arrays = False
+        for factory in factories:
+            self.append(factory)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def __getitem__(self, index):
+        return self.views[index]
+
+    def index(self, factory):
+        if not self.in_arrays:
+            return self.views.index(factory)
+        if factory.fleet is not self:
+            raise ValueError("Factory is not in this fleet")
+        return factory.index
+
+    def append(self, factory):
+        factory.detach()
+        self.views.append(factory)
+        self.size += 1
+        if self.in_arrays:
+            self.store(factory, self.size - 1)
+        elif self.size >= FLEET_BATCH_THRESHOLD:
+            self.move_to_arrays()
+
+    def move_to_arrays(self):
+        capacity = max(4, 2 * self.size)
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.in_arrays = True
+        for index, factory in enumerate(self.views):
+            self.store(factory, index)
+
+    def store(self, factory, index):
+        if index == len(self.product):
+            for name, _ in self.FIELDS:
+                array = getattr(self, name)
+                grown = np.zeros(len(array) * 2, dtype=array.dtype)
+                grown[:index] = array[:index]
+                setattr(self, name, grown)
+        for name, _ in self.FIELDS:
+            getattr(self, name)[index] = factory.data[name]
+        factory.fleet = self
+        factory.index = index
+        factory.data = None
+
+    def column(self, name):
+        if not self.in_arrays:
+            self.move_to_arrays()
+        return getattr(self, name)[:self.size]
+
+    def production_costs(self):
+        return self.column("labor_cost") + self.column("fixed_cost")
+
+    def outputs(self):
+        return self.column("production_capacity") * self.column("efficiency")
+
+    def upgrade_costs(self):
+        return self.column("level") * 100
+
+    def affordable_upgrades(self, money):
+        return self.upgrade_costs() <= money
+
+    def upgrade(self, mask):
+        # Upgrades every factory selected by a boolean mask or index array
+        self.column("level")[mask] += 1
+        self.column("production_capacity")[mask] += 2
+        self.column("efficiency")[mask] += 0.1
+
+    def produce(self, money):
+        # Same outcome as producing factory by factory in fleet order, each
+        # paying its cost if the money left covers it. Returns the boolean
+        # mask of factories that produced, the money spent and the output
+        # per product type.
+        costs = self.production_costs()
+        produced = np.zeros(self.size, dtype=bool)
+        candidates = np.arange(self.size)
+        remaining = money
+        spent = 0
+        while len(candidates):
+            # Money only goes down, so a factory that cannot be paid for now
+            # never will be. The rest are paid for in order until the running
+            # total overruns; that factory is then dropped by the next filter.
+            candidates = candidates[costs[candidates] <= remaining]
+            if not len(candidates):
+                break
+            totals = np.cumsum(costs[candidates])
+            run = int(np.searchsorted(totals, remaining, side="right"))
+            produced[candidates[:run]] = True
+            remaining -= int(totals[run - 1])
+            spent += int(totals[run - 1])
+            candidates = candidates[run:]
+
+        output = np.bincount(self.column("product")[produced], weights=self.outputs()[produced],
+                             minlength=len(PRODUCT_TYPES))
+        return produced, spent, output
@@ -0,0 +1,253 @@
+import numpy as np
+from core.factory import Factory, FactoryFleet
+from core.journal import Journal
+from core.market import Market, MarketSector, OrderBook
+from core.player import Player
+from core.politics import Politics
+from core.research import Research
+from core.rng import CounterRandom
+from core.scheduler import Leaderboard, Settlement
+from utils.events import EventScheduler
+
+# Undo trail behind Simulation.fork/rollback. Nothing is copied when a
+# fork is taken; an object is saved into the innermost fork the first time
+# it is about to change, so a fork costs O(objects changed) rather than a
+# deep copy of the game. Rolling back restores the saved objects in place,
+# which keeps every outside reference (the UI, bots, open orders) valid.
+#
+# Granularity: a player (with its inventory, technologies and modifiers),
+# market sector, factory or order book is saved whole, an order book with
+# the quantities of its orders. A player's open orders are saved per
+# product and side as plain dicts. An RNG stream is saved as its counter.
+# The market is saved with everything a turn's Market.update changes: its
+# sectors, its RNG stream and its history, so end_turn saves three objects
+# (the simulation, the market and the player whose turn starts). Market
+# history is saved by reference: a turn only writes buffer columns past the
+# saved window, until it starts a new block and copies over the first half
+# of the buffer, so Market.update saves the buffer itself then.
+#
+# An object can also be saved inside another's snapshot, e.g. a sector on
+# its own and with the market. Frames are restored newest entry first, so
+# the oldest saved state is the one that sticks.
+
+
+def snapshot_player(player):
+    # Modifier sources and tables are rebound on change, never edited
+    modifiers = player.modifiers
+    return (player.__dict__.copy(), player.inventory.copy(), list(player.technologies),
+            (modifiers.sources, modifiers.table))
+
+
+def restore_fields(obj, fields):
+    # A saved __dict__ copy is put back whole; a saved state is only ever
+    # restored once, so it can become the live one
+    obj.__dict__ = fields
+
+
+def restore_player(player, state):
+    fields, inventory, technologies, (sources, table) = state
+    player.__dict__ = fields
+    player.inventory.update(inventory)
+    player.technologies[:] = technologies
+    player.modifiers.sources, player.modifiers.table = sources, table
+
+
+def restore_dict(mapping, state):
+    mapping.clear()
+    mapping.update(state)
+
+
+def snapshot_order_book(book):
+    return (list(book.bids), list(book.asks), book.orders.copy(), book.stale,
+            [(order, order.quantity) for order in book.orders.values()])
+
+
+def restore_order_book(book, state):
+    bids, asks, orders, book.stale, quantities = state
+    book.bids[:] = bids
+    book.asks[:] = asks
+    book.orders.clear()
+    book.orders.update(orders)
+    for order, quantity in quantities:
+        order.quantity = quantity
+
+
+def snapshot_factory(factory):
+    return tuple(getattr(factory, name) for name, _ in FactoryFleet.FIELDS)
+
+
+def restore_factory(factory, state):
+    for (name, _), value in zip(FactoryFleet.FIELDS, state):
+        setattr(factory, name, value)
+
+
+def snapshot_market(market):
+    return (market.__dict__.copy(), set(market.settled_owners),
+            [(sector.current_price, sector.current_demand, sector.supply) for sector in market.sectors.values()],
+            (market.rng.counter, market.rng.gauss_next), market.history.__dict__.copy())
+
+
+def restore_market(market, state):
+    fields, settled_owners, sectors, (counter, gauss_next), history = state
+    market.__dict__ = fields
+    market.settled_owners.clear()
+    market.settled_owners.update(settled_owners)
+    for sector, (price, demand, supply) in zip(market.sectors.values(), sectors):
+        sector.current_price, sector.current_demand, sector.supply = price, demand, supply
+    market.rng.counter, market.rng.gauss_next = counter, gauss_next
+    market.history.__dict__ = history
+
+
+def snapshot_simulation(sim):
+    return sim.__dict__.copy(), list(sim.players)
+
+
+def restore_simulation(sim, state):
+    fields, players = state
+    sim.__dict__ = fields
+    sim.players[:] = players
+
+
+def snapshot_journal(journal):
+    return len(journal.entries), journal.file.tell() if journal.file else None
+
+
+def restore_journal(journal, state):
+    length, position = state
+    del journal.entries[length:]
+    if position is not None:
+        journal.file.seek(position)
+        journal.file.truncate()
+
+
+def snapshot_leaderboard(leaderboard):
+    return list(leaderboard.entries), leaderboard.keys.copy(), list(leaderboard.players)
+
+
+def restore_leaderboard(leaderboard, state):
+    entries, keys, players = state
+    leaderboard.entries[:] = entries
+    leaderboard.keys.clear()
+    leaderboard.keys.update(keys)
+    leaderboard.players[:] = players
+
+
+def snapshot_settlement(settlement):
+    return list(settlement.sales), list(settlement.orders)
+
+
+def restore_settlement(settlement, state):
+    settlement.sales[:], settlement.orders[:] = state
+
+
+def snapshot_counter_random(rng):
+    return rng.counter, rng.gauss_next
+
+
+def restore_counter_random(rng, state):
+    rng.counter, rng.gauss_next = state
+
+
+def restore_array(array, state):
+    array[...] = state
+
+
+def snapshot_politics(politics):
+    # Its dicts and arrays are replaced on change, never written to, so they
+    # are kept by reference
+    return politics.__dict__.copy(), list(politics.pending), list(politics.scandals)
+
+
+def restore_politics(politics, state):
+    fields, pending, scandals = state
+    politics.__dict__ = fields
+    politics.pending[:] = pending
+    politics.scandals[:] = scandals
+
+
+def snapshot_research(research):
+    return research.researched, research.available
+
+
+def restore_research(research, state):
+    research.researched, research.available = state
+
+
+def snapshot_events(scheduler):
+    # The heap is copied whole, so a branch that fires events pays O(pending)
+    return (scheduler.__dict__.copy(), list(scheduler.heap),
+            [(event, event.cancelled) for _, _, event in scheduler.heap])
+
+
+def restore_events(scheduler, state):
+    fields, heap, cancelled = state
+    scheduler.__dict__ = fields
+    scheduler.heap[:] = heap
+    for event, flag in cancelled:
+        event.cancelled = flag
+
+
+SNAPSHOTS = {
+    Player: (snapshot_player, restore_player),
+    dict: (dict.copy, restore_dict),
+    OrderBook: (snapshot_order_book, restore_order_book),
+    Factory: (snapshot_factory, restore_factory),
+    MarketSector: (lambda sector: sector.__dict__.copy(), restore_fields),
+    Market: (snapshot_market, restore_market),
+    CounterRandom: (snapshot_counter_random, restore_counter_random),
+    np.ndarray: (np.copy, restore_array),
+    Journal: (snapshot_journal, restore_journal),
+    Leaderboard: (snapshot_leaderboard, restore_leaderboard),
+    Settlement: (snapshot_settlement, restore_settlement),
+    EventScheduler: (snapshot_events, restore_events),
+    Research: (snapshot_research, restore_research),
+    Politics: (snapshot_politics, restore_politics),
+    # core.simulation adds Simulation, which imports this module
+}
+
+
+class Trail:
+    def __init__(self):
+        # One {id(object): (object, restore, state)} per open fork
+        self.frames = []
+
+    def __len__(self):
+        return len(self.frames)
+
+    def save(self, obj):
+        frame = self.frames[-1]
+        key = id(obj)
+        if key not in frame:
+            snapshot, restore = SNAPSHOTS[type(obj)]
+            frame[key] = (obj, restore, snapshot(obj))
+
+    def save_all(self, objects):
+        frame = self.frames[-1]
+        for obj in objects:
+            key = id(obj)
+            if key not in frame:
+                snapshot, restore = SNAPSHOTS[type(obj)]
+                frame[key] = (obj, restore, snapshot(obj))
+
+    def push(self):
+        self.frames.append({})
+        return len(self.frames)
+
+    def pop(self):
+        # Discards the innermost fork, restoring everything it saved, newest
+        # first. Returns the players among them.
+        players = []
+        for obj, restore, state in reversed(self.frames.pop().values()):
+            restore(obj, state)
+            if restore is restore_player:
+                players.append(obj)
+        return players
+
+    def merge(self):
+        # Discards the innermost fork but keeps its changes; they now belong
+        # to the fork below it, if any
+        frame = self.frames.pop()
+        if self.frames:
+            outer = self.frames[-1]
+            for key, saved in frame.items():
+                outer.setdefault(key, saved)
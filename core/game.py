@@ -1,25 +1,42 @@
 import pygame
-import random
 from core.config import *
-from core.player import Player
-from core.market import Market
+from core.ai import MCTSBot
 from core.button import Button
+from core.chart import PriceChart
 from core.faction import FACTIONS
+from core.journal import Journal
+from core.save import SaveWriter
+from core.simulation import Simulation
+from core.text_cache import render_text
+from utils.metrics import metrics
+
+# Posted by Game.notify_state_changed to wake a blocking event loop
+STATE_CHANGED = pygame.event.custom_type()
 
 class Game:
-    def __init__(self):
+    def __init__(self, autosave_path=AUTOSAVE_PATH, journal_path=JOURNAL_PATH, seed=None, ai_seats=AI_SEATS,
+                 remote=None):
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Economic Strategy Demo")
         self.font = pygame.font.Font(None, FONT_SIZE)
         self.clock = pygame.time.Clock()
 
-        self.players = []
-        self.current_player = 0
-        self.market = Market()
-        self.turn = 1
+        # Thin client mode: remote is a core.client.RemoteSimulation and the
+        # game is played and saved on the server
+        self.remote = remote
+        if remote is not None:
+            self.simulation = remote
+            remote.on_change = self.notify_state_changed
+            journal_path = autosave_path = None
+            ai_seats = ()
+        else:
+            self.simulation = Simulation(max_turns=MAX_TURNS, seed=seed)
+        if journal_path:
+            self.simulation.journal = Journal(self.simulation.seed, MAX_TURNS, path=journal_path)
+        self.autosave = SaveWriter(autosave_path) if autosave_path else None
+        self.bots = {seat: MCTSBot() for seat in ai_seats}
         self.viewing_factories = False
         self.selected_factory = None
-        self.max_turns = 10
         
         self.main_buttons = [
             Button(50, 400, 150, 50, "Produce", self.produce),
@@ -41,7 +58,6 @@ class Game:
             Button(50, 200 + i * 70, 300, 50, faction, self.select_faction)
             for i, faction in enumerate(FACTIONS.keys())
         ]    
-        self.market = Market()
         self.selected_product = None
         self.listing_price = 0
 
@@ -49,44 +65,189 @@ class Game:
             Button(50, 540, 150, 50, "List Goods", self.show_listing_menu),
             Button(220, 540, 150, 50, "Sell at Market", self.show_market_sell_menu)
         ])
+
+        # Retained-mode rendering: the view drawn last frame and the content
+        # signature of each of its regions
+        self.drawn_view = None
+        self.region_signatures = {}
+        self.price_chart = PriceChart(CHART_RECT)
+
+        self.debug_overlay = False
+        metrics.enabled = METRICS_ENABLED
+        if METRICS_DUMP_PATH:
+            metrics.enabled = True
+            metrics.dump_periodically(METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL)
+
+    # Read-only views of the simulation state used by the draw methods
+    @property
+    def players(self):
+        return self.simulation.players
+
+    @property
+    def current_player(self):
+        return self.simulation.current_player
+
+    @property
+    def market(self):
+        return self.simulation.market
+
+    @property
+    def turn(self):
+        return self.simulation.turn
+
+    @property
+    def max_turns(self):
+        return self.simulation.max_turns
     
-    def draw_game_state(self):
-        self.screen.fill(WHITE)
-        
+    def player_info_lines(self):
         player = self.players[self.current_player]
-        info_text = [
+        return (
             f"Turn {self.turn}/{self.max_turns} - {player.name}'s Turn",
             f"Money: ${player.money} (Loan: ${player.loan})",
-            f"Political Influence: {player.political_influence}",
+            f"Political Influence: {player.political_influence} "
+            f"({self.simulation.politics.controlled(self.current_player)} politicians)",
+        )
+
+    def market_info_lines(self):
+        return (
             "",
             "Market Prices and Demand:",
             f"Raw: ${self.market.sectors['raw'].get_price()} (Demand: {self.market.sectors['raw'].get_demand()})",
             f"Manufactured: ${self.market.sectors['manufactured'].get_price()} (Demand: {self.market.sectors['manufactured'].get_demand()})",
             f"Luxury: ${self.market.sectors['luxury'].get_price()} (Demand: {self.market.sectors['luxury'].get_demand()})",
             f"Economic Cycle: {self.market.economic_cycle}%"
+        )
+
+    def factory_info_lines(self):
+        player = self.players[self.current_player]
+        return tuple(
+            (
+                f"Factory {i+1}: {factory.product_type.capitalize()}",
+                f"Production: {factory.production_capacity} (Efficiency: {factory.efficiency:.1f})",
+                f"Level: {factory.level} (Upgrade Cost: ${factory.upgrade_cost()})"
+            )
+            for i, factory in enumerate(player.factories)
+        )
+
+    def current_view(self):
+        if not self.faction_selection_done:
+            return ("faction_selection", len(self.players))
+        if self.viewing_faction_benefits:
+            return ("faction_benefits", self.current_player)
+        if self.viewing_factories:
+            return ("factories",)
+        return ("main",)
+
+    def view_regions(self, view):
+        # (name, rect, signature) for every part of the view that can change
+        # while the view itself stays the same
+        if self.debug_overlay:
+            debug = [("debug", pygame.Rect(DEBUG_OVERLAY_RECT), self.debug_overlay_lines())]
+        else:
+            debug = []
+        if view[0] not in ("main", "factories"):
+            return debug
+        player_lines = self.player_info_lines()
+        market_lines = self.market_info_lines()
+        market_top = 50 + len(player_lines) * 30
+        regions = [
+            ("player", pygame.Rect(50, 50, SCREEN_WIDTH - 50, market_top - 50), player_lines),
+            ("market", pygame.Rect(50, market_top, SCREEN_WIDTH - 50, len(market_lines) * 30), market_lines),
         ]
+        buttons = self.main_buttons
+        if view[0] == "factories":
+            factory_lines = self.factory_info_lines()
+            regions.append(("factories", pygame.Rect(50, 50, 660, len(factory_lines) * 100), factory_lines))
+            buttons = self.factory_buttons
+        else:
+            regions.append(("chart", self.price_chart.rect, self.market.history.total))
+        panel = buttons[0].rect.unionall([button.rect for button in buttons[1:]])
+        regions.append(("buttons", panel, tuple(button.text for button in buttons)))
+        return regions + debug
+
+    def draw_view(self, view):
+        if view[0] == "faction_selection":
+            self.draw_faction_selection()
+        elif view[0] == "faction_benefits":
+            self.draw_faction_benefits()
+        else:
+            self.draw_game_state()
+        if self.debug_overlay:
+            self.draw_debug_overlay()
+
+    def debug_overlay_lines(self):
+        lines = ["phase: p50 / p95 / p99 ms"]
+        for name, stats in metrics.summary().items():
+            lines.append(f"{name}: {stats['p50'] * 1000:.2f} / {stats['p95'] * 1000:.2f} / "
+                         f"{stats['p99'] * 1000:.2f} ({stats['count']})")
+        return tuple(lines)
+
+    def draw_debug_overlay(self):
+        rect = pygame.Rect(DEBUG_OVERLAY_RECT)
+        pygame.draw.rect(self.screen, GRAY, rect)
+        for i, text in enumerate(self.debug_overlay_lines()):
+            self.screen.blit(render_text(self.font, text, BLACK), (rect.x + 5, rect.y + 5 + i * 18))
+
+    def toggle_debug_overlay(self):
+        self.debug_overlay = not self.debug_overlay
+        if self.debug_overlay:
+            metrics.enabled = True
+        self.invalidate()
+
+    def invalidate(self):
+        self.drawn_view = None
+
+    def render(self):
+        # Redraws only the regions whose content changed since the last
+        # frame and pushes just those rects to the display
+        view = self.current_view()
+        regions = self.view_regions(view)
+        if view != self.drawn_view:
+            self.drawn_view = view
+            self.region_signatures = {name: signature for name, _, signature in regions}
+            with metrics.timer("draw"):
+                self.draw_view(view)
+            with metrics.timer("flip"):
+                pygame.display.flip()
+            return
+
+        dirty_rects = []
+        for name, rect, signature in regions:
+            if self.region_signatures.get(name) != signature:
+                self.region_signatures[name] = signature
+                dirty_rects.append(rect)
+        if dirty_rects:
+            # Regions overlap in the factory view, so redraw the whole view
+            # clipped to the changed area rather than each region alone
+            with metrics.timer("draw"):
+                self.screen.set_clip(dirty_rects[0].unionall(dirty_rects[1:]))
+                self.draw_view(view)
+                self.screen.set_clip(None)
+            with metrics.timer("flip"):
+                pygame.display.update(dirty_rects)
+
+    def draw_game_state(self):
+        self.screen.fill(WHITE)
+
+        info_text = self.player_info_lines() + self.market_info_lines()
         for i, text in enumerate(info_text):
-            text_surface = self.font.render(text, True, BLACK)
+            text_surface = render_text(self.font, text, BLACK)
             self.screen.blit(text_surface, (50, 50 + i*30))
 
         if self.viewing_factories:
             self.draw_factory_view()
         else:
+            self.price_chart.draw(self.screen, self.font, self.market.history)
             for button in self.main_buttons:
                 button.draw(self.screen, self.font)
 
     def draw_factory_view(self):
         player = self.players[self.current_player]
-        for i, factory in enumerate(player.factories):
+        for i, (factory, info_text) in enumerate(zip(player.factories, self.factory_info_lines())):
             y_pos = 50 + i * 100
             pygame.draw.rect(self.screen, GRAY, (50, y_pos, 500, 80))
-            info_text = [
-                f"Factory {i+1}: {factory.product_type.capitalize()}",
-                f"Production: {factory.production_capacity} (Efficiency: {factory.efficiency:.1f})",
-                f"Level: {factory.level} (Upgrade Cost: ${factory.upgrade_cost()})"
-            ]
             for j, text in enumerate(info_text):
-                text_surface = self.font.render(text, True, BLACK)
+                text_surface = render_text(self.font, text, BLACK)
                 self.screen.blit(text_surface, (60, y_pos + 10 + j*25))
 
             select_button = Button(560, y_pos, 150, 80, "Select", lambda f=factory: self.select_factory(f))
@@ -96,13 +257,8 @@ class Game:
             button.draw(self.screen, self.font)
 
     def produce(self):
-        player = self.players[self.current_player]
-        if player.actions_left > 0:
-            for factory in player.factories:
-                if player.produce(factory, self.market):
-                    player.actions_left -= 1
-                else:
-                    print(f"Not enough money to produce in {factory.product_type} factory")
+        for factory in self.simulation.produce():
+            print(f"Not enough money to produce in {factory.product_type} factory")
 
     def show_listing_menu(self):
         self.viewing_factories = False
@@ -132,7 +288,7 @@ class Game:
         if self.selected_product and self.listing_price > 0:
             player = self.players[self.current_player]
             quantity = min(player.inventory[self.selected_product], 10)  # List up to 10 units at a time
-            if player.list_goods(self.selected_product, quantity, self.listing_price):
+            if self.simulation.list_goods(self.selected_product, quantity, self.listing_price):
                 print(f"Listed {quantity} {self.selected_product} goods at ${self.listing_price} each")
             else:
                 print("Not enough goods to list")
@@ -146,7 +302,7 @@ class Game:
     def sell_at_market(self, product_type):
         player = self.players[self.current_player]
         quantity = min(player.inventory[product_type], 10)  # Sell up to 10 units at a time
-        if player.sell_at_market_price(product_type, quantity, self.market):
+        if self.simulation.sell_at_market(product_type, quantity):
             print(f"Sold {quantity} {product_type} goods at market price")
         else:
             print("Not enough goods to sell")
@@ -156,22 +312,10 @@ class Game:
         self.market_sell_menu = False
     
     def research(self):
-        player = self.players[self.current_player]
-        if player.actions_left > 0 and len(player.technologies) < 3:
-            tech_cost = 100
-            if player.money >= tech_cost:
-                player.money -= tech_cost
-                player.technologies.append(random.choice(["Efficiency", "Marketing", "Innovation"]))
-                player.actions_left -= 1
+        self.simulation.research()
 
     def influence_politics(self):
-        player = self.players[self.current_player]
-        if player.actions_left > 0 and player.political_influence < 50:
-            bribe_cost = 50
-            if player.money >= bribe_cost:
-                player.money -= bribe_cost
-                player.political_influence += 10
-                player.actions_left -= 1
+        self.simulation.influence_politics()
 
     def toggle_factory_view(self):
         self.viewing_factories = not self.viewing_factories
@@ -182,38 +326,44 @@ class Game:
 
     def upgrade_factory(self):
         if self.selected_factory:
-            player = self.players[self.current_player]
-            if player.actions_left > 0:
-                upgrade_cost = self.selected_factory.upgrade_cost()
-                if player.money >= upgrade_cost:
-                    player.money -= upgrade_cost
-                    self.selected_factory.upgrade()
-                    player.actions_left -= 1
+            self.simulation.upgrade_factory(self.selected_factory)
 
     def end_turn(self):
-        self.current_player = 1 - self.current_player
-        self.players[self.current_player].actions_left = ACTIONS_PER_TURN
-        self.turn += 1
-        if self.turn > MAX_TURNS:
+        self.advance_turn()
+        self.play_bots()
+
+    def advance_turn(self):
+        self.simulation.end_turn()
+        if self.autosave:
+            self.autosave.record(self.simulation)
+        if self.simulation.is_over:
             self.game_over()
-        self.market.update()
-        for player in self.players:
-            player.update_listings(self.market)
+
+    def play_bots(self):
+        # Bot seats take their turns straight away; each bot thinks for up
+        # to AI_TIME_BUDGET per move
+        while not self.simulation.is_over and self.current_player in self.bots:
+            self.bots[self.current_player](self.simulation)
+            self.advance_turn()
 
     def game_over(self):
-        winner = max(self.players, key=lambda p: p.money + p.political_influence)
+        winner = self.simulation.game_over()
         print(f"Game Over! {winner.name} wins with ${winner.money} and {winner.political_influence} political influence.")
 
     def select_faction(self, faction_name):
-        if len(self.players) < 2:
-            self.players.append(Player(f"Player {len(self.players) + 1}", faction_name))
-            if len(self.players) == 2:
+        if self.remote is not None:
+            # One seat per client; the others join from their own clients
+            self.faction_selection_done = self.simulation.add_player(faction_name) is not None
+            return
+        if len(self.players) < PLAYER_COUNT:
+            self.simulation.add_player(faction_name)
+            if len(self.players) == PLAYER_COUNT:
                 self.faction_selection_done = True
-                self.current_player = 0
+                self.play_bots()
 
     def draw_faction_selection(self):
         self.screen.fill(WHITE)
-        title = self.font.render(f"Select Faction for Player {len(self.players) + 1}", True, BLACK)
+        title = render_text(self.font, f"Select Faction for Player {len(self.players) + 1}", BLACK)
         self.screen.blit(title, (50, 50))
         
         for button in self.faction_buttons:
@@ -222,14 +372,14 @@ class Game:
     def draw_faction_benefits(self):
         self.screen.fill(WHITE)
         player = self.players[self.current_player]
-        title = self.font.render(f"{player.name}'s Faction: {player.faction.name}", True, BLACK)
+        title = render_text(self.font, f"{player.name}'s Faction: {player.faction.name}", BLACK)
         self.screen.blit(title, (50, 50))
         
-        description = self.font.render(player.faction.description, True, BLACK)
+        description = render_text(self.font, player.faction.description, BLACK)
         self.screen.blit(description, (50, 100))
         
         for i, benefit in enumerate(player.faction.benefits):
-            text = self.font.render(f"• {benefit}", True, BLACK)
+            text = render_text(self.font, f"• {benefit}", BLACK)
             self.screen.blit(text, (50, 150 + i * 30))
         
         back_button = Button(50, 500, 150, 50, "Back", self.toggle_faction_benefits)
@@ -238,37 +388,65 @@ class Game:
     def toggle_faction_benefits(self):
         self.viewing_faction_benefits = not self.viewing_faction_benefits
 
-    def run(self):
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if not self.faction_selection_done:
-                        for button in self.faction_buttons:
-                            if button.rect.collidepoint(event.pos):
-                                button.action(button.text)
-                    elif self.viewing_faction_benefits:
-                        back_button = Button(50, 500, 150, 50, "Back", self.toggle_faction_benefits)
-                        if back_button.rect.collidepoint(event.pos):
-                            self.toggle_faction_benefits()
-                    elif event.type == pygame.KEYDOWN and self.listing_menu:
-                        if event.key == pygame.K_BACKSPACE:
-                            self.listing_price = self.listing_price // 10
-                        elif event.key in range(pygame.K_0, pygame.K_9 + 1):
-                            self.listing_price = self.listing_price * 10 + int(event.unicode)
-                    else:
-                        for button in self.main_buttons:
-                                if button.rect.collidepoint(event.pos):
-                                    button.action()
+    def notify_state_changed(self):
+        # Wakes a blocking run() loop so it redraws; safe to call from
+        # other threads
+        pygame.event.post(pygame.event.Event(STATE_CHANGED))
 
+    def handle_event(self, event):
+        # Returns False when the game should quit
+        if event.type == pygame.QUIT:
+            return False
+        elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.invalidate()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.toggle_debug_overlay()
+        elif event.type == pygame.MOUSEBUTTONDOWN:
             if not self.faction_selection_done:
-                self.draw_faction_selection()
+                for button in self.faction_buttons:
+                    if button.rect.collidepoint(event.pos):
+                        button.action(button.text)
             elif self.viewing_faction_benefits:
-                self.draw_faction_benefits()
+                back_button = Button(50, 500, 150, 50, "Back", self.toggle_faction_benefits)
+                if back_button.rect.collidepoint(event.pos):
+                    self.toggle_faction_benefits()
+            elif event.type == pygame.KEYDOWN and self.listing_menu:
+                if event.key == pygame.K_BACKSPACE:
+                    self.listing_price = self.listing_price // 10
+                elif event.key in range(pygame.K_0, pygame.K_9 + 1):
+                    self.listing_price = self.listing_price * 10 + int(event.unicode)
+            else:
+                for button in self.main_buttons:
+                        if button.rect.collidepoint(event.pos):
+                            button.action()
+        return True
+
+    def run(self, blocking=IDLE_BLOCKING, timeout_ms=IDLE_TIMEOUT_MS):
+        # In blocking mode the loop sleeps in pygame.event.wait until input
+        # or a notify_state_changed() arrives; timeout_ms > 0 also wakes it
+        # periodically for animations. Otherwise it polls at a fixed 60 FPS.
+        if blocking:
+            pygame.event.set_blocked(pygame.MOUSEMOTION)
+            if metrics.dump_path:
+                # Wake up for the periodic metrics dump even when idle
+                dump_ms = int(metrics.dump_interval * 1000)
+                timeout_ms = min(timeout_ms, dump_ms) if timeout_ms > 0 else dump_ms
+        while True:
+            if blocking:
+                events = [pygame.event.wait(timeout_ms)] + pygame.event.get()
             else:
-                self.draw_game_state()
+                events = pygame.event.get()
+            with metrics.timer("event_dispatch"):
+                for event in events:
+                    if not self.handle_event(event):
+                        for bot in self.bots.values():
+                            bot.close()
+                        if self.remote is not None:
+                            self.remote.close()
+                        pygame.quit()
+                        return
 
-            pygame.display.flip()
-            self.clock.tick(60)
\ No newline at end of file
+            self.render()
+            metrics.maybe_dump()
+            if not blocking:
+                self.clock.tick(60)
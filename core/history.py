@@ -0,0 +1,178 @@
+import numpy as np
+from core.config import HISTORY_CAPACITY, HISTORY_EMA_SPAN
+
+SECTOR_SERIES = ("price", "demand", "supply", "cycle")
+
+# Fixed-capacity history of many series recorded together, one value each
+# per turn; a row per key, e.g. (sector, series). Memory stays bounded
+# however long a game runs, and every statistic is kept incrementally, so
+# no query rescans the window:
+#
+#   mean and variance  Welford's update, sliding once the window is full
+#   min and max        van Herk/Gil-Werman blocks: the min/max of the block
+#                      being written plus suffix min/max of the block
+#                      before it, refreshed once per capacity records
+#   ema                exponential moving average over everything recorded
+#
+# Recording only writes one column. The statistics catch up on the values
+# recorded since they were last read, in bulk: per block of columns rather
+# than per value, and at the latest when a block of capacity values is
+# complete.
+#
+# The buffer is twice the capacity long. The block being written goes in
+# the second half; when it is complete it is copied whole into the first
+# half, so a window is always one contiguous slice, ending in the second
+# half, and view() hands it out without copying. Until then the first half
+# still holds the previous block, the values the new ones push out of the
+# window.
+class History:
+    def __init__(self, keys, capacity=HISTORY_CAPACITY, ema_span=HISTORY_EMA_SPAN):
+        self.keys = list(keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.capacity = capacity
+        self.alpha = 2 / (ema_span + 1)
+        rows = len(self.keys)
+        self.data = np.zeros((rows, 2 * capacity), dtype=np.float64)
+        self.total = 0  # values recorded per row, ever
+        self.counted = 0  # of those, how many the statistics cover
+        # Statistics arrays are replaced when they change, never written to
+        self.means = np.zeros(rows)
+        self.squares = np.zeros(rows)  # sum of squared deviations
+        self.emas = np.zeros(rows)
+        self.lows = np.zeros(rows)  # of the block being written
+        self.highs = np.zeros(rows)
+        # Of the block before; computed once the first block is complete
+        self.suffix_lows = None
+        self.suffix_highs = None
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def record(self, values):
+        # values: one per key, in key order
+        t = self.total
+        capacity = self.capacity
+        slot = t % capacity
+        if t and not slot:
+            self.catch_up()
+            self.data[:, :capacity] = self.data[:, capacity:]
+            self.refresh_suffixes()
+        self.data[:, capacity + slot] = values
+        self.total = t + 1
+
+    def catch_up(self):
+        # Folds the values recorded since the last call into the statistics.
+        # They are all in the block being written.
+        counted, capacity = self.counted, self.capacity
+        count = self.total - counted
+        if not count:
+            return
+        start = counted % capacity
+        block = self.data[:, capacity + start:capacity + start + count]
+        means = self.means
+        if counted >= capacity:
+            # The same number of values leave the window
+            evicted = self.data[:, start:start + count]
+            new_means = means + (block.sum(axis=1) - evicted.sum(axis=1)) / capacity
+            centered = means[:, None]
+            self.squares = np.maximum(
+                self.squares + ((block - centered) ** 2).sum(axis=1) - ((evicted - centered) ** 2).sum(axis=1)
+                - capacity * (new_means - means) ** 2, 0.0)
+        else:
+            # Chan et al.'s merge of the window so far with the block
+            block_means = block.mean(axis=1)
+            block_squares = ((block - block_means[:, None]) ** 2).sum(axis=1)
+            change = block_means - means
+            size = counted + count
+            new_means = means + change * count / size
+            self.squares = self.squares + block_squares + change ** 2 * counted * count / size
+        self.means = new_means
+        emas, rest = (self.emas, block) if counted else (block[:, 0], block[:, 1:])
+        decay = 1 - self.alpha
+        steps = rest.shape[1]
+        weights = self.alpha * decay ** np.arange(steps - 1, -1, -1)
+        self.emas = emas * decay ** steps + rest @ weights
+        if start:
+            self.lows = np.minimum(self.lows, block.min(axis=1))
+            self.highs = np.maximum(self.highs, block.max(axis=1))
+        else:
+            self.lows, self.highs = block.min(axis=1), block.max(axis=1)
+        self.counted = self.total
+
+    def refresh_suffixes(self):
+        # Suffix min/max over the previous block, now in the first half;
+        # only the slots after the one last written are ever read
+        block = self.data[:, self.capacity - 1::-1]
+        self.suffix_lows = np.minimum.accumulate(block, axis=1)[:, ::-1]
+        self.suffix_highs = np.maximum.accumulate(block, axis=1)[:, ::-1]
+
+    def window(self):
+        # Slice of the doubled buffer holding the window, oldest first
+        end = (self.total - 1) % self.capacity + self.capacity + 1 if self.total else self.capacity
+        return slice(end - len(self), end)
+
+    def view(self, *key):
+        # Read-only window of one row sharing memory with the buffer; copy
+        # it to keep it past the next record
+        window = self.data[self.index[key], self.window()]
+        window.flags.writeable = False
+        return window
+
+    def rows_view(self, first, count):
+        # Read-only (count, window) view of consecutive rows
+        window = self.data[first:first + count, self.window()]
+        window.flags.writeable = False
+        return window
+
+    def last(self, *key):
+        if not self.total:
+            return None
+        return float(self.data[self.index[key], (self.total - 1) % self.capacity + self.capacity])
+
+    def mean(self, *key):
+        self.catch_up()
+        return float(self.means[self.index[key]])
+
+    def variance(self, *key):
+        # Population variance of the window, as numpy's var()
+        self.catch_up()
+        return float(self.squares[self.index[key]]) / len(self) if self.total else 0.0
+
+    def std(self, *key):
+        return self.variance(*key) ** 0.5
+
+    def min(self, *key):
+        if not self.total:
+            return None
+        self.catch_up()
+        i, after = self.index[key], (self.total - 1) % self.capacity + 1
+        low = self.lows[i]
+        if after < self.capacity and self.suffix_lows is not None:
+            return float(min(low, self.suffix_lows[i, after]))
+        return float(low)
+
+    def max(self, *key):
+        if not self.total:
+            return None
+        self.catch_up()
+        i, after = self.index[key], (self.total - 1) % self.capacity + 1
+        high = self.highs[i]
+        if after < self.capacity and self.suffix_highs is not None:
+            return float(max(high, self.suffix_highs[i, after]))
+        return float(high)
+
+    def ema(self, *key):
+        self.catch_up()
+        return float(self.emas[self.index[key]])
+
+
+# Market history: the SECTOR_SERIES of every sector, recorded each
+# Market.update. A sector's rows are consecutive.
+class MarketHistory(History):
+    def __init__(self, sector_names, capacity=HISTORY_CAPACITY, ema_span=HISTORY_EMA_SPAN):
+        super().__init__([(sector, series) for sector in sector_names for series in SECTOR_SERIES],
+                         capacity, ema_span)
+
+    def sector_view(self, sector):
+        # Read-only (series, window) view of one sector, rows in SECTOR_SERIES order
+        return self.rows_view(self.index[(sector, SECTOR_SERIES[0])], len(SECTOR_SERIES))
@@ -0,0 +1,279 @@
+import struct
+from core.codec import pack_str, pack_value, unpack_str, unpack_value
+
+# Append-only log of player actions. Together with the game seed it is
+# enough to reproduce a game exactly: replay() re-executes the actions on
+# a fresh headless Simulation. The seed is a tagged value, so negative,
+# huge and string seeds round-trip.
+ADD_PLAYER = 0
+PRODUCE = 1
+RESEARCH = 2
+POLITICS = 3
+LIST = 4
+SELL = 5
+BID = 6
+CANCEL = 7
+UPGRADE = 8
+END_TURN = 9
+SEAT = 10
+RESEARCH_TECH = 11
+BRIBE = 12
+
+PRODUCTS = ("raw", "manufactured", "luxury")
+
+MAGIC = b"ECJRNL"
+JOURNAL_VERSION = 1
+PREFIX = struct.Struct("<6sH")  # magic, version
+HEADER = struct.Struct("<IB")  # after the seed: max_turns, simultaneous
+U8 = struct.Struct("<B")
+U16 = struct.Struct("<H")
+I64 = struct.Struct("<q")
+# Argument kinds per action: p = product, v = number, i = int64,
+# h = uint16, s = string
+ARGUMENTS = {
+    ADD_PLAYER: "s",   # faction name
+    LIST: "pvv",       # product, quantity, price
+    SELL: "pv",        # product, quantity
+    BID: "pvv",        # product, quantity, price
+    CANCEL: "pi",      # product, order id
+    UPGRADE: "h",      # factory index
+    SEAT: "h",         # player index
+    RESEARCH_TECH: "s",  # tech name
+    BRIBE: "i",        # politician index
+}
+
+
+def encode_action(action, args):
+    parts = [U8.pack(action)]
+    for kind, arg in zip(ARGUMENTS.get(action, ""), args):
+        if kind == "p":
+            parts.append(U8.pack(PRODUCTS.index(arg)))
+        elif kind == "v":
+            parts.append(pack_value(arg))
+        elif kind == "i":
+            parts.append(I64.pack(arg))
+        elif kind == "h":
+            parts.append(U16.pack(arg))
+        else:
+            parts.append(pack_str(arg))
+    return b"".join(parts)
+
+
+# Readers decode the arguments of one action at offset and pass them
+# straight to call, returning the offset after them; replay calls the
+# simulation without building an argument tuple per action
+def read_none(data, offset, call):
+    call()
+    return offset
+
+
+def read_str(data, offset, call):
+    value, offset = unpack_str(data, offset)
+    call(value)
+    return offset
+
+
+def read_product_value(data, offset, call):
+    value, end = unpack_value(data, offset + U8.size)
+    call(PRODUCTS[data[offset]], value)
+    return end
+
+
+def read_product_values(data, offset, call):
+    quantity, end = unpack_value(data, offset + U8.size)
+    price, end = unpack_value(data, end)
+    call(PRODUCTS[data[offset]], quantity, price)
+    return end
+
+
+def read_product_int(data, offset, call):
+    call(PRODUCTS[data[offset]], I64.unpack_from(data, offset + U8.size)[0])
+    return offset + U8.size + I64.size
+
+
+def read_u16(data, offset, call):
+    call(U16.unpack_from(data, offset)[0])
+    return offset + U16.size
+
+
+def read_int(data, offset, call):
+    call(I64.unpack_from(data, offset)[0])
+    return offset + I64.size
+
+
+READERS = {"": read_none, "s": read_str, "pv": read_product_value, "pvv": read_product_values,
+           "pi": read_product_int, "h": read_u16, "i": read_int}
+# By action code
+ACTION_READERS = tuple(READERS[ARGUMENTS.get(action, "")] for action in range(BRIBE + 1))
+
+
+def read_actions(data, offset, calls, until=None):
+    # Decodes actions from offset, calling calls[action] with the arguments
+    # of each; stops after `until` actions when given
+    end = len(data)
+    count = 0
+    readers = ACTION_READERS
+    while offset < end and count != until:
+        action = data[offset]
+        if action >= len(readers):
+            raise ValueError(f"Unknown journal action {action}")
+        offset = readers[action](data, offset + U8.size, calls[action])
+        count += 1
+    return offset
+
+
+def decode_actions(data, offset=0):
+    # [(action, args)] from concatenated encoded actions
+    entries = []
+    calls = [lambda *args, action=action: entries.append((action, args)) for action in range(len(ACTION_READERS))]
+    read_actions(data, offset, calls)
+    return entries
+
+
+def read_header(data):
+    # (seed, max_turns, simultaneous, offset of the first action)
+    magic, version = PREFIX.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a journal file")
+    if version != JOURNAL_VERSION:
+        raise ValueError(f"Unsupported journal version {version}")
+    seed, offset = unpack_value(data, PREFIX.size)
+    max_turns, simultaneous = HEADER.unpack_from(data, offset)
+    return seed, max_turns, bool(simultaneous), offset + HEADER.size
+
+
+class Journal:
+    def __init__(self, seed, max_turns, path=None, simultaneous=False):
+        self.seed = seed
+        self.max_turns = max_turns
+        self.simultaneous = simultaneous
+        self.entries = []
+        # With a path every action is also appended to the file as it happens
+        self.file = None
+        if path:
+            self.file = open(path, "wb")
+            self.file.write(self.header())
+            self.file.flush()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, action, *args):
+        self.entries.append((action, args))
+        if self.file:
+            self.file.write(encode_action(action, args))
+            self.file.flush()
+
+    def header(self):
+        return (PREFIX.pack(MAGIC, JOURNAL_VERSION) + pack_value(self.seed)
+                + HEADER.pack(self.max_turns, self.simultaneous))
+
+    def to_bytes(self):
+        return self.header() + b"".join(
+            encode_action(action, args) for action, args in self.entries
+        )
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    @classmethod
+    def from_bytes(cls, data):
+        seed, max_turns, simultaneous, offset = read_header(data)
+        journal = cls(seed, max_turns, simultaneous=simultaneous)
+        journal.entries = decode_actions(data, offset)
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def cancel_order(sim, product_type, order_id):
+    order = sim.market.order_books[product_type].orders.get(order_id)
+    # Cancelling an order that had already filled was a no-op
+    if order is not None:
+        sim.cancel_order(order)
+
+
+def upgrade_factory(sim, index):
+    sim.upgrade_factory(sim.player.factories[index])
+
+
+def action_calls(sim):
+    # What each action calls on sim, by action code
+    calls = {
+        ADD_PLAYER: sim.add_player,
+        PRODUCE: sim.produce,
+        RESEARCH: sim.research,
+        RESEARCH_TECH: sim.research,
+        POLITICS: sim.influence_politics,
+        BRIBE: sim.influence_politics,
+        LIST: sim.list_goods,
+        SELL: sim.sell_at_market,
+        BID: sim.bid_for_goods,
+        CANCEL: lambda product_type, order_id: cancel_order(sim, product_type, order_id),
+        UPGRADE: lambda index: upgrade_factory(sim, index),
+        END_TURN: sim.end_turn,
+        SEAT: sim.seat,
+    }
+    return tuple(calls[action] for action in range(len(calls)))
+
+
+def apply_action(sim, action, args):
+    if action == ADD_PLAYER:
+        sim.add_player(*args)
+    elif action == PRODUCE:
+        sim.produce()
+    elif action == RESEARCH:
+        sim.research()
+    elif action == RESEARCH_TECH:
+        sim.research(*args)
+    elif action == POLITICS:
+        sim.influence_politics()
+    elif action == BRIBE:
+        sim.influence_politics(*args)
+    elif action == LIST:
+        sim.list_goods(*args)
+    elif action == SELL:
+        sim.sell_at_market(*args)
+    elif action == BID:
+        sim.bid_for_goods(*args)
+    elif action == CANCEL:
+        cancel_order(sim, *args)
+    elif action == UPGRADE:
+        upgrade_factory(sim, *args)
+    elif action == END_TURN:
+        sim.end_turn()
+    elif action == SEAT:
+        sim.seat(args[0])
+    else:
+        raise ValueError(f"Unknown journal action {action}")
+
+
+def replay(journal, until=None):
+    # Re-executes the first `until` actions (all by default) on a fresh
+    # Simulation and returns it
+    from core.simulation import Simulation
+    sim = Simulation(max_turns=journal.max_turns, seed=journal.seed, simultaneous=journal.simultaneous)
+    calls = action_calls(sim)
+    entries = journal.entries if until is None else journal.entries[:until]
+    for action, args in entries:
+        calls[action](*args)
+    return sim
+
+
+def replay_bytes(data, until=None):
+    # replay() of an encoded journal, decoding each action straight into
+    # its call
+    from core.simulation import Simulation
+    seed, max_turns, simultaneous, offset = read_header(data)
+    sim = Simulation(max_turns=max_turns, seed=seed, simultaneous=simultaneous)
+    read_actions(data, offset, action_calls(sim), until)
+    return sim
@@ -1,24 +1,198 @@
+import heapq
 import random
+from core.history import MarketHistory
+
+BUY = "buy"
+SELL = "sell"
 
 class Market:
-    def __init__(self):
+    def __init__(self, rng=random):
+        self.rng = rng
         self.sectors = {
             "raw": MarketSector("raw", base_price=10, base_demand=50),
             "manufactured": MarketSector("manufactured", base_price=20, base_demand=30),
             "luxury": MarketSector("luxury", base_price=30, base_demand=10)
         }
         self.economic_cycle = 0  # 0 to 100, representing the economic cycle
+        self.order_books = {name: OrderBook(name) for name in self.sectors}
+        self.next_order_id = 1
+        self.history = MarketHistory(self.sectors)
+        # Owners paid or delivered to by a fill since the set was last cleared
+        self.settled_owners = set()
+        # core.fork.Trail while the owning Simulation has a fork open
+        self.trail = None
 
     def update(self):
         self.update_economic_cycle()
+        values = []
         for sector in self.sectors.values():
+            supply = sector.supply
             sector.update(self.economic_cycle)
+            values += (sector.current_price, sector.current_demand, supply, self.economic_cycle)
+        history = self.history
+        if self.trail is not None and history.total and not history.total % history.capacity:
+            # Starting a block copies over the first half of the buffer
+            self.trail.save(history.data)
+        history.record(values)
 
     def update_economic_cycle(self):
         # Simple economic cycle simulation
-        self.economic_cycle += random.randint(-5, 5)
+        self.economic_cycle += self.rng.randint(-5, 5)
         self.economic_cycle = max(0, min(100, self.economic_cycle))
 
+    def submit_order(self, owner, product_type, side, quantity, price):
+        # The owner has already escrowed the goods (sell) or money (buy)
+        book = self.order_books[product_type]
+        if self.trail is not None:
+            self.trail.save_all((self, owner, owner.open_orders(side)[product_type], book))
+        order = Order(self.next_order_id, owner, product_type, side, quantity, price)
+        self.next_order_id += 1
+        for buy_order, sell_order, filled, fill_price in book.add(order):
+            if self.trail is not None:
+                self.trail.save_all((buy_order.owner, buy_order.owner.bids[product_type],
+                                     sell_order.owner, sell_order.owner.listed_goods[product_type]))
+            buy_order.owner.settle_purchase(buy_order, filled, fill_price)
+            sell_order.owner.settle_sale(sell_order, filled, fill_price)
+            self.settled_owners.add(buy_order.owner)
+            self.settled_owners.add(sell_order.owner)
+        if order.quantity > 0:
+            owner.open_orders(side)[product_type][order.order_id] = order
+        return order
+
+    def restore_order(self, order):
+        # Re-inserts a resting order as-is, e.g. when loading a save
+        self.order_books[order.product_type].add(order)
+        order.owner.open_orders(order.side)[order.product_type][order.order_id] = order
+
+    def cancel_order(self, order):
+        if self.trail is not None:
+            self.trail.save_all((order.owner, order.owner.open_orders(order.side)[order.product_type],
+                                 self.order_books[order.product_type]))
+        if self.order_books[order.product_type].cancel(order.order_id) is None:
+            return False
+        order.owner.open_orders(order.side)[order.product_type].pop(order.order_id, None)
+        return True
+
+    def settle_listings(self):
+        # Listings priced at or below the market price are bought by the
+        # market at their asking price
+        for product_type, book in self.order_books.items():
+            sector = self.sectors[product_type]
+            if self.trail is not None:
+                ask = book.best_ask()
+                if ask is None or ask.price > sector.get_price():
+                    continue
+                self.trail.save_all((self, book, sector))
+            for order, quantity in book.fill_asks_up_to(sector.get_price()):
+                if self.trail is not None:
+                    self.trail.save_all((order.owner, order.owner.listed_goods[product_type]))
+                order.owner.settle_market_sale(order, quantity)
+                sector.add_supply(quantity)
+                self.settled_owners.add(order.owner)
+
+class Order:
+    __slots__ = ("order_id", "owner", "product_type", "side", "quantity", "price")
+
+    def __init__(self, order_id, owner, product_type, side, quantity, price):
+        self.order_id = order_id
+        self.owner = owner
+        self.product_type = product_type
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+
+# Bids and asks for one sector, kept in heaps ordered by price and then by
+# order id (arrival time). Cancels are lazy: the order leaves the index
+# immediately and its heap entry is dropped when it surfaces or when the
+# heaps are compacted.
+class OrderBook:
+    def __init__(self, product_type):
+        self.product_type = product_type
+        self.bids = []  # (-price, order_id, order)
+        self.asks = []  # (price, order_id, order)
+        self.orders = {}
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.orders)
+
+    def best_bid(self):
+        return self._top(self.bids)
+
+    def best_ask(self):
+        return self._top(self.asks)
+
+    def add(self, order):
+        # Matches the incoming order against the opposite side and rests any
+        # remainder. Returns (buy_order, sell_order, quantity, price) trades,
+        # each priced at the resting order's price.
+        trades = []
+        if order.side == BUY:
+            while order.quantity > 0:
+                ask = self._top(self.asks)
+                if ask is None or ask.price > order.price:
+                    break
+                trades.append((order, ask, self._fill(order, ask, self.asks), ask.price))
+        else:
+            while order.quantity > 0:
+                bid = self._top(self.bids)
+                if bid is None or bid.price < order.price:
+                    break
+                trades.append((bid, order, self._fill(order, bid, self.bids), bid.price))
+
+        if order.quantity > 0:
+            self.orders[order.order_id] = order
+            if order.side == BUY:
+                heapq.heappush(self.bids, (-order.price, order.order_id, order))
+            else:
+                heapq.heappush(self.asks, (order.price, order.order_id, order))
+        return trades
+
+    def cancel(self, order_id):
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            self.stale += 1
+            if self.stale > len(self.orders):
+                self._compact()
+        return order
+
+    def fill_asks_up_to(self, price):
+        # Fills every ask priced at or below price in full, best first
+        fills = []
+        while True:
+            ask = self._top(self.asks)
+            if ask is None or ask.price > price:
+                return fills
+            heapq.heappop(self.asks)
+            del self.orders[ask.order_id]
+            fills.append((ask, ask.quantity))
+            ask.quantity = 0
+
+    def _fill(self, incoming, resting, heap):
+        quantity = min(incoming.quantity, resting.quantity)
+        incoming.quantity -= quantity
+        resting.quantity -= quantity
+        if resting.quantity == 0:
+            heapq.heappop(heap)
+            del self.orders[resting.order_id]
+        return quantity
+
+    def _top(self, heap):
+        while heap:
+            order = heap[0][2]
+            if order.order_id in self.orders:
+                return order
+            heapq.heappop(heap)
+            self.stale -= 1
+        return None
+
+    def _compact(self):
+        self.bids = [entry for entry in self.bids if entry[1] in self.orders]
+        self.asks = [entry for entry in self.asks if entry[1] in self.orders]
+        heapq.heapify(self.bids)
+        heapq.heapify(self.asks)
+        self.stale = 0
+
 class MarketSector:
     def __init__(self, name, base_price, base_demand):
         self.name = name
@@ -0,0 +1,71 @@
+# Per-player modifiers. Everything that scales a player's numbers (its
+# faction, researched techs, passed regulations, events) registers a source:
+# a (kind, name) key with the multiplier it applies to each modifier it
+# touches. The sources are folded into one flat table whenever one is set
+# or removed, so hot paths such as production and selling read a single
+# precomputed value, table[name], instead of walking the sources.
+#
+# Sources only ever change through set/remove/replace, which rebind
+# sources and table rather than editing them, so a fork snapshot of a
+# player can keep both by reference.
+
+MODIFIERS = (
+    "production",      # output per unit of factory capacity
+    "trade_revenue",   # money from selling goods to the market
+    "research_cost",
+    "research_speed",
+    "bribery_cost",
+    "market_power",
+    "scandal_chance",  # per bribe; the faction's chance, scaled by the rest
+)
+
+
+class Modifiers:
+    def __init__(self):
+        self.sources = {}  # (kind, name) -> {modifier: multiplier}
+        self.table = dict.fromkeys(MODIFIERS, 1.0)
+
+    def __getitem__(self, name):
+        return self.table[name]
+
+    def set(self, source, multipliers):
+        for name in multipliers:
+            if name not in MODIFIERS:
+                raise ValueError(f"Unknown modifier {name}")
+        sources = dict(self.sources)
+        sources[source] = dict(multipliers)
+        self.compile(sources)
+
+    def remove(self, source):
+        if source in self.sources:
+            sources = dict(self.sources)
+            del sources[source]
+            self.compile(sources)
+
+    def replace(self, kind, multipliers):
+        # Swaps every source of one kind for {name: multipliers}, as when
+        # rebuilding them for a loaded game
+        sources = {source: values for source, values in self.sources.items() if source[0] != kind}
+        for name, values in multipliers.items():
+            sources[(kind, name)] = dict(values)
+        self.compile(sources)
+
+    def compile(self, sources):
+        table = dict.fromkeys(MODIFIERS, 1.0)
+        for multipliers in sources.values():
+            for name, multiplier in multipliers.items():
+                table[name] *= multiplier
+        self.sources = sources
+        self.table = table
+
+
+def split_effects(effects):
+    # (modifier effects as {name: multiplier}, the other effects)
+    modifiers = {}
+    others = []
+    for effect, amount in effects:
+        if effect in MODIFIERS:
+            modifiers[effect] = modifiers.get(effect, 1.0) * amount
+        else:
+            others.append((effect, amount))
+    return modifiers, others
@@ -1,14 +1,19 @@
 import random
-from core.factory import Factory
+from core.factory import FLEET_BATCH_THRESHOLD, PRODUCT_TYPES, Factory, FactoryFleet
 from core.faction import FACTIONS
+from core.market import BUY, SELL
+from core.modifiers import Modifiers
+from core.research import Research
 
 class Player:
     def __init__(self, name, faction_name):
         self.name = name
         self.faction = FACTIONS[faction_name]
+        self.modifiers = Modifiers()
+        self.modifiers.set(("faction", faction_name), self.faction.modifiers())
         self.money = 1000
         self.loan = 0
-        self.factories = []
+        self.factories = FactoryFleet()
         self.technologies = []
         self.political_influence = 0
         self.actions_left = 3
@@ -19,12 +24,30 @@ class Player:
             "manufactured": 0,
             "luxury": 0
         }
+        # Open orders in the market order books, keyed by order id
         self.listed_goods = {
-            "raw": [],
-            "manufactured": [],
-            "luxury": []
+            "raw": {},
+            "manufactured": {},
+            "luxury": {}
+        }
+        self.bids = {
+            "raw": {},
+            "manufactured": {},
+            "luxury": {}
         }
         self.initialize_faction_benefits()
+        self.research = Research(self)
+
+    @property
+    def factories(self):
+        return self._factories
+
+    @factories.setter
+    def factories(self, factories):
+        # Any iterable of Factory objects is stored as a FactoryFleet
+        if not isinstance(factories, FactoryFleet):
+            factories = FactoryFleet(factories)
+        self._factories = factories
 
     def initialize_faction_benefits(self):
         if self.faction.name == "Political Machine":
@@ -38,22 +61,23 @@ class Player:
             self.factories = [Factory("raw", 8, labor_cost=8), Factory("manufactured", 5, labor_cost=8)]
 
     def get_bribery_cost(self, base_cost):
-        return base_cost * self.faction.bribery_cost_multiplier
+        return base_cost * self.modifiers.table["bribery_cost"]
 
     def get_research_cost(self, base_cost):
-        return base_cost * self.faction.research_cost_multiplier
+        return base_cost * self.modifiers.table["research_cost"]
 
     def get_market_power(self):
-        return self.faction.market_power
+        return self.modifiers.table["market_power"]
 
     def advance_research(self, amount):
-        self.research_progress += amount * self.faction.research_speed_multiplier
+        self.research_progress += amount * self.modifiers.table["research_speed"]
 
-    def check_for_scandal(self):
-        return random.random() < self.faction.scandal_chance
+    def check_for_scandal(self, rng=random, bribes=1):
+        # Each bribe risks exposure on its own
+        return rng.random() < 1 - (1 - self.modifiers.table["scandal_chance"]) ** bribes
 
-    def is_espionage_successful(self):
-        return random.random() < self.faction.espionage_vulnerability * 0.1
+    def is_espionage_successful(self, rng=random):
+        return rng.random() < self.faction.espionage_vulnerability * 0.1
 
     def can_buyout_factory(self, target_factory):
         return (self.faction.buyout_power * self.money) > (target_factory.value * 1.5)
@@ -62,33 +86,79 @@ class Player:
         production_cost = factory.labor_cost + factory.fixed_cost
         if self.money >= production_cost:
             self.money -= production_cost
-            production = factory.production_capacity * factory.efficiency
+            production = factory.production_capacity * factory.efficiency * self.modifiers.table["production"]
             self.inventory[factory.product_type] += production
             return True
         return False
 
-    def list_goods(self, product_type, quantity, price):
+    def produce_all(self, market):
+        # Player.produce for every factory in order, batched over the fleet.
+        # Returns the list of flags saying which factories produced.
+        fleet = self.factories
+        if len(fleet) < FLEET_BATCH_THRESHOLD:
+            return [self.produce(factory, market) for factory in fleet]
+        produced, spent, output = fleet.produce(self.money)
+        self.money -= spent
+        output = output * self.modifiers.table["production"]
+        for product_type, amount in zip(PRODUCT_TYPES, output.tolist()):
+            if amount:
+                self.inventory[product_type] += amount
+        return produced.tolist()
+
+    def list_goods(self, product_type, quantity, price, market):
         if self.inventory[product_type] >= quantity:
             self.inventory[product_type] -= quantity
-            self.listed_goods[product_type].append((quantity, price))
+            market.submit_order(self, product_type, SELL, quantity, price)
             return True
         return False
 
+    def bid_for_goods(self, product_type, quantity, price, market):
+        cost = quantity * price
+        if self.money >= cost:
+            self.money -= cost
+            market.submit_order(self, product_type, BUY, quantity, price)
+            return True
+        return False
+
+    def cancel_order(self, order, market):
+        # The escrowed goods or money go back to the order's owner
+        if market.cancel_order(order):
+            owner = order.owner
+            if order.side == SELL:
+                owner.inventory[order.product_type] += order.quantity
+            else:
+                owner.money += order.quantity * order.price
+            return True
+        return False
+
+    def open_orders(self, side):
+        return self.bids if side == BUY else self.listed_goods
+
+    def settle_sale(self, order, quantity, price):
+        self.money += price * quantity
+        if order.quantity == 0:
+            self.listed_goods[order.product_type].pop(order.order_id, None)
+
+    def settle_market_sale(self, order, quantity):
+        # A listing bought by the market at its asking price earns the
+        # trade_revenue bonus, as a sale at the market price does
+        self.money += order.price * quantity * self.modifiers.table["trade_revenue"]
+        if order.quantity == 0:
+            self.listed_goods[order.product_type].pop(order.order_id, None)
+
+    def settle_purchase(self, order, quantity, price):
+        # The bid escrowed order.price per unit; refund any price improvement
+        self.inventory[order.product_type] += quantity
+        self.money += (order.price - price) * quantity
+        if order.quantity == 0:
+            self.bids[order.product_type].pop(order.order_id, None)
+
     def sell_at_market_price(self, product_type, quantity, market):
         if self.inventory[product_type] >= quantity:
             self.inventory[product_type] -= quantity
             price = market.sectors[product_type].get_price()
-            revenue = price * quantity
+            revenue = price * quantity * self.modifiers.table["trade_revenue"]
             self.money += revenue
             market.sectors[product_type].add_supply(quantity)
             return True
         return False
-
-    def update_listings(self, market):
-        for product_type in self.listed_goods:
-            for listing in self.listed_goods[product_type]:
-                quantity, price = listing
-                if price <= market.sectors[product_type].get_price():
-                    self.money += price * quantity
-                    market.sectors[product_type].add_supply(quantity)
-            self.listed_goods[product_type] = []
\ No newline at end of file
@@ -1,5 +1,356 @@
+import random
+import numpy as np
+from core.config import (POLITICIANS_PER_REGION, POLITICS_BRIBE_INFLUENCE, POLITICS_REGIONS,
+                         POLITICS_SCANDAL_LOSS, POLITICS_VOTE_INTERVAL)
+from core.faction import FACTIONS
+from core.modifiers import split_effects
+from core.research import EFFECTS
+
+# Politics: regions of politicians and the regulations they vote on.
+#
+# Players hold influence over few politicians, so influence is a sparse
+# matrix kept as one {politician: influence} dict per player index. Bribes
+# are queued as they are paid for and the whole turn resolves in one pass:
+#
+#   scandals  each player who bribed risks one, more likely the more it
+#             bribed (Player.check_for_scandal); a caught player's bribes
+#             this turn buy nothing and it loses POLITICS_SCANDAL_LOSS of
+#             its influence everywhere
+#   bribes    the rest are added to the matrix
+#   control   a politician follows the player with the most influence over
+#             it once that reaches the politician's integrity; only the
+#             politicians whose influence changed are re-ranked
+#   votes     every POLITICS_VOTE_INTERVAL turns the politicians of each
+#             region where control changed since the last vote vote on the
+#             regulations still pending there: as their controller's
+#             faction stands on it, or by their own leaning; a majority of
+#             the region's seats passes it for good. Elsewhere a vote would
+#             fail the same way again, so it is skipped
+#
+# Players' political_influence goes up by the influence their
+# bribes buy and down by what scandals cost them. The dicts and arrays are
+# replaced rather than changed in place, so a fork snapshot only has to
+# keep references.
+
+
+# Fewer politicians than this are re-ranked, or scored by target(), one by
+# one; a turn's handful of bribes costs less that way than in array passes,
+# whose NumPy overhead only pays off for larger batches.
+POLITICS_BATCH_THRESHOLD = 32
+# The same for the politicians polled in a vote, where each costs less
+POLITICS_VOTE_BATCH_THRESHOLD = 96
+
+
+class Regulation:
+    def __init__(self, name, region, favors=(), opposes=(), effects=(), description=""):
+        self.name = name
+        self.region = region
+        self.favors = tuple(favors)
+        self.opposes = tuple(opposes)
+        # (faction, effect name, amount): a research.EFFECTS hook applied
+        # once to that faction's players when the regulation passes, or a
+        # modifier they keep as their ("regulation", name) source
+        self.effects = tuple(effects)
+        self.changes = {}  # faction -> (modifiers, other effects)
+        for faction in {faction for faction, _, _ in self.effects}:
+            self.changes[faction] = split_effects(
+                [(effect, amount) for name, effect, amount in self.effects if name == faction])
+        self.description = description
+
+
+REGULATIONS = [
+    Regulation("Antitrust Act", "Capital", ("Technologist", "Political Machine"), ("Monopolist",),
+               [("Monopolist", "capacity", -1)], "Monopolist factories lose 1 capacity"),
+    Regulation("Research Grants", "Coast", ("Technologist",), ("Monopolist",),
+               [("Technologist", "efficiency", 0.1)], "Technologist factories produce 10% more"),
+    Regulation("Deregulation", "Industrial Belt", ("Monopolist",), ("Technologist",),
+               [("Monopolist", "fixed_cost", -10), ("Political Machine", "fixed_cost", -10)],
+               "Monopolist and Political Machine fixed costs fall by 10"),
+    Regulation("Ethics Reform", "Farmland", ("Technologist", "Monopolist"), ("Political Machine",),
+               [("Political Machine", "influence", -10)], "Political Machine loses 10 influence"),
+]
+
+
+# The politicians of a map, as arrays. The map is fixed by its seed, so a
+# saved game only has to store influence and votes.
+class PoliticalMap:
+    def __init__(self, regions=POLITICS_REGIONS, per_region=POLITICIANS_PER_REGION,
+                 regulations=REGULATIONS, seed="politics"):
+        rng = random.Random(seed)
+        self.regions = tuple(regions)
+        self.regulations = list(regulations)
+        count = len(self.regions) * per_region
+        self.region = np.repeat(np.arange(len(self.regions)), per_region)
+        # Influence a player needs before the politician follows it
+        self.integrity = np.array([rng.randint(10, 40) for _ in range(count)], dtype=np.int64)
+        # (politicians, regulations) in [-1, 1]; votes yes when positive
+        self.leaning = np.array([[rng.uniform(-1, 1) for _ in self.regulations] for _ in range(count)])
+        region_index = {name: i for i, name in enumerate(self.regions)}
+        self.venue = [region_index[regulation.region] for regulation in self.regulations]
+        # (politicians, regulations): whether the politician votes on it
+        self.voters = self.region[:, None] == np.array(self.venue, dtype=np.int64)
+        self.seats = self.voters.sum(axis=0)
+        # Per region: its politicians and the regulations they vote on
+        self.members = [np.flatnonzero(self.region == g).tolist() for g in range(len(self.regions))]
+        self.agenda = [[r for r, g in enumerate(self.venue) if g == region] for region in range(len(self.regions))]
+        self.leans = (self.leaning > 0).tolist()
+        # (factions, regulations) in {-1, 0, 1}
+        self.factions = {name: i for i, name in enumerate(FACTIONS)}
+        self.stances = np.zeros((len(self.factions), len(self.regulations)), dtype=np.int64)
+        for r, regulation in enumerate(self.regulations):
+            for name in regulation.favors:
+                self.stances[self.factions[name], r] = 1
+            for name in regulation.opposes:
+                self.stances[self.factions[name], r] = -1
+
+    def __len__(self):
+        return len(self.integrity)
+
+
+DEFAULT_MAP = None
+
+
+def default_map():
+    global DEFAULT_MAP
+    if DEFAULT_MAP is None:
+        DEFAULT_MAP = PoliticalMap()
+    return DEFAULT_MAP
+
+
 class Politics:
-    def __init__(self, players):
+    def __init__(self, players, political_map=None):
         self.players = players
-        self.scandals = []
-        self.regulations = []
\ No newline at end of file
+        self.map = political_map or default_map()
+        size = len(self.map)
+        # The same influence by row and by column
+        self.holdings = {}  # player index -> {politician: influence}
+        self.backers = {}  # politician -> {player index: influence}
+        # Bribes paid for this turn: (player index, politician, influence)
+        self.pending = []
+        self.scandals = []  # (turn, player index)
+        self.regulations = self.map.regulations
+        self.passed = np.zeros(len(self.regulations), dtype=bool)
+        self.leader = np.full(size, -1, dtype=np.int64)
+        self.lead = np.zeros(size, dtype=np.int64)
+        self.controller = np.full(size, -1, dtype=np.int64)
+        # Influence a newcomer needs to take each politician
+        self.need = np.maximum(self.map.integrity, 1).astype(np.float64)
+        # The regions with pending regulations where control changed since
+        # the last vote
+        self.stale = self.contested(range(len(self.map.regions)))
+
+    def __reduce__(self):
+        # The default map is shared, not copied with the game
+        state = self.__dict__.copy()
+        if state["map"] is DEFAULT_MAP:
+            state["map"] = None
+        return unpickle_politics, (state,)
+
+    def bribe(self, player_index, politician, influence=POLITICS_BRIBE_INFLUENCE):
+        self.pending.append((player_index, politician, influence))
+
+    def influence(self, player_index, politician):
+        return self.holdings.get(player_index, {}).get(politician, 0)
+
+    def controlled(self, player_index):
+        return int(np.count_nonzero(self.controller == player_index))
+
+    def target(self, player_index):
+        # The politician the player is closest to winning over
+        need = self.need.copy()
+        held = self.holdings.get(player_index, {})
+        if len(held) < POLITICS_BATCH_THRESHOLD:
+            leader, controller, integrity = self.leader, self.controller, self.map.integrity
+            for politician, value in held.items():
+                if controller.item(politician) == player_index:
+                    need[politician] = np.inf
+                elif leader.item(politician) == player_index:
+                    need[politician] = integrity.item(politician) - value
+                else:
+                    need[politician] -= value
+        else:
+            politicians = np.fromiter(held, np.int64, len(held))
+            values = np.fromiter(held.values(), np.float64, len(held))
+            leading = self.leader[politicians] == player_index
+            need[politicians] = np.where(leading, self.map.integrity[politicians], need[politicians]) - values
+            need[politicians[self.controller[politicians] == player_index]] = np.inf
+        return int(np.argmin(need))
+
+    def due(self, turn):
+        return bool(self.pending) or self.vote_due(turn)
+
+    def vote_due(self, turn):
+        return turn % POLITICS_VOTE_INTERVAL == 0 and bool(self.stale)
+
+    def contested(self, regions):
+        # The given regions that still have regulations pending
+        passed, agenda = self.passed, self.map.agenda
+        return frozenset(g for g in regions if not all(passed.item(r) for r in agenda[g]))
+
+    def resolve(self, turn, rng):
+        # Settles the turn's bribes, scandals and votes; returns the players
+        # that changed
+        changed = set()
+        if self.pending:
+            pending, self.pending = self.pending, []
+            counts = {}
+            for i, _, _ in pending:
+                counts[i] = counts.get(i, 0) + 1
+            caught = [i for i in sorted(counts) if self.players[i].check_for_scandal(rng, counts[i])]
+            holdings, backers = dict(self.holdings), dict(self.backers)
+            columns = set()  # inner backer dicts already copied this turn
+            for i in caught:
+                self.scandals.append((turn, i))
+                kept, lost = {}, 0
+                for politician, value in holdings.get(i, {}).items():
+                    if politician not in columns:
+                        backers[politician] = dict(backers[politician])
+                        columns.add(politician)
+                    loss = int(value * POLITICS_SCANDAL_LOSS)
+                    lost += loss
+                    if value > loss:
+                        kept[politician] = backers[politician][i] = value - loss
+                    else:
+                        del backers[politician][i]
+                holdings[i] = kept
+                self.players[i].political_influence -= lost
+            for i in counts:
+                if i not in caught:
+                    holdings[i] = dict(holdings.get(i, {}))
+            for i, politician, amount in pending:
+                if i not in caught:
+                    if politician not in columns:
+                        backers[politician] = dict(backers.get(politician, {}))
+                        columns.add(politician)
+                    held = holdings[i]
+                    held[politician] = backers[politician][i] = held.get(politician, 0) + amount
+                    self.players[i].political_influence += amount
+            self.holdings, self.backers = holdings, backers
+            if columns:
+                self.refresh(columns)
+            changed.update(self.players[i] for i in counts)
+        if self.vote_due(turn):
+            changed.update(self.vote())
+        return changed
+
+    def refresh(self, politicians=None):
+        # Re-ranks the players over the given politicians, by default all:
+        # the most influence leads, the lower player index on a tie
+        if politicians is None:
+            politicians = range(len(self.map))
+        politicians = list(politicians)
+        leaders, leads = [], []
+        for politician in politicians:
+            best, most = -1, 0
+            for i, value in self.backers.get(politician, {}).items():
+                if value > most or value == most and i < best:
+                    best, most = i, value
+            leaders.append(best)
+            leads.append(most)
+        leader, lead = self.leader.copy(), self.lead.copy()
+        integrity, region = self.map.integrity, self.map.region
+        if len(politicians) < POLITICS_BATCH_THRESHOLD:
+            controller, need = self.controller, self.need.copy()
+            moved = set()
+            for politician, best, most in zip(politicians, leaders, leads):
+                threshold = integrity.item(politician)
+                leader[politician], lead[politician] = best, most
+                follows = best if most >= threshold else -1
+                if controller.item(politician) != follows:
+                    if controller is self.controller:
+                        controller = controller.copy()
+                    controller[politician] = follows
+                    moved.add(region.item(politician))
+                need[politician] = max(threshold, most + 1)
+        else:
+            leader[politicians], lead[politicians] = leaders, leads
+            controller = np.where(lead >= integrity, leader, -1)
+            moved = set(region[controller != self.controller].tolist())
+            need = np.maximum(integrity, lead + 1).astype(np.float64)
+        if not moved <= self.stale:
+            self.stale = self.stale | self.contested(moved)
+        self.leader, self.lead, self.controller, self.need = leader, lead, controller, need
+
+    def matrix(self):
+        # The influence as sorted COO keys (player * politicians + politician)
+        # and their values
+        size = len(self.map)
+        entries = sorted((i * size + politician, value)
+                         for i, held in self.holdings.items() for politician, value in held.items())
+        array = np.array(entries, dtype=np.int64).reshape(-1, 2)
+        return array[:, 0], array[:, 1]
+
+    def set_matrix(self, keys, values):
+        size = len(self.map)
+        holdings, backers = {}, {}
+        for key, value in zip(keys.tolist(), values.tolist()):
+            holdings.setdefault(key // size, {})[key % size] = value
+            backers.setdefault(key % size, {})[key // size] = value
+        self.holdings, self.backers = holdings, backers
+        self.refresh()
+        self.stale = self.contested(range(len(self.map.regions)))
+
+    def vote(self):
+        # Votes on the pending regulations of the stale regions; returns the
+        # players affected by those that pass
+        political_map, regions = self.map, sorted(self.stale)
+        agenda = sorted(r for g in regions for r in political_map.agenda[g] if not self.passed.item(r))
+        factions = [political_map.factions[player.faction.name] for player in self.players]
+        seats = political_map.seats
+        polled = sum(len(political_map.members[political_map.venue[r]]) for r in agenda)
+        if polled < POLITICS_VOTE_BATCH_THRESHOLD:
+            controller, stances, leans = self.controller, political_map.stances, political_map.leans
+            passing = []
+            for r in agenda:
+                yes = 0
+                for politician in political_map.members[political_map.venue[r]]:
+                    seat = controller.item(politician)
+                    stance = stances.item(factions[seat], r) if seat >= 0 else 0
+                    yes += stance > 0 if stance else leans[politician][r]
+                if 2 * yes > seats.item(r):
+                    passing.append(r)
+        else:
+            votes = np.sign(political_map.leaning).astype(np.int64)
+            controlled = np.flatnonzero(self.controller >= 0)
+            stances = political_map.stances[np.array(factions, dtype=np.int64)[self.controller[controlled]]]
+            votes[controlled] = np.where(stances != 0, stances, votes[controlled])
+            yes = ((votes > 0) & political_map.voters).sum(axis=0)
+            passing = [r for r in agenda if 2 * yes.item(r) > seats.item(r)]
+        if passing:
+            passed = self.passed.copy()
+            passed[passing] = True
+            self.passed = passed
+        self.stale = frozenset()
+        changed = set()
+        for r in passing:
+            regulation = self.regulations[r]
+            for player in self.players:
+                modifiers, effects = regulation.changes.get(player.faction.name, ({}, ()))
+                if modifiers:
+                    player.modifiers.set(("regulation", regulation.name), modifiers)
+                for effect, amount in effects:
+                    EFFECTS[effect](player, amount)
+                if modifiers or effects:
+                    changed.add(player)
+        return changed
+
+    def apply_modifiers(self):
+        # Rebuilds the players' regulation modifiers from the passed
+        # regulations, as when a saved game is loaded
+        for player in self.players:
+            player.modifiers.replace("regulation", {
+                regulation.name: regulation.changes[player.faction.name][0]
+                for regulation, passed in zip(self.regulations, self.passed)
+                if passed and regulation.changes.get(player.faction.name, ({},))[0]
+            })
+
+    def passed_regulations(self):
+        return [regulation.name for regulation, passed in zip(self.regulations, self.passed) if passed]
+
+
+def unpickle_politics(state):
+    politics = Politics.__new__(Politics)
+    politics.__dict__.update(state)
+    if politics.map is None:
+        politics.map = default_map()
+    return politics
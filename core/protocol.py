@@ -0,0 +1,146 @@
+import struct
+from core.codec import U16, pack_str, unpack_str
+from core.config import SERVER_MAX_FRAME
+from core.journal import encode_action
+from core.save import RECORD
+
+# Game server wire format. Every message is a frame: FRAME (payload length,
+# message kind) followed by the payload. Actions reuse the journal encoding
+# and state updates are save-file records (RECORD header, then a checkpoint
+# or delta payload), so a client can rebuild the game with
+# core.save.StateDecoder or write the updates straight to a save file.
+FRAME = struct.Struct("<IB")
+U8 = struct.Struct("<B")
+LOAD_REPORT = struct.Struct("<IdI")  # sessions, turns per second, queue depth
+
+# Client to server
+JOIN = 1     # session name, U8 simultaneous (used when the join creates it)
+ACTION = 2   # journal-encoded actions
+# Lobby to a shard's server (core.shard); ignored unless the server was
+# started with control=True
+RESUME = 8   # session name, U16 seat: join and take the seat back after a migration
+EXPORT = 9   # session name: remove the session and reply with SESSION
+IMPORT = 10  # SESSION payload: host the session from now on; reply with LOAD
+STATS = 11   # reply with LOAD
+# Server to client
+WELCOME = 16  # U16 seat, NO_SEAT until the connection has added a player
+STATE = 17    # one save record
+ERROR = 18    # message
+# Shard server to lobby
+SESSION = 24  # session name, U16 seats, ready and departed seats (U16 count, seats), journal bytes
+LOAD = 25     # LOAD_REPORT
+
+NO_SEAT = 0xFFFF
+
+
+def frame(kind, payload=b""):
+    return FRAME.pack(len(payload), kind) + payload
+
+
+def join(session, simultaneous=False):
+    return frame(JOIN, pack_str(session) + U8.pack(simultaneous))
+
+
+def action(action, *args):
+    return frame(ACTION, encode_action(action, args))
+
+
+def welcome(seat):
+    return frame(WELCOME, U16.pack(NO_SEAT if seat is None else seat))
+
+
+def state(kind, turn, payload):
+    return frame(STATE, RECORD.pack(kind, turn, len(payload)) + payload)
+
+
+def error(message):
+    return frame(ERROR, pack_str(message))
+
+
+def resume(session, seat):
+    return frame(RESUME, pack_str(session) + U16.pack(NO_SEAT if seat is None else seat))
+
+
+def unpack_resume(payload):
+    session, offset = unpack_str(payload, 0)
+    seat = U16.unpack_from(payload, offset)[0]
+    return session, None if seat == NO_SEAT else seat
+
+
+def export(session):
+    return frame(EXPORT, pack_str(session))
+
+
+def unpack_export(payload):
+    return unpack_str(payload, 0)[0]
+
+
+def pack_seats(seats):
+    return U16.pack(len(seats)) + b"".join(U16.pack(seat) for seat in sorted(seats))
+
+
+def unpack_seats(payload, offset):
+    count = U16.unpack_from(payload, offset)[0]
+    offset += U16.size
+    seats = {U16.unpack_from(payload, offset + i * U16.size)[0] for i in range(count)}
+    return seats, offset + count * U16.size
+
+
+def session(name, seats, ready, departed, journal_bytes):
+    return frame(SESSION, pack_str(name) + U16.pack(seats) + pack_seats(ready) + pack_seats(departed)
+                 + journal_bytes)
+
+
+def unpack_session(payload):
+    # Returns (name, seats, ready, departed, journal bytes)
+    name, offset = unpack_str(payload, 0)
+    seats = U16.unpack_from(payload, offset)[0]
+    ready, offset = unpack_seats(payload, offset + U16.size)
+    departed, offset = unpack_seats(payload, offset)
+    return name, seats, ready, departed, payload[offset:]
+
+
+def load(sessions, turns_per_second, queue_depth):
+    return frame(LOAD, LOAD_REPORT.pack(sessions, turns_per_second, queue_depth))
+
+
+def unpack_load(payload):
+    return LOAD_REPORT.unpack(payload)
+
+
+def unpack_join(payload):
+    session, offset = unpack_str(payload, 0)
+    return session, bool(payload[offset])
+
+
+def unpack_welcome(payload):
+    seat = U16.unpack_from(payload, 0)[0]
+    return None if seat == NO_SEAT else seat
+
+
+def unpack_error(payload):
+    return unpack_str(payload, 0)[0]
+
+
+# Splits a byte stream into (kind, payload) frames; max_frame=None accepts
+# any length
+class FrameDecoder:
+    def __init__(self, max_frame=SERVER_MAX_FRAME):
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer += data
+        frames = []
+        offset = 0
+        while len(self.buffer) - offset >= FRAME.size:
+            length, kind = FRAME.unpack_from(self.buffer, offset)
+            if self.max_frame is not None and length > self.max_frame:
+                raise ValueError(f"Frame of {length} bytes is too large")
+            end = offset + FRAME.size + length
+            if end > len(self.buffer):
+                break
+            frames.append((kind, bytes(self.buffer[offset + FRAME.size:end])))
+            offset = end
+        del self.buffer[:offset]
+        return frames
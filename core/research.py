@@ -1,4 +1,259 @@
+from collections import deque
+import numpy as np
+from core.modifiers import MODIFIERS, split_effects
+
+# Technology trees. A tree is a DAG of techs, each with a cost, the techs it
+# requires and the effects it has once researched. Techs are numbered in
+# topological order and every set of techs is an int bitset, so
+#
+#   closure[i]    all techs tech i transitively requires, computed once
+#   can research  researched covers closure[i] and not bit i: O(1)
+#
+# A player's Research keeps its researched set and the frontier of techs
+# it can research next. Researching a tech only re-checks the techs that
+# directly require it, so availability queries never walk the tree.
+#
+# A tech's effects are either one-off changes through the EFFECTS hooks or
+# multipliers from core.modifiers, kept as the player's ("tech", name)
+# modifier source.
+#
+# Every faction has its own variant: the base techs plus the faction's own,
+# which may also replace base techs of the same name, and techs it starts
+# with. Trees are built once per faction and shared by its players.
+
+
+class Tech:
+    def __init__(self, name, cost, requires=(), effects=(), description=""):
+        self.name = name
+        self.cost = cost
+        self.requires = tuple(requires)
+        # (effect name, amount) pairs: an EFFECTS hook and its amount, or a
+        # modifier and its multiplier
+        self.effects = tuple(effects)
+        self.modifiers, self.changes = split_effects(self.effects)
+        self.description = description
+
+
+class TechTree:
+    def __init__(self, techs, starting=(), faction=None):
+        by_name = {}
+        for tech in techs:
+            by_name[tech.name] = tech
+        for tech in by_name.values():
+            for name in tech.requires:
+                if name not in by_name:
+                    raise ValueError(f"{tech.name} requires unknown tech {name}")
+            for effect, _ in tech.effects:
+                if effect not in EFFECTS and effect not in MODIFIERS:
+                    raise ValueError(f"{tech.name} has unknown effect {effect}")
+        self.faction = faction
+        self.techs = topological_order(by_name)
+        self.index = {tech.name: i for i, tech in enumerate(self.techs)}
+        self.costs = np.array([tech.cost for tech in self.techs], dtype=np.float64)
+        self.requires = []  # direct prerequisites
+        self.closure = []  # transitive prerequisites
+        self.dependents = [[] for _ in self.techs]  # techs directly requiring each
+        for i, tech in enumerate(self.techs):
+            requires = closure = 0
+            for name in tech.requires:
+                j = self.index[name]
+                requires |= 1 << j
+                closure |= self.closure[j] | 1 << j
+                self.dependents[j].append(i)
+            self.requires.append(requires)
+            self.closure.append(closure)
+        self.roots = self.bits(tech.name for tech in self.techs if not tech.requires)
+        self.starting = tuple(starting)
+
+    def __len__(self):
+        return len(self.techs)
+
+    def __reduce__(self):
+        # Faction trees are shared; a copy of a game refers to the same one
+        if self.faction is not None:
+            return tech_tree, (self.faction,)
+        return object.__reduce__(self)
+
+    def bits(self, names):
+        bits = 0
+        for name in names:
+            bits |= 1 << self.index[name]
+        return bits
+
+    def names(self, bits):
+        return [self.techs[i].name for i in indices(bits)]
+
+    def can_research(self, researched, name):
+        i = self.index[name]
+        return not researched >> i & 1 and not self.closure[i] & ~researched
+
+    def frontier(self, researched):
+        # Techs researchable from a researched set, from scratch
+        available = 0
+        for i, closure in enumerate(self.closure):
+            if not closure & ~researched:
+                available |= 1 << i
+        return available & ~researched
+
+
+def topological_order(by_name):
+    # Kahn's algorithm, keeping the given order among independent techs
+    waiting = {name: len(tech.requires) for name, tech in by_name.items()}
+    dependents = {name: [] for name in by_name}
+    for tech in by_name.values():
+        for name in tech.requires:
+            dependents[name].append(tech.name)
+    ready = deque(name for name, count in waiting.items() if not count)
+    order = []
+    while ready:
+        name = ready.popleft()
+        order.append(by_name[name])
+        for dependent in dependents[name]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                ready.append(dependent)
+    if len(order) < len(by_name):
+        raise ValueError("Tech tree has a cycle through " +
+                         ", ".join(name for name, count in waiting.items() if count))
+    return order
+
+
+def indices(bits):
+    # Set bit positions, lowest first
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+# A player's progress through its faction's tree
 class Research:
     def __init__(self, player):
         self.player = player
-        self.tech_tree = []
\ No newline at end of file
+        self.tree = tech_tree(player.faction.name)
+        self.researched = 0
+        self.available = self.tree.roots
+        for name in self.tree.starting:
+            self.complete(name)
+
+    def __contains__(self, name):
+        i = self.tree.index.get(name)
+        return i is not None and bool(self.researched >> i & 1)
+
+    def can_research(self, name):
+        i = self.tree.index.get(name)
+        return i is not None and bool(self.available >> i & 1)
+
+    def available_techs(self):
+        return self.tree.names(self.available)
+
+    def cost(self, name):
+        return self.player.get_research_cost(self.tree.techs[self.tree.index[name]].cost)
+
+    def affordable(self, money=None):
+        # Available techs the player can pay for, cheapest first
+        money = self.player.money if money is None else money
+        found = list(indices(self.available))
+        if not found:
+            return []
+        costs = self.player.get_research_cost(self.tree.costs[found])
+        return [self.tree.techs[found[i]].name for i in np.argsort(costs, kind="stable") if costs[i] <= money]
+
+    def complete(self, name):
+        # Marks the tech researched, applies its effects and opens up the
+        # techs that were only waiting on it
+        tree = self.tree
+        i = tree.index[name]
+        self.researched |= 1 << i
+        self.available &= ~(1 << i)
+        for j in tree.dependents[i]:
+            if not tree.closure[j] & ~self.researched:
+                self.available |= 1 << j
+        self.player.technologies.append(name)
+        tech = tree.techs[i]
+        if tech.modifiers:
+            self.player.modifiers.set(("tech", name), tech.modifiers)
+        for effect, amount in tech.changes:
+            EFFECTS[effect](self.player, amount)
+
+    def restore(self, names):
+        # Sets the researched techs as when a saved game is loaded: the
+        # one-off effects are already in its state, the modifiers are rebuilt
+        tree = self.tree
+        self.researched = tree.bits(names)
+        self.available = tree.frontier(self.researched)
+        self.player.technologies[:] = names
+        techs = (tree.techs[tree.index[name]] for name in names)
+        self.player.modifiers.replace("tech", {tech.name: tech.modifiers for tech in techs if tech.modifiers})
+
+
+def adjust_factories(field, low=0):
+    def apply(player, amount):
+        fleet = player.factories
+        if fleet.in_arrays:
+            column = fleet.column(field)
+            column += amount
+            np.maximum(column, low, out=column)
+        else:
+            for factory in fleet:
+                setattr(factory, field, max(low, getattr(factory, field) + amount))
+    return apply
+
+
+def add_influence(player, amount):
+    player.political_influence += amount
+
+
+# Effect hooks: effect name -> function(player, amount)
+EFFECTS = {
+    "efficiency": adjust_factories("efficiency"),
+    "capacity": adjust_factories("production_capacity"),
+    "labor_cost": adjust_factories("labor_cost"),
+    "fixed_cost": adjust_factories("fixed_cost"),
+    "influence": add_influence,
+}
+
+
+def register_effect(name, apply):
+    EFFECTS[name] = apply
+
+
+TECHS = [
+    Tech("Efficiency", 100, effects=[("efficiency", 0.1)],
+         description="Factories produce 10% more per unit of capacity"),
+    Tech("Marketing", 100, effects=[("influence", 5)], description="+5 political influence"),
+    Tech("Innovation", 100, effects=[("capacity", 1)], description="+1 capacity for every factory"),
+    Tech("Automation", 200, ["Efficiency"], [("labor_cost", -2)], "Labor costs 2 less per factory"),
+    Tech("Lean Operations", 200, ["Efficiency"], [("fixed_cost", -10)], "Fixed costs 10 less per factory"),
+    Tech("Lobbying", 150, ["Marketing"], [("influence", 10)], "+10 political influence"),
+    Tech("Mass Production", 250, ["Automation", "Innovation"], [("capacity", 2)],
+         "+2 capacity for every factory"),
+]
+
+FACTION_TECHS = {
+    "Political Machine": [
+        Tech("Patronage", 150, ["Lobbying"], [("influence", 15)], "+15 political influence"),
+    ],
+    "Technologist": [
+        Tech("Robotics", 300, ["Automation", "Innovation"], [("labor_cost", -3), ("efficiency", 0.2)],
+             "Labor costs 3 less and factories produce 20% more"),
+    ],
+    "Monopolist": [
+        Tech("Vertical Integration", 250, ["Mass Production"], [("fixed_cost", -20)],
+             "Fixed costs 20 less per factory"),
+    ],
+}
+
+STARTING_TECHS = {
+    "Technologist": ("Innovation",),
+}
+
+TECH_TREES = {}
+
+
+def tech_tree(faction_name):
+    tree = TECH_TREES.get(faction_name)
+    if tree is None:
+        tree = TECH_TREES[faction_name] = TechTree(TECHS + FACTION_TECHS.get(faction_name, []),
+                                                   STARTING_TECHS.get(faction_name, ()), faction_name)
+    return tree
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import random
+import numpy as np
+
+MASK = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+# Draws are mixed this many at a time
+BLOCK = 64
+BLOCK_OFFSETS = np.arange(BLOCK, dtype=np.uint64) * np.uint64(GOLDEN)
+MIX_SHIFTS = np.uint64(30), np.uint64(27), np.uint64(31)
+MIX_MULTIPLIERS = np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB)
+
+
+def mix(z):
+    # SplitMix64 finalizer
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK
+    return z ^ (z >> 31)
+
+
+def seed_key(seed):
+    # Strings are hashed with SHA-512, so keys are stable across processes
+    if isinstance(seed, int):
+        return mix(seed & MASK)
+    if seed is None:
+        seed = os.urandom(16)
+    if isinstance(seed, str):
+        seed = seed.encode()
+    return int.from_bytes(hashlib.sha512(seed).digest()[:8], "little")
+
+
+def mix_block(key, start):
+    # mix() of BLOCK consecutive counters from start, in uint64 arrays,
+    # whose arithmetic wraps like the & MASK above
+    z = BLOCK_OFFSETS + np.uint64((key + start * GOLDEN) & MASK)
+    z ^= z >> MIX_SHIFTS[0]
+    z *= MIX_MULTIPLIERS[0]
+    z ^= z >> MIX_SHIFTS[1]
+    z *= MIX_MULTIPLIERS[1]
+    z ^= z >> MIX_SHIFTS[2]
+    return z.tolist()
+
+
+# Counter-based random stream: the n-th 64-bit draw is a pure function of
+# (key, n), so the whole state is those two ints. A fork snapshot of the
+# stream is its counter, where a Mersenne Twister would copy 625 words out
+# and back.
+#
+# Mixing one 64-bit int at a time costs a dozen big-int operations, so
+# draws come from a cache of the BLOCK draws around the counter, mixed
+# together in numpy, and cost about as much as random.Random's. The cache
+# depends only on (key, counter), so a rollback within the block keeps it.
+#
+# Every random.Random method works on top of random() and getrandbits().
+class CounterRandom(random.Random):
+    __slots__ = ("key", "counter", "block", "cache")
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+
+    def seed(self, a=None, version=2):
+        self.key = seed_key(a)
+        self.counter = 0
+        self.gauss_next = None
+        self.block = None
+        self.cache = None
+
+    def next64(self):
+        counter = self.counter
+        self.counter = counter + 1
+        block = counter // BLOCK
+        if block != self.block:
+            self.cache = mix_block(self.key, block * BLOCK)
+            self.block = block
+        return self.cache[counter % BLOCK]
+
+    def random(self):
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+    def randint(self, a, b):
+        # random.Random.randint with the randrange layers folded in; the
+        # draws are the same
+        n = b - a + 1
+        if n <= 0:
+            raise ValueError(f"empty range for randint({a}, {b})")
+        return a + self._randbelow(n)
+
+    def _randbelow(self, n):
+        shift = 64 - n.bit_length()
+        if shift < 0:
+            return super()._randbelow(n)
+        r = self.next64() >> shift
+        while r >= n:
+            r = self.next64() >> shift
+        return r
+
+    def getrandbits(self, k):
+        if k <= 64:
+            return self.next64() >> (64 - k) if k else 0
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self.next64() << shift
+        return bits & ((1 << k) - 1)
+
+    def getstate(self):
+        return self.key, self.counter, self.gauss_next
+
+    def setstate(self, state):
+        self.key, self.counter, self.gauss_next = state
+        self.block = None
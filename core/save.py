@@ -0,0 +1,508 @@
+import heapq
+import struct
+import numpy as np
+from core.codec import INT, FLOAT, U16, U32, pack_str, pack_value, unpack_str, unpack_value
+from core.config import SAVE_CHECKPOINT_INTERVAL
+from core.factory import Factory
+from core.market import BUY, SELL, Order
+from core.player import Player
+from core.scheduler import Leaderboard
+from core.simulation import RNG_STREAMS, Simulation
+from utils.events import Event
+
+# File layout: HEADER, then records of RECORD + payload.
+#
+# A checkpoint holds the full state: the structure (players, their
+# technologies and factory types), every numeric field in a fixed order,
+# the open orders, the politics (influence, pending bribes, passed
+# regulations and scandals) and the game state the turns draw on: the
+# seed, the RNG streams, the pending events and the modifier sources events
+# gave players. A delta holds only the numeric fields that changed since
+# the previous record, the orders that were added, changed or removed, and
+# the politics and game state if they changed. A change of structure always
+# starts a new checkpoint.
+#
+# The market's price history and the fork trail are not saved: a loaded
+# game starts them empty.
+MAGIC = b"ECSAVE"
+SAVE_VERSION = 1
+HEADER = struct.Struct("<6sH")
+RECORD = struct.Struct("<cII")  # kind, turn, payload length
+CHECKPOINT = b"C"
+DELTA = b"D"
+
+INT_FIELD = struct.Struct("<IBq")
+FLOAT_FIELD = struct.Struct("<IBd")
+ORDER = struct.Struct("<qHBB")  # order id, owner index, sector index, side
+ORDER_ID = struct.Struct("<q")
+SIDES = (BUY, SELL)
+STREAM = struct.Struct("<QQ")  # key, counter of a CounterRandom
+EVENTS = struct.Struct("<IQ")  # count, next scheduling sequence
+EVENT = struct.Struct("<qQI")  # turn, sequence, repeat interval (0 for one-off)
+# Modifier source kinds a loaded game rebuilds from its faction, techs and
+# regulations rather than from the file
+REBUILT_SOURCES = ("faction", "tech", "regulation")
+
+
+def numeric_fields(sim):
+    market = sim.market
+    values = [sim.turn, sim.current_player, sim.max_turns, int(sim.simultaneous),
+              market.economic_cycle, market.next_order_id]
+    for sector in market.sectors.values():
+        values += (sector.current_price, sector.current_demand, sector.supply)
+    for player in sim.players:
+        values += (player.money, player.loan, player.political_influence,
+                   player.actions_left, player.research_progress)
+        values += player.inventory.values()
+        for factory in player.factories:
+            values += (factory.production_capacity, factory.efficiency, factory.labor_cost,
+                       factory.fixed_cost, factory.level)
+    return values
+
+
+def apply_numeric_fields(sim, values):
+    fields = iter(values)
+    market = sim.market
+    sim.turn, sim.current_player, sim.max_turns = next(fields), next(fields), next(fields)
+    sim.scheduler.simultaneous = bool(next(fields))
+    market.economic_cycle, market.next_order_id = next(fields), next(fields)
+    for sector in market.sectors.values():
+        sector.current_price, sector.current_demand, sector.supply = next(fields), next(fields), next(fields)
+    for player in sim.players:
+        player.money, player.loan, player.political_influence = next(fields), next(fields), next(fields)
+        player.actions_left, player.research_progress = next(fields), next(fields)
+        for product_type in player.inventory:
+            player.inventory[product_type] = next(fields)
+        for factory in player.factories:
+            factory.production_capacity, factory.efficiency = next(fields), next(fields)
+            factory.labor_cost, factory.fixed_cost, factory.level = next(fields), next(fields), next(fields)
+
+
+def structure(sim):
+    return tuple(
+        (player.name, player.faction.name, tuple(player.technologies),
+         tuple(factory.product_type for factory in player.factories))
+        for player in sim.players
+    )
+
+
+def open_orders(sim):
+    owners = {id(player): i for i, player in enumerate(sim.players)}
+    return {
+        order.order_id: (order.order_id, owners[id(order.owner)], sector, SIDES.index(order.side),
+                         order.quantity, order.price)
+        for sector, book in enumerate(sim.market.order_books.values())
+        for order in book.orders.values()
+    }
+
+
+def pack_structure(players):
+    parts = [U16.pack(len(players))]
+    for name, faction_name, technologies, product_types in players:
+        parts += (pack_str(name), pack_str(faction_name), U16.pack(len(technologies)))
+        parts += (pack_str(tech) for tech in technologies)
+        parts.append(U16.pack(len(product_types)))
+        parts += (pack_str(product_type) for product_type in product_types)
+    return b"".join(parts)
+
+
+def unpack_structure(data, offset):
+    players = []
+    count = U16.unpack_from(data, offset)[0]
+    offset += U16.size
+    for _ in range(count):
+        name, offset = unpack_str(data, offset)
+        faction_name, offset = unpack_str(data, offset)
+        lists = []
+        for _ in range(2):
+            length = U16.unpack_from(data, offset)[0]
+            offset += U16.size
+            items = []
+            for _ in range(length):
+                item, offset = unpack_str(data, offset)
+                items.append(item)
+            lists.append(tuple(items))
+        players.append((name, faction_name, lists[0], lists[1]))
+    return tuple(players), offset
+
+
+def pack_values(values):
+    return U32.pack(len(values)) + b"".join(pack_value(value) for value in values)
+
+
+def unpack_values(data, offset):
+    count = U32.unpack_from(data, offset)[0]
+    offset += U32.size
+    values = []
+    for _ in range(count):
+        value, offset = unpack_value(data, offset)
+        values.append(value)
+    return values, offset
+
+
+def pack_orders(orders):
+    parts = [U32.pack(len(orders))]
+    for order_id, owner, sector, side, quantity, price in orders:
+        parts += (ORDER.pack(order_id, owner, sector, side), pack_value(quantity), pack_value(price))
+    return b"".join(parts)
+
+
+def unpack_orders(data, offset):
+    count = U32.unpack_from(data, offset)[0]
+    offset += U32.size
+    orders = []
+    for _ in range(count):
+        order_id, owner, sector, side = ORDER.unpack_from(data, offset)
+        quantity, offset = unpack_value(data, offset + ORDER.size)
+        price, offset = unpack_value(data, offset)
+        orders.append((order_id, owner, sector, side, quantity, price))
+    return orders, offset
+
+
+def pack_order_changes(orders, previous):
+    removed = [order_id for order_id in previous if order_id not in orders]
+    changed = [order for order_id, order in orders.items() if previous.get(order_id) != order]
+    return (U32.pack(len(removed)) + b"".join(ORDER_ID.pack(order_id) for order_id in removed)
+            + pack_orders(changed))
+
+
+def apply_order_changes(orders, data, offset):
+    count = U32.unpack_from(data, offset)[0]
+    offset += U32.size
+    for _ in range(count):
+        del orders[ORDER_ID.unpack_from(data, offset)[0]]
+        offset += ORDER_ID.size
+    changed, offset = unpack_orders(data, offset)
+    for order in changed:
+        orders[order[0]] = order
+    return offset
+
+
+def pack_array(array):
+    # Rows of int64s, prefixed with the row count
+    return U32.pack(len(array)) + np.ascontiguousarray(array, dtype="<i8").tobytes()
+
+
+def unpack_array(data, offset, width):
+    count = U32.unpack_from(data, offset)[0]
+    offset += U32.size
+    array = np.frombuffer(data, dtype="<i8", count=count * width, offset=offset).reshape(count, width)
+    return array.astype(np.int64), offset + array.nbytes
+
+
+def pack_politics(sim):
+    # Influence as (key, value) rows, pending bribes, passed flags, scandals
+    politics = sim.politics
+    return b"".join((
+        pack_array(np.stack(politics.matrix(), axis=1)),
+        pack_array(np.array(politics.pending, dtype=np.int64).reshape(-1, 3)),
+        pack_array(politics.passed.reshape(-1, 1)),
+        pack_array(np.array(politics.scandals, dtype=np.int64).reshape(-1, 2)),
+    ))
+
+
+def unpack_politics(data, offset):
+    arrays = []
+    for width in (2, 3, 1, 2):
+        array, offset = unpack_array(data, offset, width)
+        arrays.append(array)
+    return tuple(arrays), offset
+
+
+def apply_politics(sim, arrays):
+    influence, pending, passed, scandals = arrays
+    politics = sim.politics
+    politics.passed = passed[:, 0].astype(bool)
+    politics.set_matrix(influence[:, 0], influence[:, 1])
+    politics.pending = [tuple(bribe) for bribe in pending.tolist()]
+    politics.scandals = [tuple(scandal) for scandal in scandals.tolist()]
+    politics.apply_modifiers()
+
+
+def pack_streams(sim):
+    parts = []
+    for name in RNG_STREAMS:
+        key, counter, gauss_next = getattr(sim, f"{name}_rng").getstate()
+        parts += (STREAM.pack(key, counter), pack_value(gauss_next))
+    return b"".join(parts)
+
+
+def unpack_streams(data, offset):
+    streams = []
+    for _ in RNG_STREAMS:
+        key, counter = STREAM.unpack_from(data, offset)
+        gauss_next, offset = unpack_value(data, offset + STREAM.size)
+        streams.append((key, counter, gauss_next))
+    return streams, offset
+
+
+def pack_events(scheduler):
+    # Pending events in heap order with their scheduling sequence, which
+    # breaks ties between events due the same turn; conditions are saved
+    # by their registered name
+    entries = [entry for entry in scheduler.heap if not entry[2].cancelled]
+    parts = [EVENTS.pack(len(entries), scheduler.sequence)]
+    for turn, sequence, event in entries:
+        parts += (EVENT.pack(turn, sequence, event.every or 0), pack_str(event.kind), pack_value(event.data),
+                  pack_value(event.condition))
+    return b"".join(parts)
+
+
+def unpack_events(data, offset):
+    count, sequence = EVENTS.unpack_from(data, offset)
+    offset += EVENTS.size
+    entries = []
+    for _ in range(count):
+        turn, order, every = EVENT.unpack_from(data, offset)
+        kind, offset = unpack_str(data, offset + EVENT.size)
+        event_data, offset = unpack_value(data, offset)
+        condition, offset = unpack_value(data, offset)
+        entries.append((turn, order, kind, event_data, every or None, condition))
+    return (sequence, entries), offset
+
+
+def pack_sources(sim):
+    # Per player, the modifier sources not rebuilt on load
+    parts = []
+    for player in sim.players:
+        sources = [(source, multipliers) for source, multipliers in player.modifiers.sources.items()
+                   if source[0] not in REBUILT_SOURCES]
+        parts.append(U16.pack(len(sources)))
+        for (kind, name), multipliers in sources:
+            parts += (pack_value(kind), pack_value(name), U16.pack(len(multipliers)))
+            for modifier, multiplier in multipliers.items():
+                parts += (pack_str(modifier), pack_value(multiplier))
+    return b"".join(parts)
+
+
+def unpack_sources(data, offset, players):
+    sources = []
+    for _ in range(players):
+        count = U16.unpack_from(data, offset)[0]
+        offset += U16.size
+        player = []
+        for _ in range(count):
+            kind, offset = unpack_value(data, offset)
+            name, offset = unpack_value(data, offset)
+            length = U16.unpack_from(data, offset)[0]
+            offset += U16.size
+            multipliers = {}
+            for _ in range(length):
+                modifier, offset = unpack_str(data, offset)
+                multipliers[modifier], offset = unpack_value(data, offset)
+            player.append(((kind, name), multipliers))
+        sources.append(player)
+    return sources, offset
+
+
+def pack_game_state(sim):
+    return pack_value(sim.seed) + pack_streams(sim) + pack_events(sim.events) + pack_sources(sim)
+
+
+def unpack_game_state(data, offset, players):
+    seed, offset = unpack_value(data, offset)
+    streams, offset = unpack_streams(data, offset)
+    events, offset = unpack_events(data, offset)
+    sources, offset = unpack_sources(data, offset, players)
+    return (seed, streams, events, sources), offset
+
+
+def apply_game_state(sim, state):
+    _, streams, events, sources = state
+    for name, stream in zip(RNG_STREAMS, streams):
+        getattr(sim, f"{name}_rng").setstate(stream)
+    sequence, entries = events
+    scheduler = sim.events
+    # Without cancelled entries in between the saved heap is still a heap,
+    # and heapify keeps its order
+    scheduler.heap = [(turn, order, Event(kind, event_data, every, condition))
+                      for turn, order, kind, event_data, every, condition in entries]
+    heapq.heapify(scheduler.heap)
+    scheduler.sequence = sequence
+    scheduler.live = len(entries)
+    scheduler.stale = 0
+    for player, player_sources in zip(sim.players, sources):
+        for source, multipliers in player_sources:
+            player.modifiers.set(source, multipliers)
+
+
+def pack_changes(changes):
+    parts = [U32.pack(len(changes))]
+    for index, value in changes:
+        if type(value) is int:
+            parts.append(INT_FIELD.pack(index, INT, value))
+        else:
+            parts.append(FLOAT_FIELD.pack(index, FLOAT, value))
+    return b"".join(parts)
+
+
+def apply_changes(values, data, offset):
+    count = U32.unpack_from(data, offset)[0]
+    offset += U32.size
+    for _ in range(count):
+        index = U32.unpack_from(data, offset)[0]
+        values[index], offset = unpack_value(data, offset + U32.size)
+    return offset
+
+
+# Turns successive states of one game into checkpoint and delta payloads.
+# Used by SaveWriter for save files and by core.server for state updates.
+class StateEncoder:
+    def __init__(self, checkpoint_interval=SAVE_CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+        self.structure = None
+        self.values = None
+        self.orders = None
+        self.politics = None
+        self.state = None
+        self.checkpoint_turn = None
+
+    def encode(self, sim):
+        # Returns (kind, payload) for the state now, relative to the last call
+        players = structure(sim)
+        values = numeric_fields(sim)
+        orders = open_orders(sim)
+        politics = pack_politics(sim)
+        state = pack_game_state(sim)
+        if players != self.structure or sim.turn - self.checkpoint_turn >= self.checkpoint_interval:
+            kind = CHECKPOINT
+            payload = pack_structure(players) + pack_values(values) + pack_orders(list(orders.values())) + politics + state
+            self.structure = players
+            self.checkpoint_turn = sim.turn
+        else:
+            changes = [
+                (i, value) for i, (value, old) in enumerate(zip(values, self.values))
+                if value != old or type(value) is not type(old)
+            ]
+            kind = DELTA
+            payload = pack_changes(changes) + pack_order_changes(orders, self.orders)
+            if politics != self.politics:
+                payload += b"\x01" + politics
+            else:
+                payload += b"\x00"
+            if state != self.state:
+                payload += b"\x01" + state
+            else:
+                payload += b"\x00"
+        self.values = values
+        self.orders = orders
+        self.politics = politics
+        self.state = state
+        return kind, payload
+
+    def checkpoint(self):
+        # Checkpoint payload of the state last encoded, e.g. for a newcomer
+        return (pack_structure(self.structure) + pack_values(self.values) + pack_orders(list(self.orders.values()))
+                + self.politics + self.state)
+
+    def reset(self):
+        # The next encode() writes a checkpoint
+        self.structure = None
+
+
+# Rebuilds the state from a checkpoint and the deltas after it
+class StateDecoder:
+    def __init__(self):
+        self.players = None
+        self.values = None
+        self.orders = None
+        self.politics = None
+        self.state = None
+
+    def apply(self, kind, data, offset=0):
+        if kind == CHECKPOINT:
+            self.players, offset = unpack_structure(data, offset)
+            self.values, offset = unpack_values(data, offset)
+            orders, offset = unpack_orders(data, offset)
+            self.orders = {order[0]: order for order in orders}
+            self.politics, offset = unpack_politics(data, offset)
+            self.state, offset = unpack_game_state(data, offset, len(self.players))
+        elif self.players is None:
+            raise ValueError("Delta before the first checkpoint")
+        else:
+            offset = apply_changes(self.values, data, offset)
+            offset = apply_order_changes(self.orders, data, offset)
+            if data[offset]:
+                self.politics, offset = unpack_politics(data, offset + 1)
+            else:
+                offset += 1
+            if data[offset]:
+                self.state, offset = unpack_game_state(data, offset + 1, len(self.players))
+
+    def simulation(self):
+        return build_simulation(self.players, self.values, sorted(self.orders.values()), self.politics, self.state)
+
+
+# Appends a checkpoint or a delta per call to record(); intended to be
+# called once per turn.
+class SaveWriter:
+    def __init__(self, path, checkpoint_interval=SAVE_CHECKPOINT_INTERVAL):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, SAVE_VERSION))
+        self.encoder = StateEncoder(checkpoint_interval)
+
+    def record(self, sim):
+        kind, payload = self.encoder.encode(sim)
+        self.write(kind, sim.turn, payload)
+
+    def write(self, kind, turn, payload):
+        self.file.write(RECORD.pack(kind, turn, len(payload)))
+        self.file.write(payload)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def save_game(sim, path):
+    writer = SaveWriter(path)
+    writer.record(sim)
+    writer.close()
+
+
+def read_records(data):
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a save file")
+    if version != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version {version}")
+    records = []
+    offset = HEADER.size
+    while offset < len(data):
+        kind, turn, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        records.append((kind, turn, offset))
+        offset += length
+    return records
+
+
+def load_game(path, turn=None):
+    # Restores the latest recorded state, or the last one at or before turn,
+    # starting from the nearest checkpoint and replaying deltas after it
+    with open(path, "rb") as f:
+        data = f.read()
+    records = [r for r in read_records(data) if turn is None or r[1] <= turn]
+    start = max((i for i, r in enumerate(records) if r[0] == CHECKPOINT), default=None)
+    if start is None:
+        raise ValueError("No checkpoint in save file")
+    decoder = StateDecoder()
+    for kind, _, offset in records[start:]:
+        decoder.apply(kind, data, offset)
+    return decoder.simulation()
+
+
+def build_simulation(players, values, orders, politics, state):
+    sim = Simulation(seed=state[0])
+    for name, faction_name, technologies, product_types in players:
+        player = Player(name, faction_name)
+        player.research.restore(list(technologies))
+        player.factories = [Factory(product_type, 0) for product_type in product_types]
+        sim.players.append(player)
+    apply_numeric_fields(sim, values)
+    apply_politics(sim, politics)
+    apply_game_state(sim, state)
+    sim.leaderboard = Leaderboard(sim.players)
+    sectors = list(sim.market.sectors)
+    for order_id, owner, sector, side, quantity, price in orders:
+        sim.market.restore_order(Order(order_id, sim.players[owner], sectors[sector], SIDES[side], quantity, price))
+    return sim
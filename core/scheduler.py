@@ -0,0 +1,191 @@
+import bisect
+import numpy as np
+from core.clearing import clear_sector
+from core.market import BUY, SELL
+
+
+def score(player):
+    # What Simulation.game_over ranks players by
+    return player.money + player.political_influence
+
+
+# Players ordered by score, highest first, with ties going to the earlier
+# seat as max() would. Kept as a sorted list of (-score, seat) keys: an
+# update finds the old and new positions by binary search, then deletes and
+# inserts, which shifts the entries in between. That is O(n) per update, a
+# memmove of at most n pointers, which at the seat counts games use costs less
+# than the score comparisons a rescan would make.
+class Leaderboard:
+    def __init__(self, players=()):
+        self.entries = []
+        self.keys = {}
+        self.players = []
+        for player in players:
+            self.add(player)
+
+    def __len__(self):
+        return len(self.players)
+
+    def add(self, player):
+        key = (-score(player), len(self.players))
+        self.players.append(player)
+        self.keys[player] = key
+        bisect.insort(self.entries, key)
+
+    def update(self, player):
+        old = self.keys[player]
+        key = (-score(player), old[1])
+        if key != old:
+            del self.entries[bisect.bisect_left(self.entries, old)]
+            bisect.insort(self.entries, key)
+            self.keys[player] = key
+
+    def update_all(self, players):
+        for player in players:
+            self.update(player)
+
+    def leader(self):
+        return self.players[self.entries[0][1]]
+
+    def rank(self, player):
+        # 0 for the leader
+        return bisect.bisect_left(self.entries, self.keys[player])
+
+    def standings(self, count=None):
+        # [(player, score), ...] best first
+        entries = self.entries if count is None else self.entries[:count]
+        return [(self.players[seat], -negated) for negated, seat in entries]
+
+
+# Market actions taken during a simultaneous phase. Goods or money are
+# escrowed when the action is taken, exactly as Player would, and
+# settle() resolves the whole phase in one step.
+class Settlement:
+    def __init__(self):
+        self.sales = []
+        self.orders = []
+
+    def __len__(self):
+        return len(self.sales) + len(self.orders)
+
+    def sell(self, player, product_type, quantity):
+        if player.inventory[product_type] >= quantity:
+            player.inventory[product_type] -= quantity
+            self.sales.append((player, product_type, quantity))
+            return True
+        return False
+
+    def list_goods(self, player, product_type, quantity, price):
+        if player.inventory[product_type] >= quantity:
+            player.inventory[product_type] -= quantity
+            self.orders.append((player, product_type, SELL, quantity, price))
+            return True
+        return False
+
+    def bid_for_goods(self, player, product_type, quantity, price):
+        cost = quantity * price
+        if player.money >= cost:
+            player.money -= cost
+            self.orders.append((player, product_type, BUY, quantity, price))
+            return True
+        return False
+
+    def settle(self, market):
+        # The phase's sales, listings and bids meet in one uniform-price
+        # auction per sector (see core.clearing). Sales are sells with no
+        # limit, and the sector bids for any quantity at its price from
+        # before the phase, so a sale never gets less than
+        # Player.sell_at_market_price would pay; what the sector buys is
+        # added to its supply. Unsold sales go back to inventory, and the
+        # unfilled part of a listing or bid enters the books in the order it
+        # was placed. Returns the players that were paid or filled.
+        owners = {}
+        goods = {product_type: [] for product_type in market.sectors}
+        remaining = [0.0] * len(self.orders)
+        sells = {product_type: ([], [], [], []) for product_type in market.sectors}
+        buys = {product_type: ([], [], [], []) for product_type in market.sectors}
+        for player, product_type, quantity in self.sales:
+            limits, quantities, seats, indexes = sells[product_type]
+            limits.append(0.0)
+            quantities.append(quantity)
+            seats.append(owners.setdefault(player, len(owners)))
+            indexes.append(-1)
+        for i, (player, product_type, side, quantity, price) in enumerate(self.orders):
+            limits, quantities, seats, indexes = (sells if side == SELL else buys)[product_type]
+            limits.append(price)
+            quantities.append(quantity)
+            seats.append(owners.setdefault(player, len(owners)))
+            indexes.append(i)
+
+        players = list(owners)
+        money = np.zeros(len(players))
+        revenue = np.array([player.modifiers.table["trade_revenue"] for player in players])
+        for product_type, sector in market.sectors.items():
+            sell_limits, sell_quantities, sell_seats, sell_indexes = sells[product_type]
+            sell_limits = np.array(sell_limits, dtype=np.float64)
+            sell_quantities = np.array(sell_quantities, dtype=np.float64)
+            sell_seats = np.array(sell_seats, dtype=np.intp)
+            sell_indexes = np.array(sell_indexes, dtype=np.intp)
+            buy_limits, buy_quantities, buy_seats, buy_indexes = buys[product_type]
+            # The sector's own bid comes last, behind players bidding the same
+            buy_limits = np.array(buy_limits + [sector.get_price()], dtype=np.float64)
+            buy_quantities = np.array(buy_quantities + [sell_quantities.sum()], dtype=np.float64)
+            buy_seats = np.array(buy_seats, dtype=np.intp)
+            buy_indexes = np.array(buy_indexes, dtype=np.intp)
+            price, sell_fills, buy_fills = clear_sector(sell_limits, sell_quantities, buy_limits, buy_quantities)
+            sector_fill, buy_fills = buy_fills[-1], buy_fills[:-1]
+            buy_limits, buy_quantities = buy_limits[:-1], buy_quantities[:-1]
+            if price is None:
+                price = 0.0
+            if sector_fill:
+                sector.add_supply(float(sector_fill))
+
+            # Sellers are paid the clearing price, sales to the market with
+            # their trade_revenue modifier, and buyers refunded the escrow
+            # above it, for every intent at once
+            sales = sell_indexes < 0
+            seats = np.concatenate([sell_seats, buy_seats])
+            proceeds = price * sell_fills * np.where(sales, revenue[sell_seats], 1.0)
+            amounts = np.concatenate([proceeds, (buy_limits - price) * buy_fills])
+            money += np.bincount(seats, amounts, minlength=len(players))
+            returned = np.concatenate([np.where(sales, sell_quantities - sell_fills, 0), buy_fills])
+            goods[product_type] = np.bincount(seats, returned, minlength=len(players))
+            for index, left in zip(sell_indexes[~sales], (sell_quantities - sell_fills)[~sales]):
+                remaining[index] = float(left)
+            for index, left in zip(buy_indexes, buy_quantities - buy_fills):
+                remaining[index] = float(left)
+
+        paid = set()
+        for seat, player in enumerate(players):
+            if money[seat]:
+                player.money += float(money[seat])
+                paid.add(player)
+            for product_type, amounts in goods.items():
+                if len(amounts) and amounts[seat]:
+                    player.inventory[product_type] += float(amounts[seat])
+                    paid.add(player)
+        for (player, product_type, side, _, price), quantity in zip(self.orders, remaining):
+            if quantity > 0:
+                market.submit_order(player, product_type, side, quantity, price)
+        self.sales.clear()
+        self.orders.clear()
+        return paid
+
+
+# Decides who acts when. Sequential turns rotate through the seats one
+# player per turn. In simultaneous mode every seat acts in each turn (a
+# phase), market actions are held in the Settlement, and the phase ends
+# with one batched settlement before the market updates.
+class TurnScheduler:
+    def __init__(self, simultaneous=False):
+        self.simultaneous = simultaneous
+        self.settlement = Settlement()
+
+    def next_seat(self, seat, seats):
+        return (seat + 1) % seats
+
+    def phase_seats(self, turn, seats):
+        # Seat order for a simultaneous phase. It rotates each turn so no
+        # seat always gets its orders into the books first.
+        start = turn % seats
+        return list(range(start, seats)) + list(range(start))
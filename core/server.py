@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import struct
+import sys
+import time
+from core import journal as actions
+from core import protocol
+from core.config import (MAX_TURNS, SERVER_HOST, SERVER_MAX_BUFFER, SERVER_MAX_FRAME, SERVER_MAX_SESSIONS,
+                         SERVER_PORT, SERVER_SEATS, SERVER_TICK)
+from core.faction import FACTIONS
+from core.journal import Journal, apply_action, decode_actions, replay
+from core.save import CHECKPOINT, StateEncoder
+from core.simulation import Simulation
+
+# asyncio game server. One event loop hosts any number of independent
+# sessions, each a headless Simulation with its own journal. Clients speak
+# the frames of core.protocol.
+#
+# Actions are applied as they arrive, but state goes out in batches: every
+# SERVER_TICK the sessions changed since the last tick encode one update
+# (a save-format delta, or a checkpoint when the players changed) and send
+# the same bytes to all their clients. Idle sessions cost no work per tick.
+#
+# A seat whose client leaves passes from then on: it counts as done with
+# every simultaneous phase, and a sequential game skips its turns.
+
+
+class Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        self.session = None
+        self.seat = None
+
+    def send(self, data):
+        if self.writer.is_closing():
+            return
+        self.writer.write(data)
+        # A client that stopped reading is dropped rather than buffered for
+        if self.writer.transport.get_write_buffer_size() > SERVER_MAX_BUFFER:
+            self.writer.close()
+
+
+class Session:
+    def __init__(self, name, simultaneous=False, seed=None, max_turns=MAX_TURNS, seats=SERVER_SEATS,
+                 journal=None):
+        # With a journal the session continues that game, e.g. after a migration
+        self.name = name
+        if journal is None:
+            self.sim = Simulation(max_turns=max_turns, seed=seed, simultaneous=simultaneous)
+            self.sim.journal = Journal(self.sim.seed, max_turns, simultaneous=simultaneous)
+        else:
+            self.sim = replay(journal)
+            self.sim.journal = journal
+        self.seats = seats
+        self.connections = []
+        self.newcomers = []
+        self.encoder = StateEncoder()
+        # Seats done with the current simultaneous phase
+        self.ready = set()
+        # Seats whose client left
+        self.departed = set()
+
+    def join(self, connection):
+        connection.session = self
+        self.newcomers.append(connection)
+        connection.send(protocol.welcome(None))
+
+    def leave(self, connection):
+        for connections in (self.connections, self.newcomers):
+            if connection in connections:
+                connections.remove(connection)
+        connection.session = None
+        if connection.seat is not None:
+            self.departed.add(connection.seat)
+            self.pass_departed()
+
+    def take_seat(self, connection, seat):
+        connection.seat = seat
+        self.departed.discard(seat)
+
+    def pass_departed(self):
+        # Ends the phase or turns that only departed seats are holding up
+        sim = self.sim
+        if not self.departed or len(self.departed) >= len(sim.players):
+            return
+        if sim.simultaneous:
+            if not sim.is_over and len(self.ready | self.departed) == len(sim.players):
+                self.ready.clear()
+                sim.end_turn()
+        else:
+            while not sim.is_over and sim.current_player in self.departed:
+                sim.end_turn()
+
+    def apply(self, connection, action, args):
+        # Raises ValueError for an action the connection may not take now
+        sim = self.sim
+        if action == actions.ADD_PLAYER:
+            if connection.seat is not None:
+                raise ValueError("Already seated")
+            if len(sim.players) >= self.seats:
+                raise ValueError("Session is full")
+            if args[0] not in FACTIONS:
+                raise ValueError(f"Unknown faction {args[0]}")
+            sim.add_player(args[0])
+            connection.seat = len(sim.players) - 1
+            connection.send(protocol.welcome(connection.seat))
+            return
+        seat = connection.seat
+        if seat is None:
+            raise ValueError("Not seated")
+        if sim.is_over:
+            raise ValueError("Game over")
+        self.validate(action, args, sim.players[seat])
+
+        if sim.simultaneous:
+            if seat in self.ready:
+                raise ValueError("Already ended this phase")
+            if action == actions.END_TURN:
+                # The phase ends once every seat has ended it
+                self.ready.add(seat)
+                if len(self.ready | self.departed) == len(sim.players):
+                    self.ready.clear()
+                    sim.end_turn()
+                return
+            if sim.current_player != seat:
+                sim.seat(seat)
+        elif sim.current_player != seat:
+            raise ValueError("Not your turn")
+        apply_action(sim, action, args)
+        if action == actions.END_TURN:
+            self.pass_departed()
+
+    def validate(self, action, args, player):
+        if action in (actions.LIST, actions.SELL, actions.BID):
+            # Numbers decode as any tagged value, so also str, None or ints
+            # too wide for a float
+            if not all(type(value) in (int, float) and 0 < value <= sys.float_info.max for value in args[1:]):
+                raise ValueError("Quantities and prices must be positive")
+        elif action == actions.CANCEL:
+            product_type, order_id = args
+            order = self.sim.market.order_books[product_type].orders.get(order_id)
+            if order is not None and order.owner is not player:
+                raise ValueError("Not your order")
+        elif action == actions.UPGRADE:
+            if not 0 <= args[0] < len(player.factories):
+                raise ValueError("No such factory")
+        elif action == actions.SEAT:
+            raise ValueError("Seats are handed out by the server")
+
+    def flush(self):
+        # Sends the update for everything since the last flush; newcomers
+        # get a checkpoint of the same state instead
+        if not self.connections and not self.newcomers:
+            return
+        turn = self.sim.turn
+        kind, payload = self.encoder.encode(self.sim)
+        update = protocol.state(kind, turn, payload)
+        for connection in self.connections:
+            connection.send(update)
+        if self.newcomers:
+            if kind != CHECKPOINT:
+                update = protocol.state(CHECKPOINT, turn, self.encoder.checkpoint())
+            for connection in self.newcomers:
+                connection.send(update)
+            self.connections += self.newcomers
+            self.newcomers.clear()
+
+
+# control=True also accepts the lobby messages of core.shard; only start
+# such a server where clients cannot reach it directly
+class GameServer:
+    def __init__(self, tick=SERVER_TICK, control=False, max_sessions=SERVER_MAX_SESSIONS):
+        self.tick = tick
+        self.control = control
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.dirty = set()
+        self.server = None
+        self.ticker = None
+        # Turns played, and the count and time at the last load report
+        self.turns = 0
+        self.reported = (0, time.perf_counter())
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        # Returns the port listened on, useful with port=0
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.ticker = asyncio.create_task(self.run_ticks())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.ticker is not None:
+            self.ticker.cancel()
+            self.ticker = None
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def run_ticks(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.flush()
+
+    def flush(self):
+        dirty, self.dirty = self.dirty, set()
+        for session in dirty:
+            session.flush()
+
+    async def handle(self, reader, writer):
+        # One client connection, TCP or loopback
+        connection = Connection(writer)
+        try:
+            while not writer.is_closing():
+                length, kind = protocol.FRAME.unpack(await reader.readexactly(protocol.FRAME.size))
+                if length > SERVER_MAX_FRAME and not self.control:
+                    connection.send(protocol.error("Frame too large"))
+                    break
+                self.receive(connection, kind, await reader.readexactly(length))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.leave(connection)
+            writer.close()
+
+    def receive(self, connection, kind, payload):
+        try:
+            if kind == protocol.JOIN:
+                name, simultaneous = protocol.unpack_join(payload)
+                if connection.session is not None:
+                    raise ValueError("Already in a session")
+                session = self.sessions.get(name)
+                if session is None:
+                    if len(self.sessions) >= self.max_sessions:
+                        raise ValueError("Too many sessions")
+                    session = self.sessions[name] = Session(name, simultaneous)
+                session.join(connection)
+                self.dirty.add(session)
+            elif kind == protocol.ACTION:
+                session = connection.session
+                if session is None:
+                    raise ValueError("Not in a session")
+                self.dirty.add(session)
+                turn = session.sim.turn
+                try:
+                    for action, args in decode_actions(payload):
+                        session.apply(connection, action, args)
+                finally:
+                    self.turns += session.sim.turn - turn
+            elif self.control and kind in CONTROL:
+                CONTROL[kind](self, connection, payload)
+            else:
+                raise ValueError(f"Unknown message {kind}")
+        except (ValueError, KeyError, IndexError, struct.error) as e:
+            connection.send(protocol.error(str(e)))
+
+    def resume(self, connection, payload):
+        name, seat = protocol.unpack_resume(payload)
+        if connection.session is not None:
+            raise ValueError("Already in a session")
+        session = self.sessions[name]
+        session.join(connection)
+        if seat is not None:
+            session.take_seat(connection, seat)
+        connection.send(protocol.welcome(seat))
+        self.dirty.add(session)
+
+    def export(self, connection, payload):
+        # Hands the session over; its connections are left without one
+        session = self.sessions.pop(protocol.unpack_export(payload))
+        self.dirty.discard(session)
+        for other in session.connections + session.newcomers:
+            other.session = None
+        connection.send(protocol.session(session.name, session.seats, session.ready, session.departed,
+                                         session.sim.journal.to_bytes()))
+
+    def import_session(self, connection, payload):
+        name, seats, ready, departed, data = protocol.unpack_session(payload)
+        session = Session(name, seats=seats, journal=Journal.from_bytes(data))
+        session.ready = ready
+        session.departed = departed
+        self.sessions[name] = session
+        self.report_load(connection, payload)
+
+    def report_load(self, connection, payload):
+        turns, reported_at = self.reported
+        now = time.perf_counter()
+        self.reported = (self.turns, now)
+        rate = (self.turns - turns) / (now - reported_at) if now > reported_at else 0.0
+        connection.send(protocol.load(len(self.sessions), rate, len(self.dirty)))
+
+    def leave(self, connection):
+        session = connection.session
+        if session is None:
+            return
+        turn = session.sim.turn
+        session.leave(connection)
+        self.turns += session.sim.turn - turn
+        self.dirty.add(session)
+        # A session ends with its last client
+        if not session.connections and not session.newcomers and self.sessions.get(session.name) is session:
+            del self.sessions[session.name]
+            self.dirty.discard(session)
+
+
+CONTROL = {
+    protocol.RESUME: GameServer.resume,
+    protocol.EXPORT: GameServer.export,
+    protocol.IMPORT: GameServer.import_session,
+    protocol.STATS: GameServer.report_load,
+}
+
+
+# In-process stand-in for a TCP client. The server handles it exactly like
+# a socket connection, through in-memory streams on the same event loop, so
+# tests can drive the whole protocol without networking.
+class LoopbackClient:
+    def __init__(self, server):
+        self.reader = asyncio.StreamReader()
+        self.decoder = protocol.FrameDecoder(max_frame=None)
+        self.frames = []  # (kind, payload) received, oldest first
+        self.transport = self
+        self.closed = False
+        self.task = asyncio.ensure_future(server.handle(self.reader, self))
+
+    # Client side
+    def send(self, data):
+        self.reader.feed_data(data)
+
+    def disconnect(self):
+        self.reader.feed_eof()
+
+    def received(self, kind):
+        return [payload for frame_kind, payload in self.frames if frame_kind == kind]
+
+    # Writer side, used by the server
+    def write(self, data):
+        self.frames += self.decoder.feed(data)
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+async def serve(host, port):
+    server = GameServer()
+    port = await server.start(host, port)
+    print(f"Serving on {host}:{port}")
+    await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host multiplayer game sessions")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
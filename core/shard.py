@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import bisect
+import hashlib
+import math
+import multiprocessing
+import os
+from core import protocol
+from core.config import (SERVER_HOST, SERVER_PORT, SHARD_LOAD_FACTOR, SHARD_MAX_QUEUE, SHARD_REPLICAS,
+                         SHARD_REPORT_INTERVAL, SHARD_WORKERS)
+from core.server import GameServer
+
+# Sharded hosting: a lobby process accepts the clients and relays their
+# frames to N worker processes, each running a core.server.GameServer, so
+# sessions settle turns on every core instead of behind one GIL. Clients
+# speak the same protocol as with a single server.
+#
+# A new session goes to the first worker clockwise from its point on a
+# consistent-hash ring that is not busy: it must stay within
+# SHARD_LOAD_FACTOR of the average sessions and turns per second (bounded
+# loads) and under SHARD_MAX_QUEUE sessions waiting for a tick. Sessions
+# stay where they were placed until their worker is drained; then each is
+# exported as its journal, replayed on its new worker, and its clients'
+# relays reconnect there and take their seats back. Clients joining a
+# session while it moves are held back and join it on the new worker.
+#
+# A worker that dies is dropped from the ring at the next load report,
+# along with the sessions it hosted.
+
+WORKER_HOST = "127.0.0.1"
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashRing:
+    def __init__(self, nodes=(), replicas=SHARD_REPLICAS):
+        self.replicas = replicas
+        self.points = []  # sorted (hash, node)
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            bisect.insort(self.points, (ring_hash(f"{node}#{i}"), node))
+
+    def remove(self, node):
+        self.points = [point for point in self.points if point[1] != node]
+
+    def walk(self, key):
+        # Distinct nodes clockwise from the key's point
+        if not self.points:
+            return
+        start = bisect.bisect(self.points, (ring_hash(key),))
+        seen = set()
+        for i in range(len(self.points)):
+            node = self.points[(start + i) % len(self.points)][1]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+
+def run_worker(pipe):
+    # Worker process: a control-enabled game server on a free local port,
+    # reported back through the pipe
+    async def serve():
+        server = GameServer(control=True)
+        pipe.send(await server.start(WORKER_HOST, 0))
+        await server.server.serve_forever()
+    asyncio.run(serve())
+
+
+class Shard:
+    def __init__(self, shard_id, process, port):
+        self.id = shard_id
+        self.process = process
+        self.port = port
+        self.sessions = set()
+        self.turns_per_second = 0.0
+        self.queue_depth = 0
+        self.draining = False
+        self.reader = None
+        self.writer = None
+        # One request at a time on the control connection
+        self.lock = asyncio.Lock()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(WORKER_HOST, self.port)
+
+    async def request(self, data):
+        # Sends a control frame and returns the (kind, payload) reply
+        async with self.lock:
+            self.writer.write(data)
+            length, kind = protocol.FRAME.unpack(await self.reader.readexactly(protocol.FRAME.size))
+            return kind, await self.reader.readexactly(length)
+
+    async def report(self):
+        kind, payload = await self.request(protocol.frame(protocol.STATS))
+        self.update_load(kind, payload)
+
+    def update_load(self, kind, payload):
+        if kind == protocol.LOAD:
+            _, self.turns_per_second, self.queue_depth = protocol.unpack_load(payload)
+
+    def stop(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.process.terminate()
+        self.process.join()
+
+
+# A client connection and its relay to the worker hosting its session
+class Route:
+    def __init__(self, writer):
+        self.writer = writer
+        self.session = None
+        self.seat = None
+        self.upstream = None
+        # Frames from the client held back while the session migrates
+        self.held = None
+
+
+class Lobby:
+    def __init__(self, workers=SHARD_WORKERS):
+        self.workers = workers or os.cpu_count()
+        self.shards = {}
+        self.ring = HashRing()
+        self.placements = {}  # session -> Shard
+        self.routes = {}  # session -> [Route]
+        self.migrating = set()  # sessions being moved between workers
+        self.server = None
+        self.reporter = None
+        self.context = multiprocessing.get_context("spawn")
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        # Returns the port listened on, useful with port=0
+        for shard_id in range(self.workers):
+            await self.add_shard(shard_id)
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.reporter = asyncio.create_task(self.collect_loads())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.reporter is not None:
+            self.reporter.cancel()
+            self.reporter = None
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for shard in self.shards.values():
+            shard.stop()
+        self.shards.clear()
+
+    async def add_shard(self, shard_id):
+        parent, child = self.context.Pipe()
+        process = self.context.Process(target=run_worker, args=(child,), daemon=True)
+        process.start()
+        port = await asyncio.get_running_loop().run_in_executor(None, parent.recv)
+        shard = Shard(shard_id, process, port)
+        await shard.connect()
+        self.shards[shard_id] = shard
+        self.ring.add(shard_id)
+        return shard
+
+    async def collect_loads(self):
+        while True:
+            await asyncio.sleep(SHARD_REPORT_INTERVAL)
+            await self.report_loads()
+
+    async def report_loads(self):
+        for shard in list(self.shards.values()):
+            if not shard.process.is_alive():
+                self.remove_shard(shard)
+                continue
+            try:
+                await shard.report()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.remove_shard(shard)
+
+    def remove_shard(self, shard):
+        # Takes the worker off the ring and forgets the sessions still on
+        # it, closing their clients
+        self.ring.remove(shard.id)
+        del self.shards[shard.id]
+        for name in shard.sessions:
+            self.placements.pop(name, None)
+            for route in self.routes.pop(name, ()):
+                route.writer.close()
+        shard.sessions.clear()
+        shard.stop()
+
+    def loads(self):
+        # {shard id: (sessions, turns per second, queue depth)}
+        return {shard.id: (len(shard.sessions), shard.turns_per_second, shard.queue_depth)
+                for shard in self.shards.values()}
+
+    def place(self, name):
+        candidates = [shard for shard in self.shards.values() if not shard.draining]
+        if not candidates:
+            raise ValueError("No shard available")
+        # Bounded loads, counting the session being placed
+        session_limit = math.ceil((sum(len(s.sessions) for s in candidates) + 1) / len(candidates)
+                                  * (1 + SHARD_LOAD_FACTOR))
+        rate_limit = sum(s.turns_per_second for s in candidates) / len(candidates) * (1 + SHARD_LOAD_FACTOR)
+        for shard_id in self.ring.walk(name):
+            shard = self.shards[shard_id]
+            if (not shard.draining and len(shard.sessions) < session_limit
+                    and (not rate_limit or shard.turns_per_second <= rate_limit)
+                    and shard.queue_depth <= SHARD_MAX_QUEUE):
+                return shard
+        return min(candidates, key=lambda shard: (len(shard.sessions), shard.turns_per_second))
+
+    async def handle(self, reader, writer):
+        route = Route(writer)
+        decoder = protocol.FrameDecoder()
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                for kind, payload in decoder.feed(data):
+                    await self.forward(route, kind, payload)
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            self.disconnect(route)
+            writer.close()
+
+    async def forward(self, route, kind, payload):
+        if kind == protocol.JOIN:
+            if route.session is not None:
+                writer_send(route.writer, protocol.error("Already in a session"))
+                return
+            name, _ = protocol.unpack_join(payload)
+            shard = self.placements.get(name)
+            if shard is None:
+                shard = self.placements[name] = self.place(name)
+                shard.sessions.add(name)
+            route.session = name
+            self.routes.setdefault(name, []).append(route)
+            if name in self.migrating:
+                # Joins wherever the session ends up once it has moved
+                route.held = [protocol.frame(protocol.JOIN, payload)]
+                return
+            await self.relay(route, shard, protocol.frame(protocol.JOIN, payload))
+        elif kind == protocol.ACTION:
+            if route.session is None:
+                writer_send(route.writer, protocol.error("Not in a session"))
+                return
+            data = protocol.frame(kind, payload)
+            if route.held is not None:
+                route.held.append(data)
+            elif route.upstream is not None:
+                route.upstream.write(data)
+        else:
+            # Control messages are the lobby's alone
+            writer_send(route.writer, protocol.error(f"Unexpected message {kind}"))
+
+    async def relay(self, route, shard, first):
+        reader, upstream = await asyncio.open_connection(WORKER_HOST, shard.port)
+        route.upstream = upstream
+        upstream.write(first)
+        asyncio.create_task(self.pump(route, reader, upstream))
+
+    async def pump(self, route, reader, upstream):
+        # Worker to client; notes the seat the worker hands out
+        decoder = protocol.FrameDecoder(max_frame=None)
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                for kind, payload in decoder.feed(data):
+                    if kind == protocol.WELCOME and protocol.unpack_welcome(payload) is not None:
+                        route.seat = protocol.unpack_welcome(payload)
+                writer_send(route.writer, data)
+        except ConnectionError:
+            pass
+        # Closed by the worker rather than by a migration
+        if route.upstream is upstream:
+            route.writer.close()
+
+    def disconnect(self, route):
+        if route.upstream is not None:
+            route.upstream.close()
+            route.upstream = None
+        routes = self.routes.get(route.session)
+        if routes is None:
+            return
+        routes.remove(route)
+        if not routes:
+            del self.routes[route.session]
+            self.placements.pop(route.session).sessions.discard(route.session)
+
+    async def migrate(self, name, target):
+        source = self.placements[name]
+        routes = list(self.routes.get(name, ()))
+        for route in routes:
+            route.held = []
+        self.migrating.add(name)
+        try:
+            kind, payload = await source.request(protocol.export(name))
+            if kind != protocol.SESSION:
+                # The session is gone from the worker; nothing to move
+                target = source
+                routes = []
+            else:
+                for route in routes:
+                    route.upstream, upstream = None, route.upstream
+                    if upstream is not None:
+                        upstream.close()
+                target.update_load(*await target.request(protocol.frame(protocol.IMPORT, payload)))
+                source.sessions.discard(name)
+                target.sessions.add(name)
+                self.placements[name] = target
+        finally:
+            self.migrating.discard(name)
+        for route in list(self.routes.get(name, ())):
+            held, route.held = route.held, None
+            if held is None:
+                continue
+            if route in routes:
+                await self.relay(route, target, protocol.resume(name, route.seat))
+            elif route.upstream is None:
+                # Joined while the session was moving
+                await self.relay(route, target, held.pop(0))
+            for data in held:
+                route.upstream.write(data)
+
+    async def drain(self, shard_id, stop=True):
+        # Moves every session off the worker; with stop the worker is then
+        # shut down and leaves the ring
+        shard = self.shards[shard_id]
+        shard.draining = True
+        for name in list(shard.sessions):
+            await self.migrate(name, self.place(name))
+        if stop:
+            self.remove_shard(shard)
+
+
+def writer_send(writer, data):
+    if not writer.is_closing():
+        writer.write(data)
+
+
+async def serve(host, port, workers):
+    lobby = Lobby(workers)
+    port = await lobby.start(host, port)
+    print(f"Lobby on {host}:{port} with {lobby.workers} workers")
+    await lobby.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host game sessions across worker processes")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS, help="default: one per core")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.workers))
+
+
+if __name__ == "__main__":
+    main()
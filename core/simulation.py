@@ -0,0 +1,320 @@
+import random
+from core import journal as actions
+from core.config import (ACTIONS_PER_TURN, MAX_TURNS, POLITICS_BRIBE_COST, POLITICS_INFLUENCE_CAP,
+                         RANDOM_EVENT_INTERVAL)
+from core.fork import SNAPSHOTS, Trail, restore_simulation, snapshot_simulation
+from core.player import Player
+from core.market import Market
+from core.politics import Politics
+from core.rng import CounterRandom
+from core.scheduler import Leaderboard, TurnScheduler
+from utils.events import EventScheduler, register_economic_events
+from utils.metrics import metrics
+
+# Named random streams of a game: Simulation.<name>_rng
+RNG_STREAMS = ("market", "research", "politics", "events")
+
+# Headless rules engine. Owns the players, the market and turn order and
+# never touches pygame, so it can be driven by the UI, bots or batch runs.
+#
+# All randomness comes from per-game streams derived from the seed, one
+# per name in RNG_STREAMS, so a seed plus the action journal reproduces a
+# game exactly. Streams are core.rng.CounterRandom, whose fork snapshot is
+# a counter.
+#
+# Any number of players can be seated. With simultaneous=True every player
+# acts in each turn and market actions settle together at end_turn (see
+# core.scheduler); otherwise turns rotate one player at a time.
+#
+# fork() marks the current state and rollback() returns to it, for bots
+# that search ahead; see core.fork.
+class Simulation:
+    def __init__(self, max_turns=MAX_TURNS, seed=None, journal=None, simultaneous=False):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        for name in RNG_STREAMS:
+            setattr(self, f"{name}_rng", CounterRandom(f"{seed}:{name}"))
+        # Optional core.journal.Journal that every action is appended to
+        self.journal = journal
+
+        self.players = []
+        self.current_player = 0
+        self.market = Market(rng=self.market_rng)
+        self.politics = Politics(self.players)
+        self.turn = 1
+        self.max_turns = max_turns
+        self.scheduler = TurnScheduler(simultaneous)
+        self.leaderboard = Leaderboard()
+        self.trail = Trail()
+        self.events = EventScheduler()
+        register_economic_events(self.events)
+        if RANDOM_EVENT_INTERVAL:
+            self.events.schedule("random_event", 1 + RANDOM_EVENT_INTERVAL, every=RANDOM_EVENT_INTERVAL)
+
+    @property
+    def player(self):
+        return self.players[self.current_player]
+
+    @property
+    def simultaneous(self):
+        return self.scheduler.simultaneous
+
+    @property
+    def is_over(self):
+        return self.turn > self.max_turns
+
+    def add_player(self, faction_name):
+        if self.journal is not None:
+            self.journal.append(actions.ADD_PLAYER, faction_name)
+        self.touch(self, self.leaderboard)
+        player = Player(f"Player {len(self.players) + 1}", faction_name)
+        self.players.append(player)
+        self.leaderboard.add(player)
+        return player
+
+    def seat(self, index):
+        # Hands the actions to another player within a simultaneous phase
+        if self.journal is not None:
+            self.journal.append(actions.SEAT, index)
+        self.touch(self)
+        self.current_player = index
+
+    def fork(self):
+        # Starts recording changes so rollback() can undo them. Forks nest;
+        # returns the nesting depth.
+        depth = self.trail.push()
+        self.market.trail = self.trail
+        if self.journal is not None:
+            self.trail.save(self.journal)
+        return depth
+
+    def rollback(self):
+        # Restores the state at the innermost fork() and closes that fork.
+        # Players who joined within it are off the restored leaderboard.
+        players = self.trail.pop()
+        self.leaderboard.update_all([player for player in players if player in self.leaderboard.keys])
+        if not self.trail:
+            self.market.trail = None
+
+    def commit(self):
+        # Closes the innermost fork, keeping its changes
+        self.trail.merge()
+        if not self.trail:
+            self.market.trail = None
+
+    def touch(self, *objects):
+        # Call before modifying objects so an open fork can restore them
+        if self.trail.frames:
+            self.trail.save_all(objects)
+
+    def rescore(self):
+        # Moves the players whose score may have changed on the leaderboard
+        self.leaderboard.update(self.player)
+        if self.market.settled_owners:
+            self.leaderboard.update_all(self.market.settled_owners)
+            self.market.settled_owners.clear()
+
+    def produce(self):
+        # Returns the factories that could not be paid for
+        if self.journal is not None:
+            self.journal.append(actions.PRODUCE)
+        player = self.player
+        failed = []
+        if player.actions_left > 0:
+            self.touch(player)
+            with metrics.timer("production"):
+                produced = player.produce_all(self.market)
+                player.actions_left -= sum(produced)
+                failed = [factory for factory, ok in zip(player.factories, produced) if not ok]
+            self.leaderboard.update(player)
+        return failed
+
+    def research(self, tech=None):
+        # Researches the named tech, or without a name a random one of those
+        # the player can afford
+        if self.journal is not None:
+            if tech is None:
+                self.journal.append(actions.RESEARCH)
+            else:
+                self.journal.append(actions.RESEARCH_TECH, tech)
+        player = self.player
+        research = player.research
+        if player.actions_left > 0:
+            if tech is None:
+                affordable = research.affordable()
+                if not affordable:
+                    return False
+                self.touch(self.research_rng)
+                tech = self.research_rng.choice(affordable)
+            if research.can_research(tech):
+                tech_cost = research.cost(tech)
+                if player.money >= tech_cost:
+                    self.touch(player, research, *player.factories)
+                    player.money -= tech_cost
+                    research.complete(tech)
+                    player.actions_left -= 1
+                    self.leaderboard.update(player)
+                    return True
+        return False
+
+    def influence_politics(self, politician=None):
+        # Bribes the politician, by default the one the player is closest
+        # to winning over. The influence it buys counts at end_turn; a player
+        # with POLITICS_INFLUENCE_CAP influence or more cannot bribe.
+        if self.journal is not None:
+            if politician is None:
+                self.journal.append(actions.POLITICS)
+            else:
+                self.journal.append(actions.BRIBE, politician)
+        player = self.player
+        if player.actions_left > 0 and player.political_influence < POLITICS_INFLUENCE_CAP:
+            if politician is None:
+                politician = self.politics.target(self.current_player)
+            elif not 0 <= politician < len(self.politics.map):
+                return False
+            bribe_cost = player.get_bribery_cost(POLITICS_BRIBE_COST)
+            if player.money >= bribe_cost:
+                self.touch(player, self.politics)
+                player.money -= bribe_cost
+                self.politics.bribe(self.current_player, politician)
+                player.actions_left -= 1
+                self.leaderboard.update(player)
+                return True
+        return False
+
+    def upgrade_factory(self, factory):
+        player = self.player
+        if self.journal is not None:
+            self.journal.append(actions.UPGRADE, player.factories.index(factory))
+        if player.actions_left > 0:
+            upgrade_cost = factory.upgrade_cost()
+            if player.money >= upgrade_cost:
+                self.touch(player, factory)
+                player.money -= upgrade_cost
+                factory.upgrade()
+                player.actions_left -= 1
+                self.leaderboard.update(player)
+                return True
+        return False
+
+    def list_goods(self, product_type, quantity, price):
+        if self.journal is not None:
+            self.journal.append(actions.LIST, product_type, quantity, price)
+        player = self.player
+        if self.simultaneous:
+            self.touch(player, self.scheduler.settlement)
+            return self.scheduler.settlement.list_goods(player, product_type, quantity, price)
+        self.touch(player)
+        listed = player.list_goods(product_type, quantity, price, self.market)
+        self.rescore()
+        return listed
+
+    def bid_for_goods(self, product_type, quantity, price):
+        if self.journal is not None:
+            self.journal.append(actions.BID, product_type, quantity, price)
+        player = self.player
+        if self.simultaneous:
+            self.touch(player, self.scheduler.settlement)
+            placed = self.scheduler.settlement.bid_for_goods(player, product_type, quantity, price)
+        else:
+            self.touch(player)
+            placed = player.bid_for_goods(product_type, quantity, price, self.market)
+        self.rescore()
+        return placed
+
+    def cancel_order(self, order):
+        if self.journal is not None:
+            self.journal.append(actions.CANCEL, order.product_type, order.order_id)
+        player = self.player
+        if order.owner is not player:
+            return False
+        self.touch(player)
+        cancelled = player.cancel_order(order, self.market)
+        self.leaderboard.update(player)
+        return cancelled
+
+    def sell_at_market(self, product_type, quantity):
+        if self.journal is not None:
+            self.journal.append(actions.SELL, product_type, quantity)
+        player = self.player
+        if self.simultaneous:
+            self.touch(player, self.scheduler.settlement)
+            return self.scheduler.settlement.sell(player, product_type, quantity)
+        self.touch(player, self.market.sectors[product_type])
+        sold = player.sell_at_market_price(product_type, quantity, self.market)
+        self.leaderboard.update(player)
+        return sold
+
+    def end_turn(self):
+        if self.journal is not None:
+            self.journal.append(actions.END_TURN)
+        self.touch(self, self.market)
+        if self.simultaneous:
+            self.touch(self.scheduler.settlement, *self.players)
+            with metrics.timer("batch_settlement"):
+                self.leaderboard.update_all(self.scheduler.settlement.settle(self.market))
+            for player in self.players:
+                player.actions_left = ACTIONS_PER_TURN
+            self.turn += 1
+            self.current_player = self.scheduler.phase_seats(self.turn, len(self.players))[0]
+        else:
+            self.current_player = self.scheduler.next_seat(self.current_player, len(self.players))
+            self.touch(self.players[self.current_player])
+            self.players[self.current_player].actions_left = ACTIONS_PER_TURN
+            self.turn += 1
+        if self.politics.due(self.turn):
+            with metrics.timer("politics"):
+                self.resolve_politics()
+        with metrics.timer("market_update"):
+            self.market.update()
+        if self.events.due(self.turn):
+            with metrics.timer("events"):
+                self.fire_events()
+        with metrics.timer("listing_settlement"):
+            self.market.settle_listings()
+        self.leaderboard.update_all(self.market.settled_owners)
+        self.market.settled_owners.clear()
+
+    def fire_events(self):
+        # Runs the events due this turn and applies their effects in one batch
+        self.touch(self.events, self.events_rng)
+        effects = self.events.fire(self.turn, self)
+        targets = effects.targets()
+        self.touch(*targets)
+        effects.apply()
+        self.leaderboard.update_all([target for target in targets if type(target) is Player])
+
+    def resolve_politics(self):
+        # The turn's bribes, scandals and votes, in one batch
+        self.touch(self.politics, self.politics_rng, *self.players)
+        if self.politics.vote_due(self.turn):
+            self.touch(*(factory for player in self.players for factory in player.factories))
+        self.leaderboard.update_all(self.politics.resolve(self.turn, self.politics_rng))
+
+    def check_for_scandal(self, player):
+        self.touch(self.politics_rng)
+        return player.check_for_scandal(self.politics_rng)
+
+    def game_over(self):
+        return self.leaderboard.leader()
+
+    def standings(self, count=None):
+        return self.leaderboard.standings(count)
+
+    def play(self, policies):
+        # policies[i] is called with the simulation on player i's turn and
+        # spends that player's actions; returns the winner. In simultaneous
+        # mode every policy runs each turn before the batched settlement.
+        while not self.is_over:
+            if self.simultaneous:
+                for seat in self.scheduler.phase_seats(self.turn, len(self.players)):
+                    self.seat(seat)
+                    policies[seat](self)
+            else:
+                policies[self.current_player](self)
+            self.end_turn()
+        return self.game_over()
+
+
+SNAPSHOTS[Simulation] = (snapshot_simulation, restore_simulation)
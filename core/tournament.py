@@ -0,0 +1,146 @@
+import argparse
+import itertools
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from core.faction import FACTIONS
+from core.simulation import Simulation
+
+Z_95 = 1.96
+
+
+def greedy_policy(sim):
+    player = sim.player
+    sim.produce()
+    for product_type, quantity in player.inventory.items():
+        if quantity > 0:
+            sim.sell_at_market(product_type, quantity)
+    if not sim.influence_politics():
+        sim.research()
+
+
+def game_seed(seed, faction_a, faction_b, game):
+    # String seeds are hashed with SHA-512, so this is stable across processes
+    return random.Random(f"{seed}:{faction_a}:{faction_b}:{game}").getrandbits(64)
+
+
+def play_game(faction_a, faction_b, seed, swap_seats=False):
+    # Returns the game_over scores of (faction_a, faction_b)
+    sim = Simulation(seed=seed)
+    seats = [faction_b, faction_a] if swap_seats else [faction_a, faction_b]
+    for faction_name in seats:
+        sim.add_player(faction_name)
+    sim.play([greedy_policy] * len(seats))
+    scores = [p.money + p.political_influence for p in sim.players]
+    return (scores[1], scores[0]) if swap_seats else (scores[0], scores[1])
+
+
+def play_chunk(matchup, faction_a, faction_b, seed, games):
+    # Runs in a worker process; games is a range of game numbers
+    return matchup, [
+        play_game(faction_a, faction_b, game_seed(seed, faction_a, faction_b, game), game % 2 == 1)
+        for game in games
+    ]
+
+
+class MatchupStats:
+    def __init__(self, faction_a, faction_b):
+        self.faction_a = faction_a
+        self.faction_b = faction_b
+        self.games = 0
+        self.wins_a = 0
+        self.wins_b = 0
+        self.draws = 0
+        self.score_sum = [0.0, 0.0]
+        self.score_sq_sum = [0.0, 0.0]
+
+    def add(self, score_a, score_b):
+        self.games += 1
+        if score_a > score_b:
+            self.wins_a += 1
+        elif score_b > score_a:
+            self.wins_b += 1
+        else:
+            self.draws += 1
+        for i, score in enumerate((score_a, score_b)):
+            self.score_sum[i] += score
+            self.score_sq_sum[i] += score * score
+
+    def win_rate(self):
+        # Win rate of faction_a, draws counted as half a win
+        return (self.wins_a + 0.5 * self.draws) / self.games
+
+    def win_rate_interval(self, z=Z_95):
+        # Wilson score interval
+        n = self.games
+        p = self.win_rate()
+        denominator = 1 + z * z / n
+        center = (p + z * z / (2 * n)) / denominator
+        margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+        return center - margin, center + margin
+
+    def mean_score(self, side):
+        return self.score_sum[side] / self.games
+
+    def mean_score_interval(self, side, z=Z_95):
+        n = self.games
+        mean = self.mean_score(side)
+        if n < 2:
+            return mean, mean
+        variance = max(0.0, (self.score_sq_sum[side] - n * mean * mean) / (n - 1))
+        margin = z * math.sqrt(variance / n)
+        return mean - margin, mean + margin
+
+
+def matchups(factions=None):
+    return list(itertools.combinations(factions or list(FACTIONS), 2))
+
+
+def iter_chunks(games_per_matchup, seed=0, workers=None, chunk_size=100, factions=None):
+    # Yields (matchup_index, [(score_a, score_b), ...]) as chunks complete
+    pairs = matchups(factions)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(play_chunk, i, faction_a, faction_b, seed,
+                            range(start, min(start + chunk_size, games_per_matchup)))
+            for i, (faction_a, faction_b) in enumerate(pairs)
+            for start in range(0, games_per_matchup, chunk_size)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_tournament(games_per_matchup, seed=0, workers=None, chunk_size=100, factions=None, on_chunk=None):
+    stats = [MatchupStats(a, b) for a, b in matchups(factions)]
+    for matchup, results in iter_chunks(games_per_matchup, seed, workers, chunk_size, factions):
+        for score_a, score_b in results:
+            stats[matchup].add(score_a, score_b)
+        if on_chunk:
+            on_chunk(stats[matchup])
+    return stats
+
+
+def print_report(stats):
+    for s in stats:
+        low, high = s.win_rate_interval()
+        print(f"{s.faction_a} vs {s.faction_b}: {s.games} games, "
+              f"{s.faction_a} win rate {s.win_rate():.3f} [{low:.3f}, {high:.3f}] "
+              f"({s.wins_a}W/{s.wins_b}L/{s.draws}D)")
+        for side, name in enumerate((s.faction_a, s.faction_b)):
+            low, high = s.mean_score_interval(side)
+            print(f"    {name}: mean score {s.mean_score(side):.1f} [{low:.1f}, {high:.1f}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play every faction pairing and report win rates")
+    parser.add_argument("--games", type=int, default=1000, help="games per matchup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to all cores")
+    parser.add_argument("--chunk-size", type=int, default=100)
+    args = parser.parse_args()
+    print_report(run_tournament(args.games, args.seed, args.workers, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 import random
+from core.economics import CostTable
+from core.modifiers import Modifiers
 
 class EconomicGame:
-    def __init__(self, master):
+    def __init__(self, master, seed=None):
         self.master = master
+        self.rng = random.Random(seed)
         self.master.title("Advanced Economic Strategy Game")
         
         self.players = [Player("Player 1"), Player("Player 2")]
@@ -12,9 +15,9 @@ class EconomicGame:
         self.turn = 1
         self.max_turns = 15
         self.market = {
-            'raw': {'price': 10, 'demand': random.randint(3, 8)},
-            'manufactured': {'price': 20, 'demand': random.randint(2, 6)},
-            'luxury': {'price': 30, 'demand': random.randint(1, 4)}
+            'raw': {'price': 10, 'demand': self.rng.randint(3, 8)},
+            'manufactured': {'price': 20, 'demand': self.rng.randint(2, 6)},
+            'luxury': {'price': 30, 'demand': self.rng.randint(1, 4)}
         }
         self.listed_products = []
         self.units_sold = {'raw': 0, 'manufactured': 0, 'luxury': 0}
@@ -24,6 +27,7 @@ class EconomicGame:
             'manufactured': {'fixed': 30, 'variable': 10, 'increasing': 0.2},
             'luxury': {'fixed': 50, 'variable': 15, 'increasing': 0.3}
         }
+        self.cost_table = CostTable(self.production_costs)
         
         self.setup_gui()
         self.update_display()
@@ -160,24 +164,20 @@ class EconomicGame:
         variable_cost = costs['variable']
         increasing_cost = costs['increasing']
         
-        total_cost = fixed_cost + (variable_cost * quantity) + (increasing_cost * (quantity ** 2) / 2)
+        total_cost = self.calculate_total_cost(good_type, quantity)
+        best = self.cost_table.best_quantity(good_type, self.market[good_type]['price'], cap=quantity)
         
         info = f"Production Costs for {good_type.capitalize()} Goods:\n"
         info += f"Fixed Cost: ${fixed_cost}\n"
         info += f"Variable Cost: ${variable_cost} per unit\n"
         info += f"Increasing Marginal Cost: ${increasing_cost} per additional unit\n\n"
-        info += f"Total Cost for {quantity} units: ${total_cost:.2f}"
+        info += f"Total Cost for {quantity} units: ${total_cost:.2f}\n"
+        info += f"Most profitable at the market price: {best} units"
         
         return info
     
     def calculate_total_cost(self, good_type, quantity):
-        costs = self.production_costs[good_type]
-        fixed_cost = costs['fixed']
-        variable_cost = costs['variable']
-        increasing_cost = costs['increasing']
-        
-        total_cost = fixed_cost + (variable_cost * quantity) + (increasing_cost * (quantity ** 2) / 2)
-        return total_cost
+        return self.cost_table.total_cost(good_type, quantity)
         
     def trade(self):
         player = self.players[self.current_player]
@@ -201,7 +201,7 @@ class EconomicGame:
         
         player.goods[good_type] -= units_to_sell
         revenue = units_to_sell * self.market[good_type]['price']
-        revenue_with_bonus = revenue * (1 + player.trade_bonus)
+        revenue_with_bonus = revenue * player.modifiers["trade_revenue"]
         player.money += revenue_with_bonus
         player.action_points -= 1
         self.units_sold[good_type] += units_to_sell
@@ -322,7 +322,7 @@ class EconomicGame:
     
     def research(self):
         player = self.players[self.current_player]
-        ap_cost = 3 - player.research_discount
+        ap_cost = round(3 / player.modifiers["research_speed"])
         money_cost = 50
         if player.action_points < ap_cost:
             messagebox.showinfo("Action Failed", f"Not enough action points. Research requires {ap_cost} AP.")
@@ -355,9 +355,10 @@ class EconomicGame:
             for good in player.production:
                 player.production[good] += 1
         elif tech == 'Marketing':
-            player.trade_bonus = 0.1
+            player.modifiers.set(("tech", tech), {"trade_revenue": 1.1})
         elif tech == 'Innovation':
-            player.research_discount = 1
+            # 2 AP instead of 3
+            player.modifiers.set(("tech", tech), {"research_speed": 1.5})
         
         messagebox.showinfo("Research", f"You have researched {tech} for ${money_cost}!")
         self.update_display()
@@ -395,10 +396,10 @@ class EconomicGame:
     def adjust_market(self):
         for good, data in self.market.items():
             if self.units_sold[good] < data['demand']:
-                data['price'] = min(50, data['price'] + random.randint(1, 3))
+                data['price'] = min(50, data['price'] + self.rng.randint(1, 3))
             elif self.units_sold[good] > data['demand']:
-                data['price'] = max(5, data['price'] - random.randint(1, 3))
-            data['demand'] = random.randint(1, 15)
+                data['price'] = max(5, data['price'] - self.rng.randint(1, 3))
+            data['demand'] = self.rng.randint(1, 15)
             self.units_sold[good] = 0
         
     def trigger_event(self):
@@ -409,7 +410,7 @@ class EconomicGame:
             ("Luxury Goods Craze", "Luxury goods demand tripled", lambda: self.modify_demand('luxury', 3))
         ]
         
-        event = random.choice(events)
+        event = self.rng.choice(events)
         messagebox.showinfo("Economic Event", f"{event[0]}: {event[1]}")
         event[2]()
         
@@ -440,8 +441,8 @@ class EconomicGame:
 
     def adjust_market(self):
         for good, data in self.market.items():
-            data['demand'] = max(1, data['demand'] + random.randint(-1, 1))
-            data['price'] = max(1, data['price'] + random.uniform(-0.5, 0.5))
+            data['demand'] = max(1, data['demand'] + self.rng.randint(-1, 1))
+            data['price'] = max(1, data['price'] + self.rng.uniform(-0.5, 0.5))
 
     def end_game(self):
         for player in self.players:
@@ -460,8 +461,7 @@ class Player:
         self.production = {'raw': 5, 'manufactured': 3, 'luxury': 1}
         self.technologies = []
         self.action_points = 5
-        self.trade_bonus = 0
-        self.research_discount = 0
+        self.modifiers = Modifiers()
 
 if __name__ == "__main__":
     root = tk.Tk()
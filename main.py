@@ -1,8 +1,20 @@
+import argparse
 import pygame
+from core.config import SERVER_HOST, SERVER_PORT
 from core.game import Game
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play locally, or join a session on a game server")
+    parser.add_argument("--session", help="join this session on the server instead of playing locally")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
     pygame.init()
-    game = Game()
+    remote = None
+    if args.session:
+        from core.client import RemoteSimulation
+        remote = RemoteSimulation(args.session, args.host, args.port)
+    game = Game(remote=remote)
     game.run()
-    pygame.quit()
\ No newline at end of file
+    pygame.quit()
@@ -0,0 +1,74 @@
+import os
+import random
+from core.journal import Journal
+from core.save import numeric_fields, open_orders, pack_game_state, pack_politics, structure
+from core.simulation import Simulation
+
+PRODUCTS = ("raw", "manufactured", "luxury")
+FACTIONS = ("Monopolist", "Technologist", "Political Machine")
+
+
+def make_game(seed=0, simultaneous=False):
+    # A journaled game with a player of every faction
+    sim = Simulation(max_turns=10 ** 6, seed=seed, simultaneous=simultaneous)
+    sim.journal = Journal(seed, sim.max_turns, simultaneous=simultaneous)
+    for faction_name in FACTIONS:
+        sim.add_player(faction_name)
+    return sim
+
+
+def make_screen_game():
+    # A Game on SDL's dummy video driver, past faction selection
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from core.game import Game
+
+    pygame.init()
+    game = Game(autosave_path=None, journal_path=None, ai_seats=())
+    for faction_name in FACTIONS[:2]:
+        game.select_faction(faction_name)
+    game.faction_selection_done = True
+    return game
+
+
+def play(sim, turns, seed=0):
+    # A mix of every kind of action, drawn from its own generator so the
+    # same seed takes the same actions on the same game
+    rng = random.Random(seed)
+    for _ in range(turns):
+        for _ in range(len(sim.players) if sim.simultaneous else 1):
+            if sim.simultaneous:
+                sim.seat(rng.randrange(len(sim.players)))
+            player = sim.player
+            sim.produce()
+            product_type = rng.choice(PRODUCTS)
+            quantity = player.inventory[product_type]
+            roll = rng.random()
+            if roll < 0.2 and quantity >= 2:
+                sim.list_goods(product_type, 2, rng.choice([5.0, 15.0, 40.0]))
+            elif roll < 0.35:
+                sim.bid_for_goods(product_type, 1, rng.choice([8.0, 20.0]))
+            elif roll < 0.55 and quantity:
+                sim.sell_at_market(product_type, min(quantity, 3))
+            elif roll < 0.65 and player.listed_goods[product_type]:
+                sim.cancel_order(next(iter(player.listed_goods[product_type].values())))
+            elif roll < 0.75:
+                sim.research()
+            elif roll < 0.85:
+                sim.influence_politics()
+            elif roll < 0.9 and player.money > 500:
+                sim.upgrade_factory(player.factories[0])
+        sim.end_turn()
+
+
+def signature(sim):
+    # Everything a turn can change, in comparable form
+    history = sim.market.history
+    return (
+        structure(sim), numeric_fields(sim), open_orders(sim), pack_politics(sim), pack_game_state(sim),
+        [dict(player.inventory) for player in sim.players],
+        [(player.research.researched, player.research.available) for player in sim.players],
+        [dict(player.modifiers.table) for player in sim.players],
+        history.rows_view(0, len(history.keys)).tobytes(), history.total, list(sim.leaderboard.entries),
+        len(sim.journal) if sim.journal is not None else None,
+    )
@@ -0,0 +1,46 @@
+from core.ai import END_TURN, MCTS, MCTSBot, Node, TranspositionTable, headless_copy, legal_moves
+from helpers import make_game, play, signature
+
+
+def test_search_leaves_the_game_unchanged():
+    sim = make_game(3)
+    play(sim, 6)
+    before = signature(sim)
+    stats = MCTS(seed=1).search(sim, time_budget=60, max_iterations=80)
+    assert signature(sim) == before
+    assert set(stats) <= set(legal_moves(sim))
+    assert sum(visits for visits, _ in stats.values()) == 80
+
+
+def test_search_is_deterministic():
+    sim = make_game(3)
+    play(sim, 6)
+    first = MCTS(seed=2).search(headless_copy(sim, 9), time_budget=60, max_iterations=60)
+    second = MCTS(seed=2).search(headless_copy(sim, 9), time_budget=60, max_iterations=60)
+    assert first == second
+
+
+def test_table_keeps_busy_nodes_of_the_current_search():
+    table = TranspositionTable(size=4, protect_visits=10)
+    table.new_search()
+    busy = Node(1, table.generation, [END_TURN])
+    busy.visits = 10
+    table.store(busy)
+    table.store(Node(5, table.generation, [END_TURN]))
+    assert table.get(1) is busy and table.get(5) is None
+    table.new_search()
+    newer = Node(5, table.generation, [END_TURN])
+    table.store(newer)
+    assert table.get(5) is newer and table.get(1) is None
+
+
+def test_bot_plays_legal_turns():
+    sim = make_game(4)
+    sim.journal = None
+    bot = MCTSBot(time_budget=60, workers=1, seed=0, max_iterations=20)
+    for _ in range(3):
+        seat = sim.current_player
+        bot(sim)
+        assert sim.current_player == seat
+        sim.end_turn()
+    bot.close()
@@ -0,0 +1,54 @@
+import numpy as np
+from core.batch_market import BatchMarket
+from core.market import Market
+
+
+class ScriptedRandom:
+    # Hands out the given randint draws in order
+    def __init__(self, draws):
+        self.draws = iter(draws)
+
+    def randint(self, a, b):
+        return next(self.draws)
+
+
+def test_matches_scalar_markets():
+    rng = np.random.default_rng(3)
+    worlds, turns = 5, 60
+    draws = rng.integers(-5, 5, size=(turns, worlds), endpoint=True)
+    supply = rng.uniform(0, 80, size=(turns, worlds, 3))
+    markets = [Market(ScriptedRandom(draws[:, world].tolist())) for world in range(worlds)]
+    batch = BatchMarket.from_markets(markets)
+    for turn in range(turns):
+        for world, market in enumerate(markets):
+            for i, sector in enumerate(market.sectors.values()):
+                sector.add_supply(supply[turn, world, i])
+        for i, name in enumerate(batch.sector_names):
+            batch.add_supply(name, supply[turn, :, i])
+        for market in markets:
+            market.update()
+        batch.update(draws[turn])
+    for name in batch.sector_names:
+        assert batch.get_price(name).tolist() == [market.sectors[name].get_price() for market in markets]
+        assert batch.get_demand(name).tolist() == [market.sectors[name].get_demand() for market in markets]
+    assert batch.economic_cycle.tolist() == [market.economic_cycle for market in markets]
+
+
+def test_economic_cycle_stays_in_range():
+    batch = BatchMarket(4)
+    for _ in range(30):
+        batch.update(np.array([5, -5, 5, -5]))
+    assert batch.economic_cycle.tolist() == [100, 0, 100, 0]
+
+
+def test_store_and_load_round_trip():
+    batch = BatchMarket(2)
+    batch.add_supply("raw", [10.0, 25.0])
+    batch.update(np.array([3, -2]))
+    market = Market()
+    batch.store(1, market)
+    other = BatchMarket(1)
+    other.load(0, market)
+    assert np.array_equal(other.price[0], batch.price[1])
+    assert np.array_equal(other.demand[0], batch.demand[1])
+    assert other.economic_cycle[0] == batch.economic_cycle[1]
@@ -0,0 +1,37 @@
+import argparse
+import os
+import benchmark
+from benchmark import BENCHMARKS, compare, measure
+
+
+def params(**overrides):
+    values = dict(players=2, factories=3, listings=4, seed=0, warmup=1, repeats=2, min_time=0.001,
+                  group=None, only=None)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_every_benchmark_runs():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    for name, (group, setup) in BENCHMARKS.items():
+        operation = setup(params())
+        operation()
+        operation()
+
+
+def test_measure_reports_per_call_times():
+    result = measure(lambda: None, warmup=1, repeats=3, min_time=0.001)
+    assert result["repeats"] == 3 and result["loops"] >= 1
+    assert result["min_s"] <= result["median_s"]
+    assert result["ops_per_sec"] == 1 / result["median_s"]
+
+
+def test_run_filters_and_compare_flags_slowdowns():
+    report = benchmark.run(params(only=["market_update"]))
+    assert list(report["results"]) == ["market_update"]
+    baseline = {"params": report["params"], "results": {
+        "market_update": dict(report["results"]["market_update"],
+                              median_s=report["results"]["market_update"]["median_s"] / 2),
+    }}
+    assert compare(report, baseline, 0.1) == ["market_update"]
+    assert compare(report, report, 0.1) == []
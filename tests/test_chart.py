@@ -0,0 +1,48 @@
+import numpy as np
+import pygame
+from core.chart import PriceChart
+from core.history import MarketHistory
+from helpers import make_screen_game
+
+
+def test_renders_only_when_a_turn_is_recorded(monkeypatch):
+    game = make_screen_game()
+    chart = PriceChart((0, 0, 300, 120))
+    history = MarketHistory(["raw", "goods"], capacity=8)
+    renders = []
+    render = chart.render
+
+    def counting_render(font, history):
+        renders.append(history.total)
+        render(font, history)
+
+    monkeypatch.setattr(chart, "render", counting_render)
+    for _ in range(3):
+        chart.draw(game.screen, game.font, history)
+    history.record(np.arange(8.0))
+    history.record(np.arange(8.0) + 1)
+    for _ in range(3):
+        chart.draw(game.screen, game.font, history)
+    assert renders == [0, 2]
+    chart.draw(game.screen, game.font, MarketHistory(["raw", "goods"], capacity=8))
+    assert renders == [0, 2, 0]
+
+
+def test_short_windows_get_a_point_per_value():
+    chart = PriceChart((0, 0, 300, 120))
+    plot = pygame.Rect(5, 15, 100, 90)
+    points = chart.points(np.array([1.0, 3.0, 2.0]), plot, 1.0, 10.0)
+    assert [x for x, _ in points] == [5, 54, 104]
+    assert [y for _, y in points] == [104, 84, 94]
+
+
+def test_long_windows_reduce_to_column_extremes():
+    chart = PriceChart((0, 0, 300, 120))
+    plot = pygame.Rect(0, 0, 50, 101)
+    values = np.random.default_rng(5).uniform(0, 100, size=1000)
+    points = chart.points(values, plot, 0.0, 1.0)
+    assert len(points) == 2 * plot.width
+    ys = np.array([y for _, y in points])
+    columns = values.reshape(plot.width, -1)
+    assert np.array_equal(ys[0::2], plot.bottom - 1 - columns.max(axis=1))
+    assert np.array_equal(ys[1::2], plot.bottom - 1 - columns.min(axis=1))
@@ -0,0 +1,53 @@
+import random
+import numpy as np
+from core.clearing import clear_sector
+
+
+def volume_at(price, sell_limits, sell_quantities, buy_limits, buy_quantities):
+    supply = sum(q for limit, q in zip(sell_limits, sell_quantities) if limit <= price)
+    demand = sum(q for limit, q in zip(buy_limits, buy_quantities) if limit >= price)
+    return min(supply, demand)
+
+
+def test_price_maximizes_volume_and_respects_limits():
+    rng = random.Random(3)
+    for _ in range(300):
+        sells = [(rng.randrange(1, 30), rng.randrange(1, 10)) for _ in range(rng.randrange(1, 8))]
+        buys = [(rng.randrange(1, 30), rng.randrange(1, 10)) for _ in range(rng.randrange(1, 8))]
+        sell_limits, sell_quantities = zip(*sells)
+        buy_limits, buy_quantities = zip(*buys)
+        price, sell_fills, buy_fills = clear_sector(sell_limits, sell_quantities, buy_limits, buy_quantities)
+        candidates = set(sell_limits) | set(buy_limits)
+        best = max(volume_at(p, sell_limits, sell_quantities, buy_limits, buy_quantities) for p in candidates)
+        if price is None:
+            assert best == 0
+            continue
+        assert sell_fills.sum() == buy_fills.sum() == best
+        assert all(fill == 0 or limit <= price for limit, fill in zip(sell_limits, sell_fills))
+        assert all(fill == 0 or limit >= price for limit, fill in zip(buy_limits, buy_fills))
+        assert (sell_fills <= sell_quantities).all() and (buy_fills <= buy_quantities).all()
+
+
+def test_long_side_fills_by_price_then_arrival():
+    price, sell_fills, buy_fills = clear_sector([10, 8, 8], [5, 5, 5], [12], [8])
+    assert price is not None
+    assert sell_fills.tolist() == [0, 5, 3]
+    assert buy_fills.tolist() == [8]
+
+
+def test_order_of_intents_does_not_change_the_price():
+    sells, buys = [(5, 4), (9, 2), (7, 6)], [(8, 3), (10, 5), (6, 2)]
+    prices = set()
+    for _ in range(10):
+        random.shuffle(sells)
+        random.shuffle(buys)
+        price, _, _ = clear_sector(*zip(*sells), *zip(*buys))
+        prices.add(price)
+    assert len(prices) == 1
+
+
+def test_nothing_trades_without_a_crossing():
+    price, sell_fills, buy_fills = clear_sector([20], [5], [10], [5])
+    assert price is None
+    assert not np.any(sell_fills) and not np.any(buy_fills)
+    assert clear_sector([], [], [10], [5])[0] is None
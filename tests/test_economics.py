@@ -0,0 +1,55 @@
+import random
+import pytest
+from core.economics import CostTable
+
+COSTS = {
+    "raw": {"fixed": 20, "variable": 2, "increasing": 0.5},
+    "manufactured": {"fixed": 50, "variable": 5, "increasing": 1.5},
+    "flat": {"fixed": 10, "variable": 4, "increasing": 0},
+}
+
+
+def brute_force(table, good, revenue, cap):
+    profits = [revenue(q) - table.total_cost(good, q) if q else 0.0 for q in range(cap + 1)]
+    return max(profits)
+
+
+def test_marginal_costs_add_up_to_total():
+    table = CostTable(COSTS, max_quantity=50)
+    for good in COSTS:
+        assert sum(table.marginal_cost(good, q) for q in range(51)) == pytest.approx(table.total_cost(good, 50))
+        assert table.marginal_cost(good, 80) == pytest.approx(table.total_cost(good, 80) - table.total_cost(good, 79))
+
+
+def test_best_quantity_matches_brute_force():
+    table = CostTable(COSTS, max_quantity=100)
+    rng = random.Random(1)
+    for _ in range(300):
+        good, price, cap = rng.choice(list(COSTS)), rng.uniform(0, 60), rng.randrange(0, 100)
+        quantity = table.best_quantity(good, price, cap)
+        assert 0 <= quantity <= cap
+        assert table.profit(good, quantity, price) == pytest.approx(
+            brute_force(table, good, lambda q: price * q, cap))
+
+
+def test_schedule_quantity_matches_brute_force():
+    table = CostTable(COSTS, max_quantity=100)
+    rng = random.Random(2)
+    for _ in range(200):
+        good = rng.choice(list(COSTS))
+        prices = sorted((rng.uniform(1, 60) for _ in range(3)), reverse=True)
+        schedule = [(price, rng.randrange(0, 15)) for price in prices]
+
+        def revenue(q):
+            total = 0.0
+            for price, demand in schedule:
+                sold = min(q, demand)
+                total += sold * price
+                q -= sold
+            return total
+
+        sellable = sum(demand for _, demand in schedule)
+        quantity = table.best_quantity_for_schedule(good, schedule)
+        assert 0 <= quantity <= sellable
+        best = brute_force(table, good, revenue, sellable)
+        assert (revenue(quantity) - table.total_cost(good, quantity) if quantity else 0.0) == pytest.approx(best)
@@ -0,0 +1,50 @@
+import pygame
+from core.game import STATE_CHANGED
+from helpers import make_screen_game
+
+
+class CountingClock:
+    def __init__(self):
+        self.ticks = []
+
+    def tick(self, fps):
+        self.ticks.append(fps)
+
+
+def run_until_quit(monkeypatch, game, blocking, events):
+    # Runs the loop over the given batches of events, one batch per
+    # frame, then a QUIT; returns (wait timeouts, frames rendered)
+    batches = iter(events + [[pygame.event.Event(pygame.QUIT)]])
+    waits, frames = [], []
+    monkeypatch.setattr(pygame, "quit", lambda: None)
+    monkeypatch.setattr(pygame.event, "wait", lambda timeout=0: waits.append(timeout) or next(batches)[0])
+    monkeypatch.setattr(pygame.event, "get", lambda: [] if blocking else next(batches))
+    monkeypatch.setattr(game, "render", lambda: frames.append(True))
+    game.clock = CountingClock()
+    game.run(blocking=blocking, timeout_ms=0)
+    return waits, frames
+
+
+def test_blocking_loop_waits_for_events(monkeypatch):
+    game = make_screen_game()
+    waits, frames = run_until_quit(monkeypatch, game, True, [[pygame.event.Event(STATE_CHANGED)]])
+    assert waits == [0, 0]
+    assert len(frames) == 1
+    assert game.clock.ticks == []
+    assert pygame.event.get_blocked(pygame.MOUSEMOTION)
+    pygame.event.set_allowed(pygame.MOUSEMOTION)
+
+
+def test_polling_loop_ticks_at_60_fps(monkeypatch):
+    game = make_screen_game()
+    waits, frames = run_until_quit(monkeypatch, game, False, [[], []])
+    assert waits == []
+    assert len(frames) == 2
+    assert game.clock.ticks == [60, 60]
+
+
+def test_state_changes_wake_the_loop():
+    game = make_screen_game()
+    pygame.event.clear()
+    game.notify_state_changed()
+    assert [event.type for event in pygame.event.get()] == [STATE_CHANGED]
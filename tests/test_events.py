@@ -0,0 +1,61 @@
+import pytest
+from types import SimpleNamespace
+from utils.events import EventScheduler, Effects
+
+
+def recorder(scheduler, kinds):
+    fired = []
+    for kind in kinds:
+        scheduler.register(kind, lambda event, context, effects: fired.append((context.turn, event.kind)))
+    return fired
+
+
+def run(scheduler, turns):
+    for turn in range(1, turns + 1):
+        scheduler.fire(turn, SimpleNamespace(turn=turn))
+
+
+def test_events_fire_in_due_then_scheduling_order():
+    scheduler = EventScheduler()
+    fired = recorder(scheduler, "abcd")
+    scheduler.schedule("b", 3)
+    scheduler.schedule("a", 2)
+    scheduler.schedule("c", 3)
+    cancelled = scheduler.schedule("d", 2)
+    assert scheduler.cancel(cancelled) and not scheduler.cancel(cancelled)
+    assert len(scheduler) == 3
+    run(scheduler, 5)
+    assert fired == [(2, "a"), (3, "b"), (3, "c")]
+    assert len(scheduler) == 0 and scheduler.next_turn() is None
+
+
+def test_recurring_and_conditional_events():
+    scheduler = EventScheduler()
+    fired = recorder(scheduler, ["tick", "late"])
+    scheduler.register_condition("after_4", lambda context: context.turn > 4)
+    scheduler.schedule("tick", 2, every=3)
+    scheduler.schedule("late", 1, condition="after_4")
+    run(scheduler, 9)
+    assert fired == [(2, "tick"), (5, "tick"), (5, "late"), (8, "tick")]
+    with pytest.raises(ValueError):
+        scheduler.schedule("late", 1, condition="missing")
+
+
+def test_cancels_compact_the_heap():
+    scheduler = EventScheduler()
+    events = [scheduler.schedule("a", turn) for turn in range(100)]
+    for event in events[:60]:
+        scheduler.cancel(event)
+    assert len(scheduler.heap) < 100 and len(scheduler) == 40
+
+
+def test_effects_combine_per_field():
+    target = SimpleNamespace(price=10.0)
+    effects = Effects()
+    effects.add(target, "price", 2)
+    effects.scale(target, "price", 3)
+    effects.scale(target, "price", 0.5)
+    assert effects.targets() == [target]
+    effects.apply()
+    assert target.price == 10.0 * 1.5 + 3
+    assert len(effects) == 0
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from core.factory import FLEET_BATCH_THRESHOLD, PRODUCT_TYPES, Factory, FactoryFleet
+from core.player import Player
+
+
+def factories(count):
+    return [Factory(PRODUCT_TYPES[i % 3], 3 + i % 5, efficiency=1.0 + i % 4 / 10, labor_cost=5 + i % 7)
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("money", [0, 700, 2500, 10 ** 6])
+def test_batched_production_matches_one_by_one(money):
+    count = 3 * FLEET_BATCH_THRESHOLD
+    batched, single = Player("A", "Technologist"), Player("B", "Technologist")
+    for player in (batched, single):
+        player.factories = factories(count)
+        player.money = money
+    produced = batched.produce_all(None)
+    expected = [single.produce(factory, None) for factory in single.factories]
+    assert produced == expected
+    assert batched.money == single.money
+    for product_type in PRODUCT_TYPES:
+        assert batched.inventory[product_type] == pytest.approx(single.inventory[product_type])
+
+
+def test_views_survive_growth():
+    fleet = FactoryFleet()
+    views = factories(FLEET_BATCH_THRESHOLD - 1)
+    for factory in views:
+        fleet.append(factory)
+    assert not fleet.in_arrays
+    views[3].labor_cost = 1
+    for factory in factories(5 * FLEET_BATCH_THRESHOLD):
+        fleet.append(factory)
+    assert fleet.in_arrays
+    assert all(fleet[i] is factory for i, factory in enumerate(views))
+    assert views[3].labor_cost == 1 and fleet.index(views[3]) == 3
+    views[3].detach()
+    assert views[3].labor_cost == 1 and views[3].fleet is None
+
+
+def test_batched_upgrades_match_factory_upgrade():
+    fleet = FactoryFleet(factories(2 * FLEET_BATCH_THRESHOLD))
+    alone = factories(2 * FLEET_BATCH_THRESHOLD)
+    mask = fleet.affordable_upgrades(100) & (np.arange(len(fleet)) % 2 == 0)
+    fleet.upgrade(mask)
+    for factory, upgraded in zip(alone, mask.tolist()):
+        if upgraded:
+            factory.upgrade()
+    fields = [(f.level, f.production_capacity, f.efficiency) for f in alone]
+    assert [(f.level, f.production_capacity, f.efficiency) for f in fleet] == fields
+    assert fleet.upgrade_costs().tolist() == [f.upgrade_cost() for f in alone]
@@ -0,0 +1,61 @@
+import pytest
+from core.config import HISTORY_CAPACITY
+from core.fork import SNAPSHOTS
+from helpers import make_game, play, signature
+
+
+def branch(sim, turns, seed, joining=None):
+    # Plays a branch and rolls it back; returns the types the fork saved
+    before = signature(sim)
+    sim.fork()
+    if joining:
+        sim.add_player(joining)
+    play(sim, turns, seed)
+    saved = {type(obj) for obj, _, _ in sim.trail.frames[-1].values()}
+    sim.rollback()
+    assert signature(sim) == before
+    return saved
+
+
+def test_rollback_restores_every_registered_type():
+    saved = set()
+    for simultaneous in (False, True):
+        sim = make_game(7, simultaneous)
+        play(sim, 20)
+        sim.events.schedule("economic_boom", sim.turn + 1)
+        sim.events.schedule("random_event", sim.turn + 2)
+        # Long enough for the history buffer to start a new block
+        saved |= branch(sim, HISTORY_CAPACITY + 10, seed=1, joining="Technologist")
+    assert saved == set(SNAPSHOTS)
+
+
+@pytest.mark.parametrize("simultaneous", [False, True])
+def test_rollback_then_same_actions_give_the_same_game(simultaneous):
+    sim, twin = make_game(7, simultaneous), make_game(7, simultaneous)
+    play(sim, 15)
+    play(twin, 15)
+    for seed in range(5):
+        branch(sim, 10, seed)
+    play(sim, 30, seed=9)
+    play(twin, 30, seed=9)
+    assert signature(sim) == signature(twin)
+
+
+def test_nested_forks():
+    sim = make_game(7)
+    play(sim, 5)
+    start = signature(sim)
+    sim.fork()
+    play(sim, 5, seed=1)
+    middle = signature(sim)
+    sim.fork()
+    play(sim, 5, seed=2)
+    sim.rollback()
+    assert signature(sim) == middle
+    sim.fork()
+    play(sim, 5, seed=3)
+    # Committing the inner fork hands its changes to the outer one
+    sim.commit()
+    sim.rollback()
+    assert signature(sim) == start
+    assert not sim.trail
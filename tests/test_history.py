@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from core.history import SECTOR_SERIES, History, MarketHistory
+
+
+def brute_ema(values, alpha):
+    ema = values[0]
+    for value in values[1:]:
+        ema = alpha * value + (1 - alpha) * ema
+    return ema
+
+
+@pytest.mark.parametrize("capacity", [1, 4, 7])
+def test_statistics_match_a_rescan_of_the_window(capacity):
+    rng = np.random.default_rng(capacity)
+    history = History([("raw", "price"), ("raw", "demand")], capacity=capacity, ema_span=5)
+    recorded = []
+    for turn in range(40):
+        values = rng.uniform(-50, 50, size=2)
+        history.record(values)
+        recorded.append(values)
+        # Read at irregular intervals so catch-up covers partial blocks too
+        if turn % 3 and turn % 5:
+            continue
+        window = np.array(recorded[-capacity:])
+        everything = np.array(recorded)
+        for i, key in enumerate(history.keys):
+            assert np.array_equal(history.view(*key), window[:, i])
+            assert history.last(*key) == window[-1, i]
+            assert history.mean(*key) == pytest.approx(window[:, i].mean())
+            assert history.variance(*key) == pytest.approx(window[:, i].var(), abs=1e-9)
+            assert history.min(*key) == window[:, i].min()
+            assert history.max(*key) == window[:, i].max()
+            assert history.ema(*key) == pytest.approx(brute_ema(everything[:, i], history.alpha))
+    assert len(history) == capacity
+
+
+def test_empty_history():
+    history = History([("raw", "price")], capacity=3)
+    assert len(history) == 0
+    assert history.view("raw", "price").size == 0
+    assert history.last("raw", "price") is None
+    assert history.min("raw", "price") is None and history.max("raw", "price") is None
+    assert history.variance("raw", "price") == 0.0
+
+
+def test_views_are_read_only():
+    history = History([("raw", "price")], capacity=3)
+    history.record([1.0])
+    with pytest.raises(ValueError):
+        history.view("raw", "price")[0] = 2.0
+
+
+def test_market_history_keeps_a_sectors_rows_together():
+    history = MarketHistory(["raw", "goods"], capacity=4)
+    for turn in range(6):
+        history.record(np.arange(8) + 10 * turn)
+    view = history.sector_view("goods")
+    assert view.shape == (len(SECTOR_SERIES), 4)
+    for row, series in enumerate(SECTOR_SERIES):
+        assert np.array_equal(view[row], history.view("goods", series))
@@ -0,0 +1,72 @@
+from core.market import BUY, SELL, Market, OrderBook, Order
+from core.player import Player
+from core.simulation import Simulation
+
+
+def make_order(order_id, side, price, quantity=1):
+    return Order(order_id, None, "raw", side, quantity, price)
+
+
+def test_price_time_priority():
+    book = OrderBook("raw")
+    for order_id, price in ((1, 12.0), (2, 10.0), (3, 10.0), (4, 11.0)):
+        book.add(make_order(order_id, SELL, price))
+    assert book.best_ask().order_id == 2
+    trades = book.add(make_order(5, BUY, 11.0, quantity=3))
+    # Cheapest first, the earlier order first at the same price, each at
+    # the resting order's price
+    assert [(sell.order_id, quantity, price) for _, sell, quantity, price in trades] == [
+        (2, 1, 10.0), (3, 1, 10.0), (4, 1, 11.0)]
+    assert book.best_ask().order_id == 1
+    assert book.best_bid() is None
+
+
+def test_partial_fill_rests_the_remainder():
+    book = OrderBook("raw")
+    book.add(make_order(1, BUY, 9.0, quantity=5))
+    trades = book.add(make_order(2, SELL, 8.0, quantity=2))
+    assert [(quantity, price) for _, _, quantity, price in trades] == [(2, 9.0)]
+    assert book.best_bid().quantity == 3
+    assert len(book) == 1
+
+
+def test_cancels_are_lazy_and_compacted():
+    book = OrderBook("raw")
+    for order_id in range(1, 11):
+        book.add(make_order(order_id, SELL, float(order_id)))
+    for order_id in range(1, 10):
+        assert book.cancel(order_id) is not None
+    assert book.cancel(1) is None
+    assert book.best_ask().order_id == 10
+    assert len(book.asks) <= 2 * len(book)
+
+
+def test_fills_pay_both_owners():
+    market = Market()
+    seller, buyer = Player("Player 1", "Monopolist"), Player("Player 2", "Technologist")
+    seller.inventory["raw"] = 10
+    money = buyer.money
+    seller.list_goods("raw", 4, 10.0, market)
+    buyer.bid_for_goods("raw", 3, 12.0, market)
+    assert buyer.inventory["raw"] == 3
+    # The bid escrowed 12 a unit and filled at 10
+    assert buyer.money == money - 30.0
+    assert len(seller.listed_goods["raw"]) == 1
+    assert not buyer.bids["raw"]
+
+
+def test_only_the_owner_cancels():
+    sim = Simulation(max_turns=100, seed=0)
+    owner, other = sim.add_player("Monopolist"), sim.add_player("Technologist")
+    owner.inventory["luxury"] = 50
+    sim.list_goods("luxury", 50, 100.0)
+    order = next(iter(owner.listed_goods["luxury"].values()))
+    sim.end_turn()
+    assert sim.player is other
+    assert not sim.cancel_order(order)
+    assert other.inventory["luxury"] == 0
+    assert order.order_id in sim.market.order_books["luxury"].orders
+    sim.end_turn()
+    assert sim.cancel_order(order)
+    assert owner.inventory["luxury"] == 50
+    assert not owner.listed_goods["luxury"]
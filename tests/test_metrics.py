@@ -0,0 +1,45 @@
+import csv
+import json
+import pytest
+from utils.metrics import BUCKETS_PER_OCTAVE, NULL_TIMER, Histogram, Metrics, metrics
+from helpers import make_game, play
+
+
+def test_percentiles_are_within_a_bucket():
+    histogram = Histogram()
+    for i in range(1, 1001):
+        histogram.record(i / 1000)
+    tolerance = 1 / BUCKETS_PER_OCTAVE
+    for q in (50, 95, 99):
+        assert histogram.percentile(q) == pytest.approx(q / 100, rel=tolerance)
+    assert histogram.max == 1.0
+    assert histogram.mean() == pytest.approx(0.5005)
+
+
+def test_disabled_metrics_record_nothing():
+    disabled = Metrics()
+    assert disabled.timer("turn") is NULL_TIMER
+    disabled.record("turn", 1.0)
+    assert disabled.summary() == {}
+
+
+def test_turn_phases_are_timed(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "histograms", {})
+    play(make_game(), 10)
+    summary = metrics.summary()
+    assert summary["market_update"]["count"] == 10
+    assert summary["listing_settlement"]["count"] == 10
+
+
+def test_dump_formats(tmp_path):
+    enabled = Metrics(enabled=True)
+    enabled.record("draw", 0.002)
+    enabled.record("draw", 0.004)
+    enabled.dump(str(tmp_path / "metrics.json"))
+    phases = json.loads((tmp_path / "metrics.json").read_text())["phases"]
+    assert phases["draw"]["count"] == 2
+    enabled.dump(str(tmp_path / "metrics.csv"))
+    with open(tmp_path / "metrics.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][0] == "phase" and rows[1][:2] == ["draw", "2"]
@@ -0,0 +1,79 @@
+import pytest
+from core.faction import FACTIONS
+from core.modifiers import MODIFIERS, Modifiers, split_effects
+from core.save import load_game, save_game
+from helpers import make_game, play
+
+
+def test_table_is_the_product_of_the_sources():
+    modifiers = Modifiers()
+    modifiers.set(("faction", "Monopolist"), {"production": 1.5, "bribery_cost": 0.5})
+    modifiers.set(("tech", "Automation"), {"production": 2.0})
+    assert modifiers["production"] == 3.0
+    assert modifiers["bribery_cost"] == 0.5
+    modifiers.set(("tech", "Automation"), {"production": 1.2})
+    assert modifiers["production"] == pytest.approx(1.8)
+    modifiers.remove(("tech", "Automation"))
+    modifiers.remove(("tech", "Automation"))
+    assert modifiers["production"] == 1.5
+    assert all(modifiers[name] == 1.0 for name in MODIFIERS if name not in ("production", "bribery_cost"))
+
+
+def test_replace_swaps_one_kind_of_source():
+    modifiers = Modifiers()
+    modifiers.set(("faction", "Monopolist"), {"trade_revenue": 2.0})
+    modifiers.set(("tech", "Automation"), {"production": 2.0})
+    modifiers.replace("tech", {"Logistics": {"trade_revenue": 1.5}})
+    assert set(modifiers.sources) == {("faction", "Monopolist"), ("tech", "Logistics")}
+    assert modifiers["production"] == 1.0
+    assert modifiers["trade_revenue"] == 3.0
+
+
+def test_changes_rebind_rather_than_mutate():
+    # Fork snapshots keep sources and table by reference
+    modifiers = Modifiers()
+    modifiers.set(("tech", "Automation"), {"production": 2.0})
+    sources, table = modifiers.sources, modifiers.table
+    modifiers.set(("tech", "Logistics"), {"production": 2.0})
+    modifiers.remove(("tech", "Automation"))
+    modifiers.replace("tech", {})
+    assert sources == {("tech", "Automation"): {"production": 2.0}}
+    assert table["production"] == 2.0
+
+
+def test_unknown_modifier_is_rejected():
+    modifiers = Modifiers()
+    with pytest.raises(ValueError):
+        modifiers.set(("tech", "Automation"), {"luck": 2.0})
+    assert modifiers.sources == {}
+
+
+def test_split_effects():
+    modifiers, others = split_effects([("production", 1.5), ("capacity", 1), ("production", 2.0), ("influence", 5)])
+    assert modifiers == {"production": 3.0}
+    assert others == [("capacity", 1), ("influence", 5)]
+
+
+def test_faction_source():
+    sim = make_game(0)
+    for player in sim.players:
+        faction = FACTIONS[player.faction.name]
+        assert player.modifiers.sources[("faction", faction.name)] == faction.modifiers()
+        assert player.modifiers["scandal_chance"] == faction.scandal_chance
+
+
+def test_loaded_game_keeps_event_sources_and_rebuilds_the_rest(tmp_path):
+    sim = make_game(7)
+    play(sim, 40)
+    player = sim.players[0]
+    player.modifiers.set(("event", "Boom"), {"trade_revenue": 1.25})
+    # Not backed by a researched tech, so a load does not bring it back
+    player.modifiers.set(("tech", "Phantom"), {"production": 9.0})
+    path = tmp_path / "game.sav"
+    save_game(sim, path)
+    copy = load_game(path)
+    player.modifiers.remove(("tech", "Phantom"))
+    for ours, theirs in zip(sim.players, copy.players):
+        assert theirs.modifiers.sources == ours.modifiers.sources
+        assert theirs.modifiers.table == ours.modifiers.table
+    assert copy.players[0].modifiers["trade_revenue"] == 1.25
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from core import politics as politics_module
+from core.config import POLITICS_INFLUENCE_CAP, POLITICS_SCANDAL_LOSS, POLITICS_VOTE_INTERVAL
+from core.player import Player
+from core.politics import Politics
+from core.simulation import Simulation
+
+
+class FixedRandom:
+    # Every draw is the same value: 0 catches every briber, 1 none
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+NEVER, ALWAYS = FixedRandom(1.0), FixedRandom(0.0)
+
+
+def make_politics(*factions):
+    return Politics([Player(f"Player {i + 1}", name) for i, name in enumerate(factions)])
+
+
+def region_politicians(politics, region):
+    return np.flatnonzero(politics.map.region == politics.map.regions.index(region)).tolist()
+
+
+def test_bribes_add_influence_and_control():
+    politics = make_politics("Monopolist", "Technologist")
+    integrity = int(politics.map.integrity[3])
+    politics.bribe(0, 3, integrity - 1)
+    politics.bribe(1, 3, 1)
+    changed = politics.resolve(1, NEVER)
+    assert changed == set(politics.players)
+    assert politics.influence(0, 3) == integrity - 1
+    assert politics.backers[3] == {0: integrity - 1, 1: 1}
+    assert politics.players[0].political_influence == integrity - 1
+    assert politics.leader[3] == 0 and politics.controller[3] == -1
+    politics.bribe(0, 3, 1)
+    politics.resolve(2, NEVER)
+    assert politics.controller[3] == 0
+    assert politics.controlled(0) == 1
+
+
+def test_ties_go_to_the_lower_index():
+    politics = make_politics("Monopolist", "Technologist")
+    integrity = int(politics.map.integrity[0])
+    politics.bribe(1, 0, integrity)
+    politics.bribe(0, 0, integrity)
+    politics.resolve(1, NEVER)
+    assert politics.controller[0] == 0
+
+
+def test_scandal_voids_the_bribes_and_costs_influence():
+    politics = make_politics("Political Machine")
+    start = politics.players[0].political_influence
+    politics.bribe(0, 5, 20)
+    politics.resolve(1, NEVER)
+    politics.bribe(0, 6, 20)
+    politics.resolve(2, ALWAYS)
+    assert politics.scandals == [(2, 0)]
+    assert politics.influence(0, 6) == 0
+    assert politics.influence(0, 5) == 20 - int(20 * POLITICS_SCANDAL_LOSS)
+    assert politics.players[0].political_influence == start + 20 - int(20 * POLITICS_SCANDAL_LOSS)
+
+
+def test_controllers_vote_their_factions_stance():
+    politics = make_politics("Technologist", "Monopolist")
+    monopolist = politics.players[1]
+    capacities = [factory.production_capacity for factory in monopolist.factories]
+    for politician in region_politicians(politics, "Capital"):
+        politics.bribe(0, politician, int(politics.map.integrity[politician]))
+    politics.resolve(POLITICS_VOTE_INTERVAL - 1, NEVER)
+    assert not politics.passed.any()
+    changed = politics.resolve(POLITICS_VOTE_INTERVAL, NEVER)
+    assert "Antitrust Act" in politics.passed_regulations()
+    assert monopolist in changed
+    assert [factory.production_capacity for factory in monopolist.factories] == [c - 1 for c in capacities]
+    # A vote that changed nothing is not held again until control changes
+    assert not politics.vote_due(2 * POLITICS_VOTE_INTERVAL)
+
+
+def test_votes_only_where_control_changed():
+    politics = make_politics("Technologist", "Monopolist")
+    politics.resolve(POLITICS_VOTE_INTERVAL, NEVER)
+    assert politics.stale == frozenset()
+    assert "Antitrust Act" not in politics.passed_regulations()
+    assert "Research Grants" in politics.passed_regulations()
+    # Coast has nothing left to vote on, the Capital does
+    for region in ("Coast", "Capital"):
+        politician = region_politicians(politics, region)[0]
+        politics.bribe(0, politician, int(politics.map.integrity[politician]))
+    politics.resolve(POLITICS_VOTE_INTERVAL + 1, NEVER)
+    assert politics.stale == {politics.map.regions.index("Capital")}
+    assert politics.vote_due(2 * POLITICS_VOTE_INTERVAL)
+
+
+@pytest.mark.parametrize("threshold", [0, 10 ** 9])
+def test_batched_and_single_paths_agree(monkeypatch, threshold):
+    def run():
+        politics = make_politics("Monopolist", "Technologist", "Political Machine")
+        rng = np.random.default_rng(1)
+        targets = []
+        for turn in range(1, 30):
+            for _ in range(40):
+                politics.bribe(int(rng.integers(3)), int(rng.integers(len(politics.map))),
+                               int(rng.integers(1, 15)))
+            politics.resolve(turn, NEVER)
+            targets.append([politics.target(i) for i in range(3)])
+        return targets, politics.leader, politics.lead, politics.controller, politics.need, politics.passed
+
+    expected = run()
+    monkeypatch.setattr(politics_module, "POLITICS_BATCH_THRESHOLD", threshold)
+    monkeypatch.setattr(politics_module, "POLITICS_VOTE_BATCH_THRESHOLD", threshold)
+    for ours, theirs in zip(run(), expected):
+        assert np.array_equal(ours, theirs)
+
+
+def test_matrix_round_trip():
+    politics = make_politics("Monopolist", "Technologist")
+    for politician in range(0, len(politics.map), 3):
+        politics.bribe(politician % 2, politician, 25)
+    politics.resolve(1, NEVER)
+    copy = make_politics("Monopolist", "Technologist")
+    copy.set_matrix(*politics.matrix())
+    assert copy.holdings == politics.holdings
+    assert copy.backers == politics.backers
+    assert np.array_equal(copy.controller, politics.controller)
+    assert np.array_equal(copy.need, politics.need)
+
+
+def test_influence_cap():
+    sim = Simulation(max_turns=100, seed=0)
+    sim.add_player("Political Machine")
+    sim.player.money = 10 ** 6
+    sim.player.political_influence = POLITICS_INFLUENCE_CAP
+    assert not sim.influence_politics()
+    assert not sim.politics.pending
+    sim.player.political_influence = POLITICS_INFLUENCE_CAP - 1
+    assert sim.influence_politics()
+    assert len(sim.politics.pending) == 1
@@ -0,0 +1,40 @@
+import pygame
+from helpers import make_screen_game
+
+
+def record_updates(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pygame.display, "flip", lambda: calls.append("flip"))
+    monkeypatch.setattr(pygame.display, "update", lambda rects: calls.append(list(rects)))
+    return calls
+
+
+def test_unchanged_frames_push_nothing(monkeypatch):
+    game = make_screen_game()
+    calls = record_updates(monkeypatch)
+    game.render()
+    assert calls == ["flip"]
+    game.render()
+    game.render()
+    assert calls == ["flip"]
+
+
+def test_only_changed_regions_are_pushed(monkeypatch):
+    game = make_screen_game()
+    calls = record_updates(monkeypatch)
+    game.render()
+    game.produce()
+    game.render()
+    regions = {name: rect for name, rect, _ in game.view_regions(game.current_view())}
+    assert calls[1:] == [[regions["player"]]]
+
+
+def test_view_change_and_invalidate_redraw_everything(monkeypatch):
+    game = make_screen_game()
+    calls = record_updates(monkeypatch)
+    game.render()
+    game.toggle_factory_view()
+    game.render()
+    game.invalidate()
+    game.render()
+    assert calls == ["flip", "flip", "flip"]
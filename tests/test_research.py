@@ -0,0 +1,64 @@
+import pytest
+from core.faction import FACTIONS
+from core.player import Player
+from core.research import Tech, TechTree, indices, tech_tree
+
+
+def prerequisites(tree, name):
+    # Walks the requires links, for comparison with the closure bitsets
+    found, stack = set(), list(tree.techs[tree.index[name]].requires)
+    while stack:
+        name = stack.pop()
+        if name not in found:
+            found.add(name)
+            stack.extend(tree.techs[tree.index[name]].requires)
+    return found
+
+
+@pytest.mark.parametrize("faction_name", list(FACTIONS))
+def test_closure_is_every_transitive_prerequisite(faction_name):
+    tree = tech_tree(faction_name)
+    for i, tech in enumerate(tree.techs):
+        assert set(tree.names(tree.closure[i])) == prerequisites(tree, tech.name)
+        # Topological order: prerequisites come first
+        assert all(j < i for j in indices(tree.closure[i]))
+
+
+@pytest.mark.parametrize("faction_name", list(FACTIONS))
+def test_frontier_follows_research(faction_name):
+    player = Player("Player 1", faction_name)
+    research, tree = player.research, player.research.tree
+    assert research.researched == tree.bits(tree.starting)
+    while research.available:
+        assert research.available == tree.frontier(research.researched)
+        for tech in tree.techs:
+            assert research.can_research(tech.name) == tree.can_research(research.researched, tech.name)
+        research.complete(tree.names(research.available)[-1])
+    assert research.researched == (1 << len(tree)) - 1
+
+
+def test_restore_matches_completing():
+    player, copy = Player("Player 1", "Technologist"), Player("Player 2", "Technologist")
+    for name in ("Efficiency", "Marketing", "Automation"):
+        player.research.complete(name)
+    copy.research.restore(list(player.technologies))
+    assert copy.research.researched == player.research.researched
+    assert copy.research.available == player.research.available
+    assert copy.technologies == player.technologies
+    assert copy.modifiers.sources == player.modifiers.sources
+    assert "Automation" in copy.research and "Robotics" not in copy.research
+
+
+def test_faction_trees_are_shared():
+    assert Player("Player 1", "Monopolist").research.tree is Player("Player 2", "Monopolist").research.tree
+    assert "Vertical Integration" in tech_tree("Monopolist").index
+    assert "Vertical Integration" not in tech_tree("Technologist").index
+
+
+def test_invalid_trees():
+    with pytest.raises(ValueError, match="cycle"):
+        TechTree([Tech("A", 1, ["B"]), Tech("B", 1, ["A"]), Tech("C", 1)])
+    with pytest.raises(ValueError, match="unknown tech"):
+        TechTree([Tech("A", 1, ["Z"])])
+    with pytest.raises(ValueError, match="unknown effect"):
+        TechTree([Tech("A", 1, effects=[("luck", 2)])])
@@ -0,0 +1,64 @@
+from core.save import (CHECKPOINT, DELTA, SaveWriter, load_game, numeric_fields, open_orders, pack_game_state,
+                       pack_politics, save_game, structure)
+from helpers import make_game, play
+
+
+def saved_state(sim):
+    return structure(sim), numeric_fields(sim), open_orders(sim), pack_politics(sim), pack_game_state(sim)
+
+
+def test_save_round_trip(tmp_path):
+    sim = make_game(11)
+    path = tmp_path / "game.sav"
+    for turns in (0, 1, 7, 30):
+        play(sim, turns)
+        save_game(sim, path)
+        assert saved_state(load_game(path)) == saved_state(sim)
+
+
+def test_loaded_game_continues_identically(tmp_path):
+    for seed in (2 ** 64 - 1, -7, "abc"):
+        sim = make_game(seed)
+        play(sim, 25)
+        path = tmp_path / "game.sav"
+        save_game(sim, path)
+        copy = load_game(path)
+        play(sim, 25, seed=1)
+        play(copy, 25, seed=1)
+        assert saved_state(copy) == saved_state(sim)
+
+
+def test_deltas_rebuild_every_turn(tmp_path):
+    sim = make_game(11)
+    path = tmp_path / "game.sav"
+    writer = SaveWriter(path, checkpoint_interval=4)
+    states = {}
+    for _ in range(12):
+        play(sim, 1)
+        kind, payload = writer.encoder.encode(sim)
+        writer.write(kind, sim.turn, payload)
+        states[sim.turn] = saved_state(sim), kind
+    writer.close()
+    assert {kind for _, kind in states.values()} == {CHECKPOINT, DELTA}
+    for turn, (state, _) in states.items():
+        assert saved_state(load_game(path, turn)) == state
+
+
+def test_pending_events_round_trip(tmp_path):
+    sim = make_game(11)
+    sim.events.register_condition("late", lambda context: context.turn >= 12)
+    sim.events.schedule("recession", 3, condition="late")
+    cancelled = sim.events.schedule("economic_boom", 4)
+    sim.events.schedule("luxury_goods_craze", 5, every=3)
+    sim.events.cancel(cancelled)
+    path = tmp_path / "game.sav"
+    save_game(sim, path)
+    copy = load_game(path)
+    assert saved_state(copy) == saved_state(sim)
+    assert [(turn, event.kind, event.every, event.condition) for turn, _, event in copy.events.heap] == [
+        (turn, event.kind, event.every, event.condition) for turn, _, event in sim.events.heap
+        if not event.cancelled]
+    copy.events.register_condition("late", lambda context: context.turn >= 12)
+    play(sim, 15)
+    play(copy, 15)
+    assert saved_state(copy) == saved_state(sim)
@@ -0,0 +1,59 @@
+import random
+from core.scheduler import Leaderboard, Settlement, TurnScheduler, score
+from core.simulation import Simulation
+from helpers import FACTIONS, make_game, play
+
+
+class Scored:
+    def __init__(self, money):
+        self.money = money
+        self.political_influence = 0
+
+
+def test_leaderboard_matches_a_full_sort():
+    rng = random.Random(5)
+    players = [Scored(rng.randrange(100)) for _ in range(12)]
+    board = Leaderboard(players)
+    for _ in range(200):
+        player = rng.choice(players)
+        player.money = rng.randrange(100)
+        board.update(player)
+        expected = sorted(range(len(players)), key=lambda seat: (-score(players[seat]), seat))
+        assert [players.index(player) for player, _ in board.standings()] == expected
+        assert board.leader() is players[expected[0]]
+        assert board.rank(players[expected[3]]) == 3
+
+
+def test_leader_matches_game_over():
+    sim = make_game(2)
+    play(sim, 40)
+    assert sim.game_over() is max(sim.players, key=score)
+
+
+def test_sequential_and_simultaneous_seats():
+    scheduler = TurnScheduler()
+    assert [scheduler.next_seat(seat, 4) for seat in range(4)] == [1, 2, 3, 0]
+    assert TurnScheduler(True).phase_seats(6, 4) == [2, 3, 0, 1]
+    sim = Simulation(max_turns=10, seed=0, simultaneous=True)
+    for faction_name in FACTIONS:
+        sim.add_player(faction_name)
+    turn = sim.turn
+    sim.end_turn()
+    assert sim.turn == turn + 1
+    assert sim.current_player == (turn + 1) % len(FACTIONS)
+    assert all(player.actions_left == 3 for player in sim.players)
+
+
+def test_settlement_escrows_then_pays():
+    sim = make_game(4)
+    player = sim.players[0]
+    player.inventory["raw"] = 10
+    settlement = Settlement()
+    assert settlement.sell(player, "raw", 4)
+    assert not settlement.sell(player, "raw", 7)
+    assert player.inventory["raw"] == 6
+    money = player.money
+    price = sim.market.sectors["raw"].get_price()
+    assert settlement.settle(sim.market) == {player}
+    assert player.money == money + 4 * price * player.modifiers.table["trade_revenue"]
+    assert len(settlement) == 0
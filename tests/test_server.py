@@ -0,0 +1,156 @@
+import asyncio
+from core import journal as actions
+from core import protocol
+from core.journal import replay
+from core.save import RECORD, StateDecoder, numeric_fields, open_orders, structure
+from core.server import GameServer, LoopbackClient
+
+
+def run(test):
+    async def main():
+        server = GameServer(tick=0.01, max_sessions=2)
+        server.ticker = asyncio.create_task(server.run_ticks())
+        try:
+            await test(server)
+        finally:
+            await server.close()
+    asyncio.run(main())
+
+
+async def settle():
+    await asyncio.sleep(0.03)
+
+
+async def seated(server, session, factions, simultaneous=False):
+    clients = []
+    for faction_name in factions:
+        client = LoopbackClient(server)
+        client.send(protocol.join(session, simultaneous))
+        client.send(protocol.action(actions.ADD_PLAYER, faction_name))
+        await settle()
+        clients.append(client)
+    return clients
+
+
+def errors(client):
+    return [protocol.unpack_error(payload) for payload in client.received(protocol.ERROR)]
+
+
+def mirror(client):
+    decoder = StateDecoder()
+    for payload in client.received(protocol.STATE):
+        decoder.apply(RECORD.unpack_from(payload, 0)[0], payload, RECORD.size)
+    return decoder.simulation()
+
+
+def test_clients_mirror_the_session():
+    async def test(server):
+        a, b = await seated(server, "game", ["Monopolist", "Technologist"])
+        b.send(protocol.action(actions.PRODUCE))
+        a.send(protocol.action(actions.PRODUCE))
+        a.send(protocol.action(actions.LIST, "raw", 2, 15.0))
+        a.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert errors(b) == ["Not your turn"]
+        sim = server.sessions["game"].sim
+        for client in (a, b):
+            copy = mirror(client)
+            assert numeric_fields(copy) == numeric_fields(sim)
+            assert structure(copy) == structure(sim)
+            assert open_orders(copy) == open_orders(sim)
+        assert numeric_fields(replay(sim.journal)) == numeric_fields(sim)
+    run(test)
+
+
+def test_simultaneous_phase_waits_for_every_seat():
+    async def test(server):
+        a, b = await seated(server, "game", ["Monopolist", "Technologist"], simultaneous=True)
+        sim = server.sessions["game"].sim
+        a.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert sim.turn == 1
+        b.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert sim.turn == 2
+    run(test)
+
+
+def test_departed_seat_passes_simultaneous_phases():
+    async def test(server):
+        a, b = await seated(server, "game", ["Monopolist", "Technologist"], simultaneous=True)
+        sim = server.sessions["game"].sim
+        a.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert sim.turn == 1
+        # The phase was only waiting on b
+        b.disconnect()
+        await settle()
+        assert sim.turn == 2
+        a.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert sim.turn == 3
+        assert errors(a) == []
+        assert numeric_fields(replay(sim.journal)) == numeric_fields(sim)
+    run(test)
+
+
+def test_departed_seat_skips_its_turns():
+    async def test(server):
+        a, b = await seated(server, "game", ["Monopolist", "Technologist"])
+        sim = server.sessions["game"].sim
+        b.disconnect()
+        await settle()
+        a.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert sim.current_player == 0
+        assert sim.turn == 3
+        a.send(protocol.action(actions.PRODUCE))
+        await settle()
+        assert errors(a) == []
+    run(test)
+
+
+def test_malformed_actions_get_an_error():
+    async def test(server):
+        a, b = await seated(server, "game", ["Monopolist", "Technologist"])
+        for bad in ("abc", None, 2 ** 70 * 10 ** 300, float("nan"), -1.0):
+            a.send(protocol.action(actions.LIST, "raw", bad, 5.0))
+        await settle()
+        assert errors(a) == ["Quantities and prices must be positive"] * 5
+        # The connection still works
+        a.send(protocol.action(actions.PRODUCE))
+        a.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert server.sessions["game"].sim.current_player == 1
+    run(test)
+
+
+def test_session_cap():
+    async def test(server):
+        clients = [LoopbackClient(server) for _ in range(3)]
+        for i, client in enumerate(clients):
+            client.send(protocol.join(f"game{i}"))
+        await settle()
+        assert len(server.sessions) == 2
+        assert errors(clients[2]) == ["Too many sessions"]
+        # Joining an existing session is not capped
+        late = LoopbackClient(server)
+        late.send(protocol.join("game0"))
+        await settle()
+        assert errors(late) == []
+        clients[1].disconnect()
+        await settle()
+        clients[2].send(protocol.join("game2"))
+        await settle()
+        assert "game2" in server.sessions
+    run(test)
+
+
+def test_session_ends_with_its_last_client():
+    async def test(server):
+        a, b = await seated(server, "game", ["Monopolist", "Technologist"])
+        a.disconnect()
+        b.disconnect()
+        await settle()
+        assert not server.sessions
+    run(test)
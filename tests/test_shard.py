@@ -0,0 +1,119 @@
+import asyncio
+from core import journal as actions
+from core import protocol
+from core.save import RECORD, StateDecoder, numeric_fields
+from core.shard import HashRing, Lobby
+
+
+class Client:
+    def __init__(self):
+        self.frames = []
+        self.decoder = protocol.FrameDecoder(max_frame=None)
+
+    async def open(self, port):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.task = asyncio.create_task(self.read())
+
+    async def read(self):
+        while data := await self.reader.read(1 << 16):
+            self.frames += self.decoder.feed(data)
+
+    def send(self, data):
+        self.writer.write(data)
+
+    def received(self, kind):
+        return [payload for frame_kind, payload in self.frames if frame_kind == kind]
+
+    def state(self):
+        decoder = StateDecoder()
+        for payload in self.received(protocol.STATE):
+            decoder.apply(RECORD.unpack_from(payload, 0)[0], payload, RECORD.size)
+        return decoder.simulation()
+
+
+def run(test, workers=2):
+    async def main():
+        lobby = Lobby(workers)
+        port = await lobby.start("127.0.0.1", 0)
+        try:
+            await test(lobby, port)
+        finally:
+            await lobby.close()
+    asyncio.run(main())
+
+
+async def settle():
+    await asyncio.sleep(0.2)
+
+
+async def join(port, session, faction_name):
+    client = Client()
+    await client.open(port)
+    client.send(protocol.join(session))
+    client.send(protocol.action(actions.ADD_PLAYER, faction_name))
+    return client
+
+
+def test_ring_moves_few_keys_when_a_node_is_added():
+    ring, larger = HashRing(range(4)), HashRing(range(5))
+    keys = [f"game{i}" for i in range(2000)]
+    moved = sum(next(ring.walk(key)) != next(larger.walk(key)) for key in keys)
+    assert moved < len(keys) * 0.35
+    assert {next(larger.walk(key)) for key in keys} == set(range(5))
+
+
+def test_drain_keeps_the_game():
+    async def test(lobby, port):
+        a = await join(port, "game", "Monopolist")
+        await settle()
+        b = await join(port, "game", "Technologist")
+        await settle()
+        a.send(protocol.action(actions.PRODUCE))
+        a.send(protocol.action(actions.END_TURN))
+        await settle()
+        source = lobby.placements["game"].id
+        await lobby.drain(source)
+        assert source not in lobby.shards
+        b.send(protocol.action(actions.END_TURN))
+        await settle()
+        assert a.state().turn == b.state().turn == 3
+        assert numeric_fields(a.state()) == numeric_fields(b.state())
+        assert not a.received(protocol.ERROR) and not b.received(protocol.ERROR)
+    run(test)
+
+
+def test_join_during_migration_follows_the_session():
+    async def test(lobby, port):
+        a = await join(port, "game", "Monopolist")
+        await settle()
+        source = lobby.placements["game"]
+        target = next(shard for shard in lobby.shards.values() if shard is not source)
+        migration = asyncio.create_task(lobby.migrate("game", target))
+        await asyncio.sleep(0)
+        assert "game" in lobby.migrating
+        b = await join(port, "game", "Technologist")
+        await migration
+        await settle()
+        assert [protocol.unpack_welcome(payload) for payload in b.received(protocol.WELCOME)] == [None, 1]
+        assert len(a.state().players) == len(b.state().players) == 2
+        assert lobby.placements["game"] is target
+    run(test)
+
+
+def test_dead_worker_leaves_the_ring():
+    async def test(lobby, port):
+        a = await join(port, "game", "Monopolist")
+        await settle()
+        dead = lobby.placements["game"]
+        dead.process.terminate()
+        dead.process.join()
+        await lobby.report_loads()
+        assert dead.id not in lobby.shards
+        assert all(node != dead.id for _, node in lobby.ring.points)
+        assert "game" not in lobby.placements
+        # The session name can be placed again, on a live worker
+        b = await join(port, "game", "Technologist")
+        await settle()
+        assert lobby.placements["game"] is not dead
+        assert [protocol.unpack_welcome(payload) for payload in b.received(protocol.WELCOME)] == [None, 0]
+    run(test)
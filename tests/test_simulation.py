@@ -0,0 +1,52 @@
+import pytest
+from core.journal import Journal, decode_actions, replay, replay_bytes
+from core.save import numeric_fields, open_orders, structure
+from helpers import make_game, play, signature
+
+
+@pytest.mark.parametrize("simultaneous", [False, True])
+def test_same_seed_same_game(simultaneous):
+    games = [make_game(3, simultaneous) for _ in range(2)]
+    for sim in games:
+        play(sim, 40)
+    assert signature(games[0]) == signature(games[1])
+    other = make_game(4, simultaneous)
+    play(other, 40)
+    assert numeric_fields(other) != numeric_fields(games[0])
+
+
+@pytest.mark.parametrize("seed", [0, -7, 2 ** 64 - 1, 2 ** 70 + 3, "abc"])
+@pytest.mark.parametrize("simultaneous", [False, True])
+def test_replay_matches_the_game(seed, simultaneous):
+    sim = make_game(seed, simultaneous)
+    play(sim, 40)
+    data = sim.journal.to_bytes()
+    for copy in (replay(Journal.from_bytes(data)), replay_bytes(data)):
+        assert numeric_fields(copy) == numeric_fields(sim)
+        assert structure(copy) == structure(sim)
+        assert open_orders(copy) == open_orders(sim)
+
+
+def test_journal_round_trip():
+    sim = make_game("seed", simultaneous=True)
+    play(sim, 10)
+    journal = Journal.from_bytes(sim.journal.to_bytes())
+    assert (journal.seed, journal.max_turns, journal.simultaneous) == ("seed", sim.max_turns, True)
+    assert journal.entries == sim.journal.entries
+    assert journal.to_bytes() == sim.journal.to_bytes()
+
+
+def test_partial_replay():
+    sim = make_game(5)
+    play(sim, 10)
+    until = len(sim.journal)
+    play(sim, 10, seed=1)
+    halfway = replay(sim.journal, until)
+    assert len(halfway.players) == 3
+    assert halfway.turn < sim.turn
+    assert numeric_fields(replay_bytes(sim.journal.to_bytes(), until)) == numeric_fields(halfway)
+
+
+def test_unknown_action():
+    with pytest.raises(ValueError, match="Unknown journal action"):
+        decode_actions(bytes([200]))
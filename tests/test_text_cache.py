@@ -0,0 +1,47 @@
+from core.button import Button
+from core.text_cache import TextCache, text_cache
+from helpers import make_screen_game
+
+
+class CountingFont:
+    # Stands in for pygame.font.Font, counting renders
+    def __init__(self):
+        self.renders = 0
+
+    def render(self, text, antialias, color):
+        self.renders += 1
+        return (text, color)
+
+
+def test_hits_return_the_same_surface():
+    cache, font = TextCache(4), CountingFont()
+    first = cache.render(font, "Money: 100", (0, 0, 0))
+    assert cache.render(font, "Money: 100", (0, 0, 0)) is first
+    assert cache.render(font, "Money: 100", (255, 0, 0)) is not first
+    assert (font.renders, cache.hits, cache.misses) == (2, 1, 2)
+
+
+def test_least_recently_used_is_evicted():
+    cache, font = TextCache(2), CountingFont()
+    cache.render(font, "a", (0, 0, 0))
+    cache.render(font, "b", (0, 0, 0))
+    cache.render(font, "a", (0, 0, 0))
+    cache.render(font, "c", (0, 0, 0))
+    assert len(cache) == 2
+    cache.render(font, "a", (0, 0, 0))
+    assert font.renders == 3
+    cache.render(font, "b", (0, 0, 0))
+    assert font.renders == 4
+
+
+def test_game_and_buttons_share_the_cache():
+    game = make_screen_game()
+    text_cache.clear()
+    game.draw_game_state()
+    misses = text_cache.misses
+    assert misses
+    game.draw_game_state()
+    hits = text_cache.hits
+    Button(0, 0, 150, 50, "Produce", None).draw(game.screen, game.font)
+    assert text_cache.misses == misses
+    assert text_cache.hits == hits + 1
@@ -0,0 +1,43 @@
+import pytest
+from core.tournament import MatchupStats, game_seed, matchups, play_game, run_tournament
+
+
+def totals(stats):
+    return [(s.faction_a, s.faction_b, s.games, s.wins_a, s.wins_b, s.draws) for s in stats]
+
+
+def test_results_do_not_depend_on_workers_or_chunks():
+    one = run_tournament(6, seed=4, workers=1, chunk_size=6)
+    many = run_tournament(6, seed=4, workers=2, chunk_size=2)
+    assert totals(one) == totals(many)
+    # Chunks finish in any order, so score sums are only equal to rounding
+    for ours, theirs in zip(one, many):
+        assert ours.score_sum == pytest.approx(theirs.score_sum)
+    assert [s.games for s in one] == [6] * len(matchups())
+
+
+def test_games_are_seeded_per_matchup():
+    assert game_seed(0, "Monopolist", "Technologist", 3) == game_seed(0, "Monopolist", "Technologist", 3)
+    assert game_seed(0, "Monopolist", "Technologist", 3) != game_seed(0, "Technologist", "Monopolist", 3)
+    seed = game_seed(0, "Monopolist", "Technologist", 3)
+    assert play_game("Monopolist", "Technologist", seed) == play_game("Monopolist", "Technologist", seed)
+
+
+def test_swapped_seats_report_in_matchup_order():
+    seed = game_seed(1, "Monopolist", "Political Machine", 0)
+    score_a, score_b = play_game("Monopolist", "Political Machine", seed, swap_seats=True)
+    score_b2, score_a2 = play_game("Political Machine", "Monopolist", seed)
+    assert (score_a, score_b) == (score_a2, score_b2)
+
+
+def test_stats():
+    stats = MatchupStats("Monopolist", "Technologist")
+    for score_a, score_b in [(10, 5), (5, 10), (7, 7), (12, 3)]:
+        stats.add(score_a, score_b)
+    assert (stats.wins_a, stats.wins_b, stats.draws) == (2, 1, 1)
+    assert stats.win_rate() == pytest.approx(2.5 / 4)
+    low, high = stats.win_rate_interval()
+    assert 0 <= low < stats.win_rate() < high <= 1
+    assert stats.mean_score(0) == pytest.approx(8.5)
+    low, high = stats.mean_score_interval(1)
+    assert low < stats.mean_score(1) < high
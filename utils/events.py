@@ -0,0 +1,204 @@
+import heapq
+
+# Turn-based event engine. Pending events sit in a heap ordered by the turn
+# they are due and then by scheduling order, so scheduling and firing are
+# O(log n) however many events are pending. Cancels are lazy, as in the
+# market order books.
+#
+# Handlers are registered per event kind and called as
+# handler(event, context, effects). They do not change the game directly:
+# they add to an Effects batch, which the caller applies once after every
+# due event has fired, so several events hitting the same field combine
+# into a single write.
+#
+# Conditions are registered by name too, so a pending event stays plain
+# data that a save file can hold.
+
+
+class Event:
+    __slots__ = ("kind", "data", "every", "condition", "cancelled")
+
+    def __init__(self, kind, data=None, every=None, condition=None):
+        self.kind = kind
+        self.data = data
+        # Recurs every this many turns when set
+        self.every = every
+        # Name of a registered condition, called with the context when the
+        # event is due; while it returns False a recurring event skips to its
+        # next occurrence and a one-off event is retried the next turn
+        self.condition = condition
+        self.cancelled = False
+
+
+# Pending changes to numeric attributes, combined per (target, field) as
+# value * factor + amount, and to players' modifier sources
+class Effects:
+    def __init__(self):
+        self.pending = {}
+        self.sources = {}
+
+    def __len__(self):
+        return len(self.pending) + len(self.sources)
+
+    def entry(self, target, field):
+        key = (id(target), field)
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = self.pending[key] = [target, field, 1.0, 0]
+        return entry
+
+    def scale(self, target, field, factor):
+        entry = self.entry(target, field)
+        entry[2] *= factor
+        entry[3] *= factor
+
+    def add(self, target, field, amount):
+        self.entry(target, field)[3] += amount
+
+    def modify(self, player, source, multipliers):
+        # Sets one of the player's modifier sources (core.modifiers), or
+        # removes it when multipliers is None
+        self.sources[(id(player), source)] = (player, source, multipliers)
+
+    def targets(self):
+        entries = list(self.pending.values()) + list(self.sources.values())
+        return list({id(entry[0]): entry[0] for entry in entries}.values())
+
+    def apply(self):
+        for target, field, factor, amount in self.pending.values():
+            value = getattr(target, field)
+            if factor != 1.0:
+                value *= factor
+            setattr(target, field, value + amount)
+        for player, source, multipliers in self.sources.values():
+            if multipliers is None:
+                player.modifiers.remove(source)
+            else:
+                player.modifiers.set(source, multipliers)
+        self.pending.clear()
+        self.sources.clear()
+
+
+class EventScheduler:
+    def __init__(self):
+        self.heap = []  # (turn, sequence, event)
+        self.handlers = {}
+        self.conditions = {}
+        self.sequence = 0
+        self.live = 0
+        self.stale = 0
+
+    def __len__(self):
+        return self.live
+
+    def register(self, kind, handler):
+        self.handlers.setdefault(kind, []).append(handler)
+
+    def on(self, kind):
+        # Decorator form of register
+        def register(handler):
+            self.register(kind, handler)
+            return handler
+        return register
+
+    def register_condition(self, name, test):
+        self.conditions[name] = test
+
+    def schedule(self, kind, turn, data=None, every=None, condition=None):
+        if condition is not None and condition not in self.conditions:
+            raise ValueError(f"Unknown event condition {condition}")
+        event = Event(kind, data, every, condition)
+        self.push(turn, event)
+        self.live += 1
+        return event
+
+    def push(self, turn, event):
+        heapq.heappush(self.heap, (turn, self.sequence, event))
+        self.sequence += 1
+
+    def cancel(self, event):
+        if event.cancelled:
+            return False
+        event.cancelled = True
+        self.live -= 1
+        self.stale += 1
+        if self.stale > self.live:
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+            heapq.heapify(self.heap)
+            self.stale = 0
+        return True
+
+    def next_turn(self):
+        # Turn of the earliest pending event, or None
+        heap = self.heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self.stale -= 1
+        return heap[0][0] if heap else None
+
+    def due(self, turn):
+        next_turn = self.next_turn()
+        return next_turn is not None and next_turn <= turn
+
+    def fire(self, turn, context, effects=None):
+        # Runs the handlers of every event due at or before turn, in due
+        # order, and returns the Effects they produced, still unapplied.
+        # Events scheduled for this turn by a handler fire in the same call.
+        effects = effects if effects is not None else Effects()
+        while self.due(turn):
+            # A handler may cancel events, which can rebuild self.heap
+            due_turn, _, event = heapq.heappop(self.heap)
+            if event.condition is not None and not self.conditions[event.condition](context):
+                self.push(due_turn + event.every if event.every else turn + 1, event)
+                continue
+            if event.every:
+                self.push(due_turn + event.every, event)
+            else:
+                event.cancelled = True
+                self.live -= 1
+            for handler in self.handlers.get(event.kind, ()):
+                handler(event, context, effects)
+        return effects
+
+
+# Economic events ported from game_demo. They work on any context with a
+# market (and its sectors) and an rng for "random_event", which picks one
+# of the others.
+ECONOMIC_EVENTS = {
+    "economic_boom": "All goods' demands increased",
+    "recession": "All goods' demands decreased",
+    "raw_material_shortage": "Raw material price doubled",
+    "luxury_goods_craze": "Luxury goods demand tripled",
+}
+
+
+def economic_boom(event, context, effects):
+    for sector in context.market.sectors.values():
+        effects.scale(sector, "current_demand", 1.25)
+
+
+def recession(event, context, effects):
+    for sector in context.market.sectors.values():
+        effects.scale(sector, "current_demand", 0.75)
+
+
+def raw_material_shortage(event, context, effects):
+    effects.scale(context.market.sectors["raw"], "current_price", 2)
+
+
+def luxury_goods_craze(event, context, effects):
+    effects.scale(context.market.sectors["luxury"], "current_demand", 3)
+
+
+def random_event(event, context, effects):
+    kind = context.events_rng.choice(list(ECONOMIC_EVENTS))
+    for handler in context.events.handlers.get(kind, ()):
+        handler(event, context, effects)
+
+
+def register_economic_events(scheduler):
+    scheduler.register("economic_boom", economic_boom)
+    scheduler.register("recession", recession)
+    scheduler.register("raw_material_shortage", raw_material_shortage)
+    scheduler.register("luxury_goods_craze", luxury_goods_craze)
+    scheduler.register("random_event", random_event)
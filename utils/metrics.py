@@ -0,0 +1,149 @@
+import csv
+import json
+import math
+import time
+
+# Named phase timers feeding log-bucketed histograms. When metrics are
+# disabled, timer() returns a shared no-op context manager, so
+# instrumented code pays for one method call and nothing else.
+
+# Each power of two is split into this many buckets, so a percentile is
+# accurate to about 100 / BUCKETS_PER_OCTAVE / 2 percent
+BUCKETS_PER_OCTAVE = 16
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value > 0:
+            mantissa, exponent = math.frexp(value)
+            bucket = exponent * BUCKETS_PER_OCTAVE + int((mantissa - 0.5) * 2 * BUCKETS_PER_OCTAVE)
+        else:
+            bucket = None
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, q):
+        # Midpoint of the bucket holding the q-th percentile (q in 0..100)
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets, key=lambda b: -math.inf if b is None else b):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                break
+        if bucket is None:
+            return 0.0
+        exponent, step = divmod(bucket, BUCKETS_PER_OCTAVE)
+        low = math.ldexp(0.5 + step / (2 * BUCKETS_PER_OCTAVE), exponent)
+        high = math.ldexp(0.5 + (step + 1) / (2 * BUCKETS_PER_OCTAVE), exponent)
+        return min((low + high) / 2, self.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.dump_path = None
+        self.dump_interval = None
+        self.last_dump = time.monotonic()
+
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self.histogram(name))
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def reset(self):
+        self.histograms.clear()
+
+    def summary(self):
+        # {name: {count, mean, p50, p95, p99, max}} with times in seconds
+        return {
+            name: {
+                "count": h.count,
+                "mean": h.mean(),
+                "p50": h.percentile(50),
+                "p95": h.percentile(95),
+                "p99": h.percentile(99),
+                "max": h.max,
+            }
+            for name, h in sorted(self.histograms.items())
+        }
+
+    def dump(self, path):
+        # Writes the summary as CSV if path ends in .csv, JSON otherwise
+        summary = self.summary()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["phase", "count", "mean", "p50", "p95", "p99", "max"])
+                for name, stats in summary.items():
+                    writer.writerow([name] + [stats[key] for key in ("count", "mean", "p50", "p95", "p99", "max")])
+        else:
+            with open(path, "w") as f:
+                json.dump({"time": time.time(), "phases": summary}, f, indent=2)
+
+    def dump_periodically(self, path, interval):
+        self.dump_path = path
+        self.dump_interval = interval
+
+    def maybe_dump(self):
+        # Call regularly; dumps when the configured interval has elapsed
+        if self.dump_path and self.enabled:
+            now = time.monotonic()
+            if now - self.last_dump >= self.dump_interval:
+                self.last_dump = now
+                self.dump(self.dump_path)
+
+
+metrics = Metrics()